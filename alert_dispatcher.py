@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import queue
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Overridable so the dispatcher can be pointed at a local mock server
+TELEGRAM_API_BASE = os.environ.get("TG_API_BASE", "https://api.telegram.org")
+
+# Telegram hard limit is 4096 chars, keep headroom for Markdown
+MAX_MESSAGE_CHARS = 3500
+# Telegram allows ~1 msg/sec into a single chat
+MIN_SEND_INTERVAL = 1.0
+REQUEST_TIMEOUT = (3.05, 10) # (connect, read)
+
+ALERT_STATE_FILE = "alert_state.json"
+
+
+def build_session(pool_size=4, retries=3):
+    """
+    Keep-alive HTTP session with a small connection pool. Only connect
+    errors are retried: sendMessage isn't idempotent, and a read error or
+    5xx after Telegram accepted the message would post the alert twice.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=0.5,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class AlertStateStore:
+    """
+    Remembers the last signal alerted per stock so a setup that persists
+    across cycles is only alerted once. Persisted to JSON between restarts.
+    """
+    def __init__(self, path=ALERT_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._state = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Could not read alert state ({e}), starting fresh.")
+
+    @staticmethod
+    def signature(trade):
+        return f"{trade.get('Signal')}|{trade.get('Setup')}"
+
+    def filter_changes(self, results):
+        """
+        Takes every analysed result of a cycle and returns only the trades
+        whose signal is new or changed. Stocks that went NEUTRAL are reset
+        so their next setup alerts again.
+        """
+        fresh = []
+        with self._lock:
+            for r in results:
+                key = r['Stock']
+                if r.get('Signal', "NEUTRAL") == "NEUTRAL":
+                    self._state.pop(key, None)
+                    continue
+
+                sig = self.signature(r)
+                if self._state.get(key) != sig:
+                    self._state[key] = sig
+                    fresh.append(r)
+            self._save()
+        return fresh
+
+    def _save(self):
+        if not self.path: return
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._state, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not save alert state: {e}")
+
+
+class AlertDispatcher:
+    """
+    Queues outgoing Telegram messages and sends them from a background
+    thread over a pooled session. Queued chunks are packed into as few
+    messages as possible and sends are spaced to respect Telegram limits.
+    """
+    def __init__(self, token, chat_id, api_base=TELEGRAM_API_BASE, session=None,
+                 min_interval=MIN_SEND_INTERVAL, timeout=REQUEST_TIMEOUT):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_base = api_base.rstrip("/")
+        self.session = session or build_session()
+        self.min_interval = min_interval
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._last_send = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def url(self):
+        return f"{self.api_base}/bot{self.token}/sendMessage"
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, flush=True, timeout=30):
+        if flush:
+            self.flush(timeout)
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def enqueue(self, text):
+        """Adds a message chunk to the outbound queue."""
+        if text:
+            self._queue.put(text)
+
+    def flush(self, timeout=30):
+        """Blocks until the queue is drained (or timeout)."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    # --- WORKER ---
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            chunks = [first]
+            while True:
+                try:
+                    chunks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                for message in self._pack(chunks):
+                    self.send_now(message)
+            finally:
+                for _ in chunks:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _pack(chunks):
+        """Joins chunks into messages no longer than MAX_MESSAGE_CHARS."""
+        messages = []
+        current = ""
+        for c in chunks:
+            if current and len(current) + len(c) > MAX_MESSAGE_CHARS:
+                messages.append(current)
+                current = ""
+            current += c
+        if current:
+            messages.append(current)
+        return messages
+
+    def _throttle(self):
+        wait = self.min_interval - (time.monotonic() - self._last_send)
+        if wait > 0:
+            time.sleep(wait)
+
+    def send_now(self, message, max_attempts=3):
+        """
+        Sends one message synchronously. Honours Telegram's retry_after on 429.
+        """
+        payload = {
+            "chat_id": self.chat_id,
+            "text": message,
+            "parse_mode": "Markdown"
+        }
+
+        for _ in range(max_attempts):
+            self._throttle()
+            try:
+                resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except Exception as e:
+                print(f"⚠️ Connection Error: {e}")
+                return False
+            finally:
+                self._last_send = time.monotonic()
+
+            if resp.status_code == 200:
+                print("✅ Telegram Alert Sent!")
+                return True
+
+            if resp.status_code == 429:
+                try:
+                    retry_after = resp.json().get("parameters", {}).get("retry_after", 1)
+                except Exception:
+                    retry_after = 1
+                print(f"⏳ Telegram rate limit hit, retrying in {retry_after}s")
+                time.sleep(retry_after)
+                continue
+
+            print(f"⚠️ Failed to send Telegram: {resp.text}")
+            return False
+
+        return False
+
+
+# --- SELF-CHECK (local mock Telegram API) ---
+if __name__ == "__main__":
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received = [] # (monotonic time, text)
+    rate_limit_once = {"done": False}
+
+    class MockTelegram(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if body["text"].startswith("FAIL"):
+                status, reply = 500, {"ok": False}
+            elif not rate_limit_once["done"]:
+                rate_limit_once["done"] = True
+                status, reply = 429, {"ok": False, "parameters": {"retry_after": 1}}
+            else:
+                status, reply = 200, {"ok": True}
+            received.append((time.monotonic(), status, body["text"]))
+            data = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockTelegram)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    interval = 0.2
+    dispatcher = AlertDispatcher("TOKEN", "CHAT", api_base=base, min_interval=interval)
+    chunks = [f"chunk {i} " + "x" * 400 + "\n" for i in range(30)] # ~12 KB
+    for c in chunks:
+        dispatcher.enqueue(c) # queued before the worker starts -> packed together
+    dispatcher.start()
+    dispatcher.stop(flush=True, timeout=30)
+
+    delivered = [(t, text) for t, status, text in received if status == 200]
+    assert "".join(text for _, text in delivered) == "".join(chunks), "messages lost or reordered"
+    assert all(len(text) <= MAX_MESSAGE_CHARS for _, text in delivered)
+    assert len(delivered) == len(AlertDispatcher._pack(chunks)) < len(chunks)
+    # The first attempt got 429 retry_after=1: the same message came back after >= 1s
+    assert received[0][1] == 429 and received[1][2] == received[0][2]
+    assert received[1][0] - received[0][0] >= 1.0
+    gaps = [b - a for (a, _), (b, _) in zip(delivered, delivered[1:])]
+    assert min(gaps) >= interval * 0.95, gaps
+
+    # A 5xx after the request was sent is not retried (could double-post)
+    before = len(received)
+    assert dispatcher.send_now("FAIL once") is False
+    assert len(received) == before + 1
+
+    print(f"✅ {len(chunks)} chunks -> {len(delivered)} messages, min gap {min(gaps):.2f}s "
+          f"(interval {interval}s), 429 waited {received[1][0] - received[0][0]:.2f}s, 5xx sent once")
+    server.shutdown()
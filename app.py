@@ -2,9 +2,10 @@
 import streamlit as st
 import pandas as pd
 import time
-from data_engine import fetch_global_sentiment, get_market_status
-from news_engine import fetch_market_news, fetch_stock_specific_news
-from scanner import scan_stocks, analyze_single_stock
+from news_engine import get_market_news, get_stock_news
+from market_snapshot import get_market_snapshot
+from result_store import load_scan_results, publish_scan
+from app_cache import analyze_stock, institutional_analysis, invalidate_closed_bars, render_cache_status
 
 # --- CONFIGURATION & ASSETS ---
 st.set_page_config(
@@ -235,6 +236,10 @@ with st.sidebar:
         
     st.info(f"Tracking **{len(st.session_state.watchlist)}** Stocks")
 
+    # Results from earlier bars are dropped as soon as a new bar closes
+    invalidate_closed_bars()
+    render_cache_status()
+
 # --- HELPER: CUSTOM METRIC CARD ---
 def render_metric_card(label, value, delta=None, color=None):
     delta_html = ""
@@ -250,22 +255,70 @@ def render_metric_card(label, value, delta=None, color=None):
     </div>
     """, unsafe_allow_html=True)
 
+# --- HELPER: WATCHLIST ENGINE ---
+# Page polls the shared snapshot this often (cheap, no network)
+WATCHLIST_POLL_SECONDS = 5
+
+@st.cache_resource
+def get_watchlist_engine():
+    from watchlist_engine import WatchlistEngine
+    return WatchlistEngine()
+
+# --- HELPER: SHARED SCAN RESULTS ---
+def get_latest_scan(force=False):
+    """
+    Reuses the bot worker's last published scan unless it is stale.
+    Falls back to a closed-bar scan (like the worker's), which is then
+    published for other sessions. A forced scan includes the forming bar,
+    so it is only shown here and never published.
+    """
+    if not force:
+        cached = load_scan_results("NSE")
+        if cached:
+            from scan_table import ScanResults # pandas only, unlike scanner
+            rows, published_at = cached
+            return ScanResults.from_rows(rows), published_at
+            
+    from scanner import scan_stocks # lazy: yfinance + TA stack
+    if force:
+        return scan_stocks(), time.time()
+
+    from market_clock import BarTracker
+    res = scan_stocks(bar_tracker=BarTracker()) # fresh tracker: every closed bar is new
+    try:
+        publish_scan(res['SCANNED'], ["NSE"])
+    except Exception as e:
+        print(f"⚠️ Could not publish scan: {e}")
+    return res, time.time()
+
+def render_scan_age(published_at):
+    age_min = int((time.time() - published_at) / 60)
+    st.caption(f"🕒 Scan published at {time.strftime('%H:%M:%S', time.localtime(published_at))} ({age_min} min ago)")
+
 # --- MODE 0: HIGH PROBABILITY (AUTO FINDER) ---
 if mode == "🔥 High Conviction Opportunities":
     st.markdown("### 🔥 High Probability Opportunities (>75%)")
     st.markdown("This mode automatically scans the market for **high-confidence** setups.")
     
-    # Auto-run logic: We run scan immediately
-    # Ideally, we cache this or run it once.
+    # Reuses the worker's latest scan when fresh, scans only if stale
+    force_scan = st.checkbox("Force fresh scan", value=False, key="hc_force")
+    gemini_key = st.text_input("Gemini API Key (Optional)", type="password", key="hc_gemini",
+                               help="Gemini verdicts for the top setups, generated in the background")
     if st.button("⚡ Scan Market Now", type="primary"):
         with st.spinner("Scanning Nifty 500 for High Conviction Setups (Max 59d History)..."):
-            res = scan_stocks()
+            res, published_at = get_latest_scan(force=force_scan)
+            render_scan_age(published_at)
             
-            # Filter for Score > 75 [UPDATED]
-            high_prob_stocks = [s for s in res['ALL_TRADES'] if s['AI_Score'] >= 75]
+            # Filter for Score > 75 [UPDATED] - vectorised on the scan table, best first
+            high_prob_stocks = res.rows(positions=res.select("ALL_TRADES", min_score=75, best_first=True))
             
             if high_prob_stocks:
                 st.success(f"Found {len(high_prob_stocks)} Elite Opportunities!")
+
+                # Verdicts for the top names run in the background, shown below when ready
+                if gemini_key:
+                    from gemini_engine import get_verdict_service
+                    get_verdict_service(gemini_key).submit_batch(high_prob_stocks)
                 
                 # Render as Cards
                 for stock in high_prob_stocks:
@@ -300,78 +353,83 @@ if mode == "🔥 High Conviction Opportunities":
     else:
         st.info("Click 'Scan Market Now' to hunt for opportunities.")
 
+    if gemini_key:
+        from gemini_engine import get_verdict_service
+        verdicts = get_verdict_service(gemini_key).batch_results()
+        if verdicts:
+            st.markdown("#### 🦅 Gemini Verdicts")
+            if st.button("🔄 Refresh Verdicts"):
+                st.rerun()
+            for stock, verdict in verdicts.items():
+                with st.expander(f"{stock} {'' if verdict else '(thinking...)'}", expanded=False):
+                    st.markdown(verdict or "⏳ Still generating...")
+
 # --- MODE 1: LIVE WATCHLIST ---
 if mode == "Live Watchlist Monitor":
 
     st.markdown("### 🔴 Live Portfolio Monitor")
     
     col_act, col_ref, _ = st.columns([2, 3, 5])
-    if col_act.button("🔄 Refresh Data", type="primary"): 
-        st.rerun()
-        
     with col_ref:
         auto_ref = st.checkbox("⚡ Auto-Refresh (30s)", value=False)
-        
-    if auto_ref:
-        time.sleep(30)
-        st.rerun()
-    
-    live_data = []
-    
-    # helper for threading
-    def fetch_live_stock(t):
-        return analyze_single_stock(t, return_any_data=False)
 
-    import concurrent.futures
-    
-    progress_text = "Scanning Watchlist..."
-    my_bar = st.progress(0, text=progress_text)
-    
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_stock = {executor.submit(fetch_live_stock, t): t for t in st.session_state.watchlist}
-        
-        completed = 0
-        total = len(st.session_state.watchlist)
-        
-        for future in concurrent.futures.as_completed(future_to_stock):
-            res = future.result()
-            completed += 1
-            my_bar.progress(completed / total, text=f"Scanning {completed}/{total}...")
-            
-            if res:
-                live_data.append({
-                    "Stock": res['Stock'], 
-                    "Price": res['CMP'], 
-                    "Signal": res['Signal'], 
-                    "Reason": res['Reason'],
-                    "ADX": res['Stats']['ADX'], 
-                    "Action": "WAIT" if res['Signal'] == "NEUTRAL" else res['Signal']
-                })
-    
-    my_bar.empty()
+    # Shared engine keeps per-symbol bars between reruns and sessions
+    engine = get_watchlist_engine()
+    watchlist = list(st.session_state.watchlist)
+
+    if col_act.button("🔄 Refresh Data", type="primary"):
+        with st.spinner(f"Refreshing {len(watchlist)} symbols..."):
+            engine.refresh(watchlist)
+    elif not engine.snapshot(watchlist):
+        # First visit: nothing cached yet
+        with st.spinner(f"Loading {len(watchlist)} symbols..."):
+            engine.refresh(watchlist)
+
+    # Auto mode: the engine's background thread refreshes the shared snapshot
+    # every 30s (one loop for all viewers); this fragment only re-reads it.
+    @st.fragment(run_every=WATCHLIST_POLL_SECONDS if auto_ref else None)
+    def render_watchlist_table():
+        if auto_ref:
+            engine.watch(watchlist)
+        live_data, refreshed_at, changed_rows = engine.latest(watchlist)
+
+        if refreshed_at:
+            st.caption(f"🕒 Background refresh at {time.strftime('%H:%M:%S', time.localtime(refreshed_at))}")
+        if changed_rows:
+            st.caption(f"🔁 {len(changed_rows)} of {len(live_data)} rows changed since last refresh: "
+                       + ", ".join(r['Stock'] for r in changed_rows[:10]))
+
+        if live_data:
+            df = pd.DataFrame(live_data)
+            # Sort by Signal importance
+            df.sort_values(by="Action", ascending=False, key=lambda col: col != "WAIT", inplace=True)
+
+            def color_action_col(val):
+                color = 'gray'
+                if 'BUY' in str(val): color = '#00e676'
+                elif 'SELL' in str(val): color = '#ff1744'
+                return f'color: {color}; font-weight: bold;'
+
+            st.dataframe(
+                df.style.map(color_action_col, subset=['Signal', 'Action']),
+                use_container_width=True,
+                column_config={
+                    "Price": st.column_config.NumberColumn("CMP (₹)", format="₹ %.2f"),
+                    "ADX": st.column_config.NumberColumn("Trend (ADX)", format="%.1f")
+                },
+                height=500
+            )
+            # Portfolio view: the watchlist as equal ₹1L long positions
+            risk = engine.risk.portfolio_summary(watchlist)
+            if risk:
+                beta = f"{risk['Beta']:.2f}" if risk['Beta'] is not None else "-"
+                pair = risk['Top Pair']
+                pair_txt = f" | most correlated: {pair[0]} / {pair[1]} (ρ {pair[2]:.2f})" if pair else ""
+                st.caption(f"🧮 Avg beta to NIFTY: {beta} | 1-day 95% VaR at ₹1L each: ₹{risk['VaR']:,.0f}{pair_txt}")
+        else:
+            st.info("Watchlist is empty or data is loading...")
 
-    if live_data:
-        df = pd.DataFrame(live_data)
-        # Sort by Signal importance
-        df.sort_values(by="Action", ascending=False, key=lambda col: col != "WAIT", inplace=True)
-        
-        def color_action_col(val):
-            color = 'gray'
-            if 'BUY' in str(val): color = '#00e676' 
-            elif 'SELL' in str(val): color = '#ff1744'
-            return f'color: {color}; font-weight: bold;'
-            
-        st.dataframe(
-            df.style.map(color_action_col, subset=['Signal', 'Action']),
-            use_container_width=True,
-            column_config={
-                "Price": st.column_config.NumberColumn("CMP (₹)", format="₹ %.2f"),
-                "ADX": st.column_config.NumberColumn("Trend (ADX)", format="%.1f")
-            },
-            height=500
-        )
-    else:
-        st.info("Watchlist is empty or data is loading...")
+    render_watchlist_table()
 
 # --- MODE 2: DEEP ANALYSIS (FUNDAMENTAL + F&O) ---
 elif mode == "Deep Analysis (Single Stock)":
@@ -385,10 +443,13 @@ elif mode == "Deep Analysis (Single Stock)":
         run_btn = st.button("🚀 Analyze", type="primary", use_container_width=True)
     
     if run_btn and ticker_input:
-        ticker = ticker_input if ticker_input.endswith(".NS") else f"{ticker_input}.NS"
-        
+        st.session_state['deep_ticker'] = ticker_input if ticker_input.endswith(".NS") else f"{ticker_input}.NS"
+
+    # Kept across reruns so the chart zoom doesn't drop the analysis (result is cached)
+    ticker = st.session_state.get('deep_ticker')
+    if ticker:
         with st.spinner(f"Running 360° Analysis on {ticker}..."):
-            result = analyze_single_stock(ticker, return_any_data=True)
+            result = analyze_stock(ticker) # cached per bar, shared across sessions
         
         if result:
             # --- COMPACT DASHBOARD HEADER ---
@@ -443,29 +504,16 @@ elif mode == "Deep Analysis (Single Stock)":
                     with nc3: render_metric_card("RESIST (R1)", f"₹{result['KeyLevel_R1']}", color="#00e676")
 
                 # Chart
-                if 'History' in result:
-                    import plotly.graph_objects as go
-                    hist = result['History']
-                    fig = go.Figure()
-                    fig.add_trace(go.Candlestick(x=hist.index, open=hist['Open'], high=hist['High'], low=hist['Low'], close=hist['Close'], name='Price'))
-                    
-                    # Add simple Moving Averages
-                    fig.add_trace(go.Scatter(x=hist.index, y=hist['EMA_20'], line=dict(color='orange', width=1), name='EMA 20'))
-                    fig.add_trace(go.Scatter(x=hist.index, y=hist['EMA_200'], line=dict(color='purple', width=2), name='EMA 200'))
-                    
-                    fig.update_layout(
-                        height=400, 
-                        template="plotly_dark", 
-                        margin=dict(l=0, r=0, t=0, b=0),
-                        paper_bgcolor='rgba(0,0,0,0)', 
-                        plot_bgcolor='rgba(0,0,0,0)'
-                    )
+                if result.get('History') is not None:
+                    from chart_engine import build_price_figure, ZOOM_WINDOWS
+                    # Downsampled to the chart width; zooming in serves full 15m resolution
+                    zoom = st.radio("Zoom", list(ZOOM_WINDOWS), index=2, horizontal=True, key="deep_zoom")
+                    fig = build_price_figure(result['History'], days=ZOOM_WINDOWS[zoom])
                     st.plotly_chart(fig, use_container_width=True)
                     
                 # --- NEW: STOCK SPECIFIC NEWS ---
                 st.markdown("### 📰 Related News")
-                from news_engine import fetch_stock_specific_news
-                stock_news = fetch_stock_specific_news(ticker)
+                stock_news = get_stock_news(ticker)
                 
                 if stock_news:
                     for item in stock_news[:3]: # Show top 3
@@ -485,10 +533,13 @@ elif mode == "Deep Analysis (Single Stock)":
                 # Compact Technical Table
                 tech_df = pd.DataFrame([
                     {"Metric": "Trend", "Value": stats.get('Trend', '-')},
+                    {"Metric": "Trend (1h)", "Value": stats.get('Trend 1h', '-')},
                     {"Metric": "RSI (14)", "Value": stats['RSI']},
                     {"Metric": "ADX Strength", "Value": stats['ADX']},
                     {"Metric": "Volume", "Value": stats.get('Volume Status', '-')},
-                    {"Metric": "PCR (Sentiment)", "Value": result.get('FnO', {}).get('PCR', 'N/A') if result.get('FnO') else '-'}
+                    {"Metric": "PCR (Sentiment)", "Value": result.get('FnO', {}).get('PCR', 'N/A') if result.get('FnO') else '-'},
+                    {"Metric": "Max Pain", "Value": (result.get('FnO') or {}).get('Max Pain', '-')},
+                    {"Metric": "ATM IV %", "Value": (result.get('FnO') or {}).get('ATM IV %', '-')}
                 ])
                 st.dataframe(tech_df, hide_index=True, use_container_width=True)
                 
@@ -508,7 +559,17 @@ elif mode == "Dashboard & News":
     st.markdown("### 📰 Intelligent Market Pulse")
     
     with st.spinner("Analyzing Global Sentiments..."):
-        news_groups = fetch_market_news()
+        snapshot = get_market_snapshot()
+        news_groups = get_market_news()
+
+    # Index strip (same cached snapshot the CLI and reports use)
+    quotes = {**snapshot['Domestic_Status'], **snapshot['Global_Indices']}
+    if quotes:
+        st.caption(f"🌍 Global cues: **{snapshot['Global_Sentiment']}** (score {snapshot['Global_Score']:+.2f}) "
+                   f"| updated {snapshot['Fetched_At']}")
+        q_cols = st.columns(min(len(quotes), 5))
+        for i, (name, q) in enumerate(quotes.items()):
+            q_cols[i % len(q_cols)].metric(name, f"{q['Last Price']:,.2f}", f"{q['Change %']:+.2f}%")
         
     # Grid Layout for News
     num_cols = 2
@@ -537,12 +598,15 @@ elif mode == "Full Nifty 500 Scan":
     st.markdown("### 🚀 Nifty 500 Turbo Scanner")
     st.info("This scans 500 stocks. Be patient.")
     
+    force_scan = st.checkbox("Force fresh scan", value=False, key="full_force")
     if st.button("Start Scan", type="primary"):
         with st.spinner("Scanning Market..."):
-            res = scan_stocks()
-            if res['ALL_TRADES']:
-                st.success(f"Found {len(res['ALL_TRADES'])} opportunities!")
-                st.dataframe(pd.DataFrame(res['ALL_TRADES']))
+            res, published_at = get_latest_scan(force=force_scan)
+            render_scan_age(published_at)
+            if res.count("ALL_TRADES"):
+                st.success(f"Found {res.count('ALL_TRADES')} opportunities!")
+                st.dataframe(res.frame("ALL_TRADES").drop(columns=["Stats", "Levels", "Fundamentals", "FnO"]),
+                             hide_index=True)
             else:
                 st.warning("No clear setups found right now.")
 
@@ -579,8 +643,7 @@ elif mode == "Commodities AI Sniper":
         
         if st.button("🚀 Run AI Analysis", type="primary", use_container_width=True):
              with st.spinner(f"Training AI Models on {selected_ticker}..."):
-                from institutional_dashboard import get_institutional_analysis
-                data = get_institutional_analysis(selected_ticker)
+                data = institutional_analysis(selected_ticker)
                 
                 if data:
                     st.session_state['comm_data'] = data
@@ -0,0 +1,140 @@
+import sys
+import datetime as dt
+import streamlit as st
+from zoneinfo import ZoneInfo
+from ttl_cache import TTLCache
+from market_clock import SESSIONS, last_bar_close, session_for_ticker
+
+# --- ANALYSIS CACHE ---
+# Results are keyed by (kind, ticker, session, last bar of the data they
+# were built from), like indicator_cache.frame_key. A new bar in the data
+# is a new key; keying on the clock instead would pin a result built from
+# lagging data (the provider prints the bar late) for the whole bar.
+# The TTL is only a safety net.
+ANALYSIS_TTL_SECONDS = 6 * 3600
+ANALYSIS_CACHE_SIZE = 128
+# Reruns within this window reuse the 15m download that picks the key
+BARS_TTL_SECONDS = 60
+
+
+@st.cache_resource
+def _get_cache():
+    """One cache per server process, shared by every browser session."""
+    return TTLCache(ANALYSIS_TTL_SECONDS, 0, ANALYSIS_CACHE_SIZE, name="analysis")
+
+
+@st.cache_resource
+def _get_bars_cache():
+    return TTLCache(BARS_TTL_SECONDS, 0, ANALYSIS_CACHE_SIZE, name="analysis bars")
+
+
+@st.cache_resource
+def _bar_state():
+    return {} # session -> last closed bar we saw
+
+
+def _bar_key(session):
+    bar = last_bar_close(session)
+    return bar.isoformat() if bar else "none"
+
+
+def invalidate_closed_bars():
+    """
+    Drops the session's entries (all built from earlier bars) when it prints
+    a new bar, so they don't sit in the cache until the TTL.
+    Called once per script run. Returns the sessions that rolled over.
+    """
+    state = _bar_state()
+    cache = _get_cache()
+    rolled = []
+    for session in SESSIONS:
+        bar = _bar_key(session)
+        if state.get(session) == bar: continue
+        if session in state:
+            rolled.append(session)
+            for key in cache.keys():
+                if key[2] == session:
+                    cache.invalidate(key)
+        state[session] = bar
+    return rolled
+
+
+def _bars(ticker):
+    from data_engine import fetch_data
+    return _get_bars_cache().get_or_load(ticker, lambda: fetch_data(ticker, period="59d", interval="15m"))
+
+
+def _cached(kind, ticker, loader):
+    """
+    loader(bars) runs on the downloaded bars. Without bars it runs uncached
+    with None, so it can report the failure (or retry another symbol).
+    """
+    bars = _bars(ticker)
+    if bars is None or bars.empty:
+        return loader(None)
+    key = (kind, ticker, session_for_ticker(ticker), bars.index[-1])
+    return _get_cache().get_or_load(key, lambda: loader(bars))
+
+
+# --- CACHED CALLS ---
+def analyze_stock(ticker):
+    """Deep Analysis result (technicals + fundamentals + F&O + ML) for this bar."""
+    from scanner import analyze_single_stock
+    return _cached("deep", ticker, lambda bars: analyze_single_stock(ticker, return_any_data=True, bars=bars))
+
+
+def institutional_analysis(ticker):
+    """get_institutional_analysis (LSTM + XGB + news) for this bar."""
+    from institutional_dashboard import get_institutional_analysis
+    return _cached("institutional", ticker, lambda bars: get_institutional_analysis(ticker, bars=bars))
+
+
+# --- SIDEBAR STATUS ---
+def _loaded(name):
+    """
+    The module if something already imported it, else None. The status
+    panel runs on every rerun and must not pull in (and initialise) engines
+    this session never used.
+    """
+    return sys.modules.get(name)
+
+
+def render_cache_status():
+    news = _loaded("news_engine")
+    indicators = _loaded("indicator_cache")
+    options = _loaded("options_engine")
+    fundamentals = _loaded("fundamentals_snapshot")
+    resample = _loaded("resample_engine")
+    snapshot = _loaded("market_snapshot")
+
+    with st.expander("🗄️ Cache Status"):
+        state = _bar_state()
+        for session, cfg in SESSIONS.items():
+            bar = state.get(session, "none")
+            label = "-" if bar == "none" else \
+                dt.datetime.fromisoformat(bar).astimezone(ZoneInfo(cfg["tz"])).strftime('%d %b %H:%M')
+            st.caption(f"{session} last bar: {label}")
+
+        stats = [_get_cache().stats(), _get_bars_cache().stats()]
+        if indicators: stats.append(indicators.indicator_cache_stats())
+        if news: stats += news.news_cache_stats()
+        if options: stats += options.options_cache_stats()
+        if resample: stats.append(resample.resample_cache_stats())
+        if snapshot: stats.append(snapshot.market_snapshot_stats())
+        for s in stats:
+            st.caption(f"{s['name']}: {s['size']} entries | {s['hits']} hits, "
+                       f"{s['stale_hits']} stale, {s['misses']} misses")
+
+        if fundamentals:
+            rows, built_at = fundamentals.snapshot_status()
+            st.caption(f"fundamentals snapshot: {rows} tickers, built "
+                       f"{built_at.strftime('%d %b %H:%M') if built_at else 'never'}")
+
+        if st.button("Clear Caches", use_container_width=True):
+            _get_cache().clear()
+            _get_bars_cache().clear()
+            if news: news.clear_news_cache()
+            if indicators: indicators.clear_indicator_cache()
+            if options: options.clear_options_cache()
+            st.cache_data.clear()
+            st.toast("🧹 Caches cleared")
@@ -1,9 +1,15 @@
 
 import os
 import time
-import requests
 import pandas as pd
 from scanner import scan_stocks
+from alert_dispatcher import AlertDispatcher, AlertStateStore
+from result_store import publish_scan
+from data_engine import get_nifty500_tickers, get_commodity_tickers
+from market_clock import BarTracker, session_for_ticker, wait_for_next_bar
+from priority_scheduler import PriorityScheduler
+from fundamentals_snapshot import start_nightly_refresh
+from risk_engine import RiskEngine
 
 # --- CONFIGURATION ---
 # Users must replace these with their own details
@@ -16,78 +22,117 @@ if os.environ.get("TG_TOKEN"):
 if os.environ.get("TG_CHAT_ID"):
     TELEGRAM_CHAT_ID = os.environ.get("TG_CHAT_ID")
 
+# Max instruments re-evaluated per bar (0 = no cap)
+SCAN_BUDGET = int(os.environ.get("SCAN_BUDGET", "0"))
+
+# Notional per alerted trade for the VaR line (₹)
+RISK_NOTIONAL = 100000
+
+_DISPATCHER = None
+
+def get_dispatcher():
+    """
+    Lazily starts the shared background alert dispatcher.
+    """
+    global _DISPATCHER
+    if _DISPATCHER is None:
+        _DISPATCHER = AlertDispatcher(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID).start()
+    return _DISPATCHER
+
 def send_telegram_message(message):
     """
-    Sends a message to the configured Telegram chat.
+    Queues a message for the configured Telegram chat.
     """
     if TELEGRAM_BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
         print("❌ Telegram Token not set. Skipping alert.")
         return
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": message,
-        "parse_mode": "Markdown"
-    }
-    
-    try:
-        resp = requests.post(url, json=payload)
-        if resp.status_code == 200:
-            print("✅ Telegram Alert Sent!")
-        else:
-            print(f"⚠️ Failed to send Telegram: {resp.text}")
-    except Exception as e:
-        print(f"⚠️ Connection Error: {e}")
+    get_dispatcher().enqueue(message)
+
+def format_trade_alert(t, beta=None):
+    """
+    Renders a single trade as a Telegram Markdown chunk.
+    """
+    emoji = "🟢" if "BUY" in t['Signal'] else "🔴"
+    chart_symbol = f"NSE:{t['Stock']}" if session_for_ticker(t['Stock']) == "NSE" else t['Stock']
+    beta_line = f"Beta (NIFTY): {beta:.2f}\n" if beta is not None else ""
+    return (
+        f"{emoji} **{t['Stock']}**\n"
+        f"Signal: {t['Signal']}\n"
+        f"Price: {t['CMP']}\n"
+        f"Strategy: {t['Strategy']}\n"
+        f"{beta_line}"
+        f"Link: [Chart](https://in.tradingview.com/chart/?symbol={chart_symbol})\n"
+        f"-------------------\n"
+    )
+
+def get_universe():
+    """
+    Instruments the bot watches, across all sessions.
+    """
+    return get_nifty500_tickers() + get_commodity_tickers()
 
 def run_bot_service():
     """
     Main loop for the background worker.
+    Wakes just after each 15m bar close and only scans the sessions
+    whose bar just closed (closed markets are skipped entirely).
     """
     print("🤖 Telegram Bot Service Started...")
     send_telegram_message("🤖 **Trading Bot Started!** Monitoring markets...")
     
+    universe = get_universe()
+    bar_tracker = BarTracker()
+    alert_state = AlertStateStore()
+    scheduler = PriorityScheduler(budget=SCAN_BUDGET or None)
+    risk = RiskEngine() # rolling correlation / beta across the NSE universe
+    # Fundamentals for the scan score, rebuilt every evening after the close
+    start_nightly_refresh(get_nifty500_tickers)
+    
     while True:
         try:
-            print(f"⏳ Scanning Market at {time.strftime('%H:%M:%S')}...")
+            # 1. Sleep until the next bar closes in any open session
+            sessions = wait_for_next_bar()
+            if not sessions:
+                # No session configured, don't spin
+                time.sleep(900)
+                continue
+                
+            session_tickers = [t for t in universe if session_for_ticker(t) in sessions]
+            # Hot names every bar, cold names every few bars
+            tickers = scheduler.due(session_tickers)
+            print(f"⏳ Bar close {', '.join(sessions)} at {time.strftime('%H:%M:%S')} - scanning {len(tickers)}/{len(session_tickers)} instruments...")
+            
+            # 2. Run Scan (only instruments with a fresh bar are re-evaluated)
+            results = scan_stocks(tickers=tickers, bar_tracker=bar_tracker, risk_engine=risk)
+            scanned = results.get('SCANNED', []) # dict rows built once per cycle
+            scheduler.update(scanned)
             
-            # 1. Run Scan
-            results = scan_stocks()
-            trades = results.get('ALL_TRADES', [])
+            # Share the cycle with the web process so the UI doesn't rescan
+            try:
+                publish_scan(scanned, sessions)
+            except Exception as e:
+                print(f"⚠️ Could not publish scan results: {e}")
+            
+            # 3. Cap correlated signals (no ten bank BUYs at once). Dropped ones
+            # stay out of the alert state, so they can alert once the cluster frees up.
+            kept, dropped = risk.cap_correlated([r for r in scanned if r['Signal'] != "NEUTRAL"])
+            if dropped:
+                print(f"🧮 Correlation cap skipped: {', '.join(r['Stock'] for r in dropped)}")
+            kept_names = {r['Stock'] for r in kept}
+            
+            # 4. Keep only setups that are new or changed since the last alert
+            trades = alert_state.filter_changes([r for r in scanned if r['Signal'] == "NEUTRAL" or r['Stock'] in kept_names])
             
             if trades:
-                # 2. Filter for High Quality Trades
-                message = f"🚨 **TRADING ALERTS ({len(trades)})** 🚨\n\n"
-                
-                count = 0
+                betas = risk.betas()
+                var = risk.value_at_risk({t['Stock']: RISK_NOTIONAL if "BUY" in t['Signal'] else -RISK_NOTIONAL for t in trades})
+                var_line = f"1-day 95% VaR at ₹{RISK_NOTIONAL:,} each: ₹{var:,.0f}\n" if var > 0 else ""
+                send_telegram_message(f"🚨 **TRADING ALERTS ({len(trades)})** 🚨\n{var_line}\n")
                 for t in trades:
-                    # Only alert if Signal is Strong (or at least valid)
-                    if t['Signal'] != "NEUTRAL":
-                        emoji = "🟢" if "BUY" in t['Signal'] else "🔴"
-                        msg_chunk = (
-                            f"{emoji} **{t['Stock']}**\n"
-                            f"Signal: {t['Signal']}\n"
-                            f"Price: {t['CMP']}\n"
-                            f"Strategy: {t['Strategy']}\n"
-                            f"Link: [Chart](https://in.tradingview.com/chart/?symbol=NSE:{t['Stock']})\n"
-                            f"-------------------\n"
-                        )
-                        message += msg_chunk
-                        count += 1
-                        
-                        # Split messages if too long
-                        if len(message) > 3500:
-                            send_telegram_message(message)
-                            message = ""
-
-                if count > 0 and message:
-                    send_telegram_message(message)
+                    send_telegram_message(format_trade_alert(t, betas.get(t['Stock'])))
             else:
-                 print("😴 No trades found this cycle.")
-
-            # 3. Sleep
-            # Scan every 15 minutes to avoid spam and api limits
-            time.sleep(900) 
+                 print("😴 No new trades this cycle.")
             
         except Exception as e:
             print(f"❌ Error in Bot Loop: {e}")
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# --- VIEWPORT ---
+# A candle needs ~3px to be readable; the chart column is ~900px wide.
+CHART_WIDTH_PX = 900
+MAX_CANDLES = CHART_WIDTH_PX // 3
+# Overlay lines: a point every 2px is already smooth next to 3px candles
+MAX_LINE_POINTS = CHART_WIDTH_PX // 2
+
+# Zoom presets for the UI: label -> trading days shown (None = everything)
+ZOOM_WINDOWS = {"Full": None, "10D": 10, "5D": 5, "2D": 2, "1D": 1}
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets. Returns the indices of the points to
+    keep (first and last always kept) so the line keeps its visual shape.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    # Bucket edges over points 1 .. n-2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[nlo:nhi].mean() if nhi > nlo else x[-1]
+        avg_y = y[nlo:nhi].mean() if nhi > nlo else y[-1]
+
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        keep[i + 1] = a
+    return keep
+
+
+def ohlc_buckets(df, max_candles=MAX_CANDLES):
+    """
+    Merges consecutive candles into at most max_candles buckets
+    (first open, max high, min low, last close, summed volume), so
+    wicks and gaps survive the downsampling.
+    """
+    n = len(df)
+    if n <= max_candles:
+        return df
+
+    size = int(np.ceil(n / max_candles))
+    groups = np.arange(n) // size
+    g = df.groupby(groups)
+    out = pd.DataFrame({
+        "Open": g["Open"].first().values,
+        "High": g["High"].max().values,
+        "Low": g["Low"].min().values,
+        "Close": g["Close"].last().values
+    }, index=df.index[::size])
+    if "Volume" in df:
+        out["Volume"] = g["Volume"].sum().values
+    return out
+
+
+def window(df, days=None):
+    """Last `days` trading sessions of an intraday frame (None = all)."""
+    if not days or df.empty:
+        return df
+    dates = pd.Index(df.index.date).unique()
+    start = dates[-min(days, len(dates))]
+    return df[df.index.date >= start]
+
+
+def prepare_chart(df, days=None, overlays=("EMA_20", "EMA_200"),
+                  max_candles=MAX_CANDLES, max_points=MAX_LINE_POINTS):
+    """
+    Chart payload for a zoom window: bucketed candles plus LTTB-reduced
+    overlay lines. Short windows come back at full resolution.
+    Returns (candles_df, {name: (x, y)}).
+    """
+    view = window(df, days)
+    candles = ohlc_buckets(view, max_candles)
+
+    lines = {}
+    xs = view.index.asi8 if isinstance(view.index, pd.DatetimeIndex) else np.arange(len(view))
+    for col in overlays:
+        if col not in view: continue
+        y = view[col].values
+        idx = lttb(xs, y, max_points)
+        lines[col] = (view.index[idx], y[idx])
+    return candles, lines
+
+
+OVERLAY_STYLES = {
+    "EMA_20": dict(color='orange', width=1),
+    "EMA_50": dict(color='#2196F3', width=1),
+    "EMA_200": dict(color='purple', width=2)
+}
+
+
+def build_price_figure(df, days=None, overlays=("EMA_20", "EMA_200"), height=400):
+    """
+    Plotly candlestick + overlays from prepare_chart. Plotly is imported
+    here so only chart views pay for it.
+    """
+    import plotly.graph_objects as go
+
+    candles, lines = prepare_chart(df, days, overlays)
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'],
+                                 low=candles['Low'], close=candles['Close'], name='Price'))
+    for name, (x, y) in lines.items():
+        fig.add_trace(go.Scatter(x=x, y=y, line=OVERLAY_STYLES.get(name, dict(width=1)),
+                                 name=name.replace("_", " ")))
+
+    fig.update_layout(
+        height=height,
+        xaxis_rangeslider_visible=False,
+        template="plotly_dark",
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    import time
+    rng = np.random.default_rng(7)
+    idx = pd.date_range("2024-01-01 09:15", periods=59 * 25, freq="15min")
+    close = 1000 + np.cumsum(rng.normal(0, 2, len(idx)))
+    df = pd.DataFrame({"Open": close + rng.normal(0, 1, len(idx)), "Close": close,
+                       "Volume": rng.integers(1000, 5000, len(idx))}, index=idx)
+    df["High"] = df[["Open", "Close"]].max(axis=1) + 1
+    df["Low"] = df[["Open", "Close"]].min(axis=1) - 1
+    df["EMA_20"] = df["Close"].ewm(span=20).mean()
+    df["EMA_200"] = df["Close"].ewm(span=200).mean()
+
+    for label, days in ZOOM_WINDOWS.items():
+        t0 = time.perf_counter()
+        candles, lines = prepare_chart(df, days)
+        ms = (time.perf_counter() - t0) * 1000
+        raw = len(window(df, days))
+        pts = len(candles) + sum(len(x) for x, _ in lines.values())
+        print(f"{label:5s} raw candles {raw:5d} -> {len(candles):4d} candles, "
+              f"{pts:5d} points total (was {raw * 3}), {ms:5.1f} ms")
@@ -75,34 +75,30 @@ def get_nifty500_tickers():
     except:
         return ["RELIANCE.NS", "TCS.NS"]
 
+# Commodity futures tracked on the CME session (see market_clock)
+COMMODITY_TICKERS = ["CL=F", "GC=F", "SI=F", "QM=F", "QO=F", "QI=F", "NG=F", "HG=F"]
+
+def get_commodity_tickers():
+    """
+    Returns the commodity futures universe.
+    """
+    return list(COMMODITY_TICKERS)
+
 def fetch_global_sentiment():
     """
-    Simulates fetching global market cues (US, Asia).
+    Global market cues (US, Asia, crude, USD/INR) and their weighted mood.
+    Returns (sentiment label, {index: quote}) from the shared market snapshot.
     """
-    # In a real app, this would scrape MoneyControl or Investing.com
-    # Returning Simulated Real-Time Data for Demo
-    return "Neutral", {}
+    from market_snapshot import get_market_snapshot
+    snap = get_market_snapshot()
+    return snap["Global_Sentiment"], snap["Global_Indices"]
 
 def get_market_status():
     """
-    Fetches Nifty & Bank Nifty current status.
+    Fetches Nifty & Bank Nifty current status (from the shared market snapshot).
     """
-    status = {}
-    for index in ["^NSEI", "^NSEBANK"]:
-        try:
-             df = yf.download(index, period="1d", interval="1d", progress=False, auto_adjust=True)
-             if not df.empty:
-                 current = df['Close'].iloc[-1]
-                 prev = df['Open'].iloc[-1] # Approximation
-                 change = ((current - prev) / prev) * 100
-                 
-                 name = "NIFTY 50" if index == "^NSEI" else "BANK NIFTY"
-                 status[name] = {
-                     "Previous Close": round(current, 2),
-                     "Change %": round(change, 2)
-                 }
-        except: pass
-    return status
+    from market_snapshot import get_market_snapshot
+    return get_market_snapshot()["Domestic_Status"]
 
 # --- NEW: FUNDAMENTALS ---
 def get_fundamentals(ticker):
@@ -130,44 +126,17 @@ def get_fundamentals(ticker):
         return None
 
 # --- NEW: F&O (Derivatives) ---
-def get_option_chain_data(ticker):
+def get_option_chain_data(ticker, spot=None, expiries=None):
     """
     Fetches Option Chain to calculate PCR and Max OI.
     Approximation using yfinance (which has limited option data for India sometimes).
+    Chains are cached per expiry in options_engine; besides PCR / Max OI the
+    result has Max Pain, PCR Bands, ATM IV and OI change.
     """
     try:
-        stock = yf.Ticker(ticker)
-        # Get nearest expiry
-        expirations = stock.options
-        if not expirations:
-            return None
-            
-        expiry = expirations[0] # Nearest
-        opts = stock.option_chain(expiry)
-        
-        calls = opts.calls
-        puts = opts.puts
-        
-        # 1. Total OI for PCR
-        total_call_oi = calls['openInterest'].sum()
-        total_put_oi = puts['openInterest'].sum()
-        pcr = round(total_put_oi / total_call_oi, 2) if total_call_oi > 0 else 0
-        
-        # 2. Max Pain / Supports (Max OI Levels)
-        # Find Strike with Max OI
-        max_call_oi_row = calls.loc[calls['openInterest'].idxmax()]
-        max_put_oi_row = puts.loc[puts['openInterest'].idxmax()]
-        
-        resistance_oi = max_call_oi_row['strike']
-        support_oi = max_put_oi_row['strike']
-        
-        return {
-            "PCR": pcr,
-            "PCR Sentiment": "Bullish" if pcr > 1 else "Bearish",
-            "Max Call OI (Res)": resistance_oi,
-            "Max Put OI (Sup)": support_oi,
-            "Expiry": expiry
-        }
+        import options_engine # lazy: only F&O views need it
+        return options_engine.get_fno_snapshot(ticker, spot=spot,
+                                               expiries=expiries or options_engine.EXPIRIES_ANALYSED)
     except Exception as e:
         # F&O data might fail for non-F&O stocks or API limits
         return None
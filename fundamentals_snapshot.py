@@ -0,0 +1,208 @@
+import os
+import sys
+import time
+import threading
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from zoneinfo import ZoneInfo
+import numpy as np
+
+# One .npy file for the whole universe, rebuilt nightly and memory-mapped by
+# every process (web + worker share the page cache, nothing is parsed).
+SNAPSHOT_PATH = os.environ.get("FUNDAMENTALS_SNAPSHOT_PATH", "fundamentals_snapshot.npy")
+BUILD_WORKERS = 8 # Ticker.info is slow and rate limited
+BUILD_HOUR_IST = 18 # rebuild after the NSE close
+MAX_AGE_DAYS = 3 # older snapshots are still used, with a warning
+RELOAD_CHECK_SECONDS = 300 # how often a process looks for a rebuilt file
+
+# Same keys as data_engine.get_fundamentals
+FLOAT_FIELDS = ["Market Cap (Cr)", "P/E Ratio", "ROE %", "Debt/Equity", "Current Ratio",
+                "Promoter Holding %", "Profit Margins %"]
+SYMBOL_LEN = 24
+RECOMMENDATION_LEN = 16
+SNAPSHOT_DTYPE = np.dtype([("Symbol", f"U{SYMBOL_LEN}")] +
+                          [(f, "f8") for f in FLOAT_FIELDS] +
+                          [("Recommendation", f"U{RECOMMENDATION_LEN}"), ("Fetched", "f8")])
+
+IST = ZoneInfo("Asia/Kolkata")
+
+
+def _symbol(ticker):
+    return ticker.replace(".NS", "").replace(".BO", "").upper()
+
+
+# --- BUILD ---
+def build_snapshot(tickers=None, path=None, workers=BUILD_WORKERS):
+    """
+    Fetches get_fundamentals for the whole universe in parallel and writes
+    the snapshot atomically (readers never see a half-written file).
+    Returns (rows written, tickers that failed).
+    """
+    from data_engine import get_fundamentals, get_nifty500_tickers
+
+    tickers = tickers or get_nifty500_tickers()
+    path = path or SNAPSHOT_PATH
+    rows, failed = [], []
+    t0 = time.time()
+    print(f"🏢 Building fundamentals snapshot for {len(tickers)} tickers ({workers} workers)...")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fundamentals") as pool:
+        futures = {pool.submit(get_fundamentals, t): t for t in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                data = future.result()
+            except Exception:
+                data = None
+            if not data:
+                failed.append(ticker)
+                continue
+            rows.append((_symbol(ticker)[:SYMBOL_LEN],) +
+                        tuple(float(data.get(f) or 0) for f in FLOAT_FIELDS) +
+                        (str(data.get("Recommendation", "NONE"))[:RECOMMENDATION_LEN], time.time()))
+
+    if not rows:
+        # API down / rate limited: keep serving the previous snapshot
+        print(f"❌ Fundamentals snapshot: no data fetched, keeping {path}")
+        return 0, failed
+
+    table = np.array(sorted(rows), dtype=SNAPSHOT_DTYPE)
+    # np.save appends .npy to names without it, so the temp name keeps the suffix
+    tmp = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp, table, allow_pickle=False)
+    os.replace(tmp, path)
+    print(f"✅ Fundamentals snapshot: {len(table)} rows, {len(failed)} failed, "
+          f"{time.time() - t0:.0f}s -> {path}")
+    return len(table), failed
+
+
+# --- LOAD (once per process) ---
+class FundamentalsSnapshot:
+    """
+    Memory-mapped snapshot with a symbol -> row index. Re-maps itself when
+    the file on disk is replaced by a newer build.
+    """
+    def __init__(self, path=None):
+        self.path = path or SNAPSHOT_PATH
+        self._lock = threading.Lock()
+        # (symbol -> row, memmap, mtime), swapped in one assignment so a
+        # lookup during a reload never mixes the old table with the new index
+        self._state = None
+        self._checked_at = 0
+        self.built_at = None
+
+    def _maybe_reload(self):
+        now = time.time()
+        if self._state is not None and now - self._checked_at < RELOAD_CHECK_SECONDS: return
+        with self._lock:
+            if self._state is not None and now - self._checked_at < RELOAD_CHECK_SECONDS: return
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return # no snapshot yet
+            if self._state is not None and mtime == self._state[2]: return
+
+            try:
+                table = np.load(self.path, mmap_mode="r", allow_pickle=False)
+            except Exception as e:
+                print(f"⚠️ Could not load fundamentals snapshot {self.path}: {e}")
+                return
+            self._state = ({str(s): i for i, s in enumerate(table["Symbol"])}, table, mtime)
+            self.built_at = dt.datetime.fromtimestamp(mtime, IST)
+            if self.age_days() > MAX_AGE_DAYS:
+                print(f"⚠️ Fundamentals snapshot is {self.age_days():.0f} days old")
+
+    def age_days(self):
+        if self.built_at is None: return None
+        return (dt.datetime.now(IST) - self.built_at).total_seconds() / 86400
+
+    def get(self, ticker):
+        """Fundamentals dict (get_fundamentals shape) or None if not in the snapshot."""
+        self._maybe_reload()
+        state = self._state
+        if state is None: return None
+        index, table, _ = state
+        i = index.get(_symbol(ticker))
+        if i is None: return None
+        row = table[i]
+        data = {f: round(float(row[f]), 2) for f in FLOAT_FIELDS}
+        data["Recommendation"] = str(row["Recommendation"])
+        return data
+
+    def __len__(self):
+        self._maybe_reload()
+        state = self._state
+        return len(state[0]) if state else 0
+
+
+_SNAPSHOT = FundamentalsSnapshot()
+
+
+def get_snapshot_fundamentals(ticker):
+    """Zero-cost fundamentals for scans (None when the ticker isn't in the snapshot)."""
+    return _SNAPSHOT.get(ticker)
+
+
+def snapshot_status():
+    """(rows, built_at datetime or None) for status displays."""
+    return len(_SNAPSHOT), _SNAPSHOT.built_at
+
+
+# --- NIGHTLY JOB ---
+def _needs_build(path=None, now=None):
+    """True once per evening: after BUILD_HOUR_IST if the file predates today's build time."""
+    now = now or dt.datetime.now(IST)
+    due = now.replace(hour=BUILD_HOUR_IST, minute=0, second=0, microsecond=0)
+    if now < due:
+        due -= dt.timedelta(days=1)
+    try:
+        built = dt.datetime.fromtimestamp(os.path.getmtime(path or SNAPSHOT_PATH), IST)
+    except OSError:
+        return True
+    return built < due
+
+
+def start_nightly_refresh(get_tickers=None, check_seconds=1800):
+    """
+    Daemon thread that rebuilds the snapshot once a night (and right away
+    if there is none). Used by the worker; the web process only reads.
+    """
+    def loop():
+        while True:
+            try:
+                if _needs_build():
+                    build_snapshot(get_tickers() if get_tickers else None)
+            except Exception as e:
+                print(f"❌ Fundamentals snapshot build failed: {e}")
+            time.sleep(check_seconds)
+
+    thread = threading.Thread(target=loop, name="fundamentals-nightly", daemon=True)
+    thread.start()
+    return thread
+
+
+# --- CLI / BENCHMARK ---
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["build"]:
+        # Cron alternative: python fundamentals_snapshot.py build [workers]
+        build_snapshot(workers=int(sys.argv[2]) if len(sys.argv) > 2 else BUILD_WORKERS)
+        sys.exit(0)
+
+    import tempfile
+    rng = np.random.default_rng(5)
+    path = os.path.join(tempfile.mkdtemp(), "snap.npy")
+    n = 500
+    rows = [(f"SYM{i}",) + tuple(rng.uniform(0, 50, len(FLOAT_FIELDS))) + ("BUY", time.time()) for i in range(n)]
+    np.save(path, np.array(rows, dtype=SNAPSHOT_DTYPE), allow_pickle=False)
+
+    t0 = time.perf_counter()
+    snap = FundamentalsSnapshot(path)
+    snap.get("SYM0.NS")
+    t_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(n):
+        snap.get(f"SYM{i}.NS")
+    t_get = (time.perf_counter() - t0) / n
+    print(f"{n} tickers, {os.path.getsize(path) / 1e3:.0f} KB on disk: load {t_load * 1000:.1f} ms, "
+          f"lookup {t_get * 1e6:.1f} µs/ticker (vs ~1-2 s per live Ticker.info call)")
@@ -1,75 +1,271 @@
 
-import google.generativeai as genai
-import streamlit as st
-import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ttl_cache import TTLCache
 
-def get_available_models(api_key):
-    """Lists available models for debugging."""
-    try:
-        genai.configure(api_key=api_key)
-        models = []
-        for m in genai.list_models():
-            if 'generateContent' in m.supported_generation_methods:
-                models.append(m.name)
-        return models
-    except:
-        return ["Could not fetch models"]
+DEFAULT_MODEL = 'gemini-2.5-flash'
+# Same prompt (same ticker, data and headlines) within this window -> cached answer
+VERDICT_TTL_SECONDS = 15 * 60
+VERDICT_CACHE_SIZE = 256
+# Parallel generate_content calls per API key (free tier is rate limited)
+MAX_CONCURRENT_CALLS = 3
+BATCH_TOP_N = 5
 
-def get_gemini_verdict(ticker, tech_data, ml_score, news_list, api_key):
+
+def build_prompt(ticker, tech_data, ml_score, news_list):
     """
-    Sends stock data to Gemini. Tries updated models, falls back to reporting available ones.
+    Risk-manager prompt for one trade idea.
     """
-    if not api_key:
-        return "⚠️ Please enter your Google Gemini API Key in the Sidebar to unlock this feature."
-        
-    try:
-        genai.configure(api_key=api_key)
-        
-        # Try the most standard model name first
-        model_name = 'gemini-2.5-flash' 
-        model = genai.GenerativeModel(model_name)
-        
-        # 1. Prepare Prompt Data
-        news_text = "\n".join([f"- {n['Headline']} (Source: {n['Score']})" for n in news_list[:5]])
-        
-        prompt = f"""
+    news_text = "\n".join([f"- {n['Headline']} (Source: {n['Score']})" for n in (news_list or [])[:5]])
+    rsi = tech_data.get('RSI') or 50
+
+    return f"""
         You are a Senior Risk Manager at a top Wall Street Hedge Fund. I am a Junior Analyst pitching a trade on {ticker}.
-        
+
         Review the following data and give me your BRUTALLY HONEST verdict.
-        
+
         ### 1. TECHNICALS
         - Price: {tech_data.get('CMP')}
         - Trend: {tech_data.get('Trend')}
-        - RSI: {tech_data.get('RSI')} ({'Overbought' if tech_data.get('RSI')>70 else 'Oversold' if tech_data.get('RSI')<30 else 'Neutral'})
+        - RSI: {tech_data.get('RSI')} ({'Overbought' if rsi>70 else 'Oversold' if rsi<30 else 'Neutral'})
         - VWAP Status: {tech_data.get('VWAP_Status')}
-        
+
         ### 2. AI MODEL CONFIDENCE
         - Our Internal ML Model Score: {ml_score}/100
         - Pattern Detected: {tech_data.get('Pattern')}
-        
+
         ### 3. RECENT NEWS HEADLINES
         {news_text}
-        
+
         ### YOUR TASK:
         Provide a response in this exact format:
-        
+
         **VERDICT**: [AGGRESSIVE BUY | ACCUMULATE | WAIT | SELL]
-        
+
         **THESIS**: (2-3 sentences explaining WHY, focusing on risks vs reward. Be skeptical.)
-        
+
         **WATCH OUT FOR**: (1 sentence on the biggest risk factor).
         """
-        
-        response = model.generate_content(prompt)
-        return response.text
-        
-    except Exception as e:
-        # Debugging: List available models if the specific one failed
-        available = get_available_models(api_key)
-        valid_models = ", ".join([m.replace("models/", "") for m in available])
+
+
+def _genai_clients(api_key):
+    """
+    (generative, model) service clients bound to one key. genai.configure()
+    is process-global - the last key configured would be used by every
+    service - so each key gets its own clients through client_options.
+    """
+    from google.ai import generativelanguage_v1beta as glm
+    options = {"api_key": api_key}
+    return glm.GenerativeServiceClient(client_options=options), glm.ModelServiceClient(client_options=options)
+
+
+def _genai_model_factory(api_key):
+    """Real client for one key, returns a model builder."""
+    from google.generativeai import protos
+    from google.generativeai.types import GenerateContentResponse
+    client, _ = _genai_clients(api_key)
+
+    class _KeyedModel:
+        def __init__(self, model_name):
+            self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+
+        def generate_content(self, prompt):
+            request = protos.GenerateContentRequest(
+                model=self.model_name,
+                contents=[protos.Content(role="user", parts=[protos.Part(text=prompt)])])
+            return GenerateContentResponse.from_response(client.generate_content(request))
+
+    return _KeyedModel
+
+
+def _list_models(api_key):
+    """Model names usable with generate_content for this key (raises on failure)."""
+    import google.generativeai as genai
+    _, client = _genai_clients(api_key)
+    return [m.name for m in genai.list_models(client=client)
+            if 'generateContent' in m.supported_generation_methods]
+
+
+def get_available_models(api_key):
+    """Lists available models for debugging."""
+    try:
+        return _list_models(api_key)
+    except:
+        return ["Could not fetch models"]
+
+
+def trade_to_tech_data(trade):
+    """Scan row (ALL_TRADES) -> the tech_data dict the prompt expects."""
+    stats = trade.get('Stats') or {}
+    return {
+        "CMP": trade.get('CMP'),
+        "Trend": stats.get('Trend', trade.get('Signal')),
+        "RSI": stats.get('RSI'),
+        "VWAP_Status": stats.get('VWAP Status', 'N/A'),
+        "Pattern": trade.get('Setup')
+    }
+
+
+class VerdictService:
+    """
+    Gemini verdicts with one client per API key, a response cache keyed by
+    the prompt hash, a cap on concurrent calls and a background batch API.
+
+    model_factory(api_key) must return a callable model_name -> model with
+    generate_content(prompt).text; pass a stub to run without the network.
+    """
+    def __init__(self, api_key, model_name=DEFAULT_MODEL, model_factory=None,
+                 ttl=VERDICT_TTL_SECONDS, max_concurrency=MAX_CONCURRENT_CALLS):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._factory = model_factory or _genai_model_factory
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache = TTLCache(ttl, 0, VERDICT_CACHE_SIZE, name="gemini verdicts")
+        self._slots = threading.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self._batch = {} # stock -> future
+        self._batch_lock = threading.Lock()
+        self._models_hint = None # list_models() result, kept once a fetch succeeds
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = self._factory(self.api_key)(self.model_name)
+            return self._model
+
+    @staticmethod
+    def prompt_key(model_name, prompt):
+        return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _generate(self, prompt):
+        with self._slots:
+            return self._get_model().generate_content(prompt).text
+
+    def _error_text(self, e):
+        models = self._models_hint
+        if models is None:
+            try:
+                models = self._models_hint = _list_models(self.api_key)
+            except Exception:
+                models = ["Could not fetch models"] # not cached, retried on the next error
+        valid_models = ", ".join([m.replace("models/", "") for m in models])
         return f"""❌ **Model Error**: {str(e)}
-        
-        ℹ️ **Valid Models for your Key**: 
+
+        ℹ️ **Valid Models for your Key**:
         {valid_models}
-        
-        (I attempted to use '{model_name}')"""
+
+        (I attempted to use '{self.model_name}')"""
+
+    def verdict(self, ticker, tech_data, ml_score, news_list):
+        """Blocking verdict (cached). Errors are returned as text, never cached."""
+        prompt = build_prompt(ticker, tech_data, ml_score, news_list)
+        try:
+            return self._cache.get_or_load(self.prompt_key(self.model_name, prompt), lambda: self._generate(prompt))
+        except Exception as e:
+            return self._error_text(e)
+
+    def submit(self, ticker, tech_data, ml_score, news_list):
+        """Non-blocking verdict, returns a Future."""
+        return self._executor.submit(self.verdict, ticker, tech_data, ml_score, news_list)
+
+    def submit_batch(self, trades, top_n=BATCH_TOP_N, news_lookup=None):
+        """
+        Queues verdicts for the top_n trades by AI_Score in the background.
+        news_lookup(ticker) supplies headlines (defaults to the shared news cache).
+        Returns {stock: future}.
+        """
+        if news_lookup is None:
+            from news_engine import get_stock_news
+            news_lookup = get_stock_news
+
+        top = sorted(trades, key=lambda t: t.get('AI_Score', 0), reverse=True)[:top_n]
+
+        def job(trade):
+            ticker = trade['Stock']
+            try:
+                news = news_lookup(ticker)
+            except Exception:
+                news = []
+            return self.verdict(ticker, trade_to_tech_data(trade), trade.get('AI_Score', 0), news)
+
+        with self._batch_lock:
+            for trade in top:
+                fut = self._batch.get(trade['Stock'])
+                if fut is None or fut.done():
+                    self._batch[trade['Stock']] = self._executor.submit(job, trade)
+            return {t['Stock']: self._batch[t['Stock']] for t in top}
+
+    def batch_results(self):
+        """{stock: verdict text or None while still running}"""
+        with self._batch_lock:
+            return {s: (f.result() if f.done() else None) for s, f in self._batch.items()}
+
+
+_SERVICES = {}
+_SERVICES_LOCK = threading.Lock()
+
+
+def get_verdict_service(api_key, model_factory=None):
+    """One service (client, cache, limiter) per API key, shared by all sessions."""
+    with _SERVICES_LOCK:
+        service = _SERVICES.get(api_key)
+        if service is None:
+            service = VerdictService(api_key, model_factory=model_factory)
+            _SERVICES[api_key] = service
+        return service
+
+
+def get_gemini_verdict(ticker, tech_data, ml_score, news_list, api_key):
+    """
+    Sends stock data to Gemini (cached per prompt, shared client).
+    """
+    if not api_key:
+        return "⚠️ Please enter your Google Gemini API Key in the Sidebar to unlock this feature."
+    return get_verdict_service(api_key).verdict(ticker, tech_data, ml_score, news_list)
+
+
+# --- LOCAL CHECK (no network) ---
+class _StubModel:
+    """Stands in for GenerativeModel: fixed latency, counts calls."""
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        import time
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+
+        class _Resp: text = f"**VERDICT**: WAIT ({len(prompt)} chars)"
+        return _Resp()
+
+
+if __name__ == "__main__":
+    import time
+    stub = _StubModel()
+    service = VerdictService("stub-key", model_factory=lambda key: (lambda name: stub))
+    trades = [{"Stock": f"STOCK{i}", "CMP": 100 + i, "Signal": "BUY", "Setup": "BUY_BREAKOUT",
+               "Stats": {"RSI": 55, "Trend": "Bullish"}, "AI_Score": 70 + i} for i in range(8)]
+
+    t0 = time.perf_counter()
+    futures = service.submit_batch(trades, top_n=6, news_lookup=lambda t: [])
+    for f in futures.values(): f.result()
+    t_batch = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    service.submit_batch(trades, top_n=6, news_lookup=lambda t: [])
+    for f in service.submit_batch(trades, top_n=6, news_lookup=lambda t: []).values(): f.result()
+    t_cached = time.perf_counter() - t0
+
+    print(f"batch of 6: {t_batch:.2f}s (serial would be {6 * stub.latency:.1f}s), peak concurrency {stub.peak}")
+    print(f"repeat batch: {t_cached * 1000:.1f} ms, model calls {stub.calls} (expected 6)")
@@ -0,0 +1,119 @@
+"""
+Startup-time profile and guard for the entry points.
+
+Imports each entry point's module-level dependencies in a fresh
+interpreter with -X importtime, prints the slowest top-level imports, and
+fails (exit 1) if a heavy optional module is loaded at startup or the
+import time goes over budget.
+
+    python import_benchmark.py            # profile + guard
+    python import_benchmark.py --top 15   # longer profile
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds of module-level imports allowed per entry point (cold, no .pyc help assumed)
+ENTRY_POINTS = {
+    "app.py": 4.0,          # web dyno
+    "bot_service.py": 4.0,  # worker dyno
+    "main.py": 4.0          # CLI
+}
+
+# Only imported by the modes that use them - never at startup.
+# (pyarrow isn't one: pandas imports it itself when it is installed.)
+LAZY_MODULES = ["sklearn", "google.generativeai", "xlsxwriter", "plotly"]
+
+
+def startup_imports(path):
+    """
+    Top-level modules an entry point imports when it starts
+    (module-level import statements, not the ones inside functions).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def _parse_importtime(stderr):
+    """-X importtime lines -> top_level [(seconds, module)]."""
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line: continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        if not name.startswith("  "): # no indent = imported directly by the script
+            top.append((int(cumulative) / 1e6, name.strip()))
+    return top
+
+
+def profile_entry(entry):
+    """
+    Imports the entry point's startup modules in a clean interpreter.
+    Returns dict(total, top, heavy, missing).
+    """
+    modules = startup_imports(os.path.join(HERE, entry))
+    # Missing optional deps shouldn't abort the profile, just be reported.
+    # "Eager" is what ended up in sys.modules: importtime also lists
+    # attempts that failed (e.g. an optional import inside pandas).
+    code = "import sys, json\nmissing=[]\n" + "".join(
+        f"try:\n    import {m}\nexcept ImportError as e:\n    missing.append('{m}: ' + str(e))\n" for m in modules
+    ) + f"print(json.dumps({{'missing': missing, 'heavy': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))\n"
+
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=HERE, capture_output=True, text=True)
+    top = _parse_importtime(proc.stderr)
+    # Drop interpreter startup (site, encodings...) - only what the entry point asks for
+    top = [(t, n) for t, n in top if n in modules or n.split(".")[0] in modules]
+    try:
+        child = json.loads(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        child = {"missing": [f"import failed: {proc.stderr.strip().splitlines()[-1:]}"], "heavy": []}
+    return {
+        "total": sum(t for t, _ in top),
+        "top": sorted(top, reverse=True),
+        "heavy": child["heavy"],
+        "missing": child["missing"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the entry points")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to show per entry point")
+    args = parser.parse_args()
+
+    failed = False
+    for entry, budget in ENTRY_POINTS.items():
+        res = profile_entry(entry)
+        status = "OK"
+        if res["heavy"]:
+            status = "FAIL (eager: " + ", ".join(res["heavy"]) + ")"
+        elif res["total"] > budget:
+            status = f"FAIL (over {budget:.1f}s budget)"
+        failed = failed or status != "OK"
+
+        print(f"\n=== {entry}: {res['total']:.2f}s  [{status}]")
+        for secs, name in res["top"][:args.top]:
+            print(f"  {secs:6.3f}s  {name}")
+        for m in res["missing"]:
+            print(f"  ⚠️ not installed, not measured: {m}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
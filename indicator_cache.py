@@ -0,0 +1,44 @@
+import math
+from ttl_cache import TTLCache
+from technicals import detect_structure
+
+# One indicator frame per (ticker, interval, bar window). A new or revised
+# bar changes the key, so the TTL only bounds how long idle entries live.
+INDICATOR_TTL_SECONDS = 2 * 3600
+INDICATOR_CACHE_SIZE = 256
+
+_CACHE = TTLCache(INDICATOR_TTL_SECONDS, 0, INDICATOR_CACHE_SIZE, name="indicators")
+
+
+def frame_key(ticker, interval, df):
+    """
+    Identifies the bars behind an indicator frame: first and last bar time,
+    bar count, and the last bar's close/volume (a forming bar gets revised).
+    NaN (yfinance's forming bar often has no close yet) becomes None, as
+    NaN != NaN would make every lookup miss and pile up entries.
+    """
+    last = df.iloc[-1]
+    close, volume = float(last['Close']), float(last.get('Volume', 0))
+    return (ticker, interval, df.index[0], df.index[-1], len(df),
+            None if math.isnan(close) else close, None if math.isnan(volume) else volume)
+
+
+def get_indicators(ticker, df, interval="15m"):
+    """
+    Memoised technicals.detect_structure. Every caller (scanner, Deep
+    Analysis, Institutional dashboard, Commodities Sniper) reading the same
+    bars gets the same frame, computed once per bar.
+
+    The returned frame is shared - copy it before adding columns.
+    Returns None if there isn't enough data (same as detect_structure).
+    """
+    if df is None or df.empty: return None
+    return _CACHE.get_or_load(frame_key(ticker, interval, df), lambda: detect_structure(df.copy()))
+
+
+def indicator_cache_stats():
+    return _CACHE.stats()
+
+
+def clear_indicator_cache():
+    _CACHE.clear()
@@ -1,20 +1,20 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.neural_network import MLPRegressor
 import time
 import queue
 
 # Import from existing modules
 from data_engine import fetch_data, get_fundamentals, get_option_chain_data
-from news_engine import fetch_stock_specific_news
-from gemini_engine import get_gemini_verdict
+from indicator_cache import get_indicators
+import technicals
+from news_engine import get_stock_news
 
 # --- HYBRID MODEL ENGINE (LSTM + XGBOOST) ---
 
 class InstitutionalEngine:
     def __init__(self):
+        from sklearn.preprocessing import MinMaxScaler # lazy: only this mode needs sklearn
         self.scaler = MinMaxScaler(feature_range=(0, 1))
         
     def prepare_lstm_data(self, df, lookback=50):
@@ -37,6 +37,7 @@ class InstitutionalEngine:
         if len(df) < 100: return "NEUTRAL", 0.0
         
         try:
+            from sklearn.neural_network import MLPRegressor
             X, y, scaled_data = self.prepare_lstm_data(df)
             
             # Train (Fast Mode using MLP)
@@ -63,32 +64,29 @@ class InstitutionalEngine:
         """
         Calculates Probability Score (0-100%) using XGBoost logic
         (Features: RSI, ADX, MACD, VWAP_Dist)
+        Reads the shared indicator frame; only computes what's missing.
         """
         if len(df) < 50: return 50
         
-        # 1. Feature Engineering
-        df = df.copy()
-        df['RSI'] = self.calculate_rsi(df)
-        df['ADX'] = self.calculate_adx(df)
-        df['VWAP'] = self.calculate_vwap(df)
-        df['VWAP_Dist'] = (df['Close'] - df['VWAP']) / df['VWAP'] * 100
+        # 1. Feature Engineering (last bar only)
+        rsi = df['RSI'].iloc[-1] if 'RSI' in df else self.calculate_rsi(df).iloc[-1]
+        adx = df['ADX'].iloc[-1] if 'ADX' in df else self.calculate_adx(df).iloc[-1]
+        vwap = df['VWAP'].iloc[-1] if 'VWAP' in df else self.calculate_vwap(df).iloc[-1]
+        dist = (df['Close'].iloc[-1] - vwap) / vwap * 100
         
         # 2. Logic (Simplified Rule-Based Weighting mimicking XGBoost feature importance)
         # In a real deployed version, we would load a .json model file here.
         score = 50
         
         # RSI Contribution
-        rsi = df['RSI'].iloc[-1]
         if rsi > 50: score += 10
         if rsi > 70: score -= 15 # Overbought logic
         if rsi < 30: score += 15 # Oversold bounce
         
         # Trend Contribution
-        adx = df['ADX'].iloc[-1]
         if adx > 25: score += 10
         
         # VWAP Value
-        dist = df['VWAP_Dist'].iloc[-1]
         if dist < -1.0: score += 20 # Value Buy
         if dist > 2.0: score -= 20 # Overextended
         
@@ -96,9 +94,9 @@ class InstitutionalEngine:
         
     def get_news_sentiment(self, ticker):
         """
-        Fetches news and calculates aggregated sentiment score (-10 to 10).
+        Fetches news (shared cache) and calculates aggregated sentiment score (-10 to 10).
         """
-        news = fetch_stock_specific_news(ticker)
+        news = get_stock_news(ticker)
         if not news:
              return 0, []
              
@@ -113,22 +111,15 @@ class InstitutionalEngine:
         # Boost for high impact keywords found in headline
         return avg_score, news
     
-    # --- Helper Techs ---
+    # --- Helper Techs (same formulas as the scanner) ---
     def calculate_rsi(self, df, period=14):
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        return technicals.calculate_rsi(df, period)
 
     def calculate_adx(self, df, period=14):
-        # Simplified ADX (Placeholder)
-        return df['Close'].rolling(period).std() 
+        return technicals.calculate_adx(df, period)
 
     def calculate_vwap(self, df):
-        v = df['Volume']
-        p = df['Close']
-        return (p * v).rolling(window=50).sum() / v.rolling(window=50).sum()
+        return technicals.calculate_vwap(df)
 
 
 # --- DASHBOARD UI ---
@@ -169,8 +160,9 @@ def render_institutional_dashboard():
                 if 'inst_data' in st.session_state:
                     del st.session_state['inst_data']
                 
-                # Run Analysis
-                data = get_institutional_analysis(ticker)
+                # Run Analysis (cached per bar)
+                from app_cache import institutional_analysis
+                data = institutional_analysis(ticker)
                 if data:
                     st.session_state['inst_data'] = data
                     st.rerun()
@@ -179,17 +171,21 @@ def render_institutional_dashboard():
     if 'inst_data' in st.session_state:
         display_institutional_results(st.session_state['inst_data'], api_key, ticker)
 
-def get_institutional_analysis(ticker):
-    """Performs analysis and returns a dictionary of results."""
+def get_institutional_analysis(ticker, bars=None):
+    """
+    Performs analysis and returns a dictionary of results.
+    bars: already downloaded 59d/15m bars (skips the fetch).
+    """
     # 1. Fetch Data
-    df = fetch_data(ticker, period="60d", interval="15m")
+    # Same window as the scanner, so both read one cached indicator frame
+    df = bars if bars is not None else fetch_data(ticker, period="59d", interval="15m")
     
     # Auto-fix for NSE stocks if user forgot .NS
     if df is None and ".NS" not in ticker and "=" not in ticker:
         ticker += ".NS"
         # Toast requires st reference, keep it for feedback
         st.toast(f"🔄 Auto-correction: Trying {ticker}...", icon="🇮🇳")
-        df = fetch_data(ticker, period="60d", interval="15m")
+        df = fetch_data(ticker, period="59d", interval="15m")
         
     if df is None:
         st.error(f"❌ Data fetch failed for {ticker}. Check spelling or internet.")
@@ -198,8 +194,12 @@ def get_institutional_analysis(ticker):
     engine = InstitutionalEngine()
     
     # 2. Run Models
-    # Calculate indicators on main DF for display later
-    df['RSI'] = engine.calculate_rsi(df)
+    # Indicators (RSI, real ADX, VWAP...) from the shared per-bar cache
+    ind = get_indicators(ticker, df, interval="15m")
+    if ind is not None:
+        df = ind
+    else:
+        df = df.assign(RSI=engine.calculate_rsi(df), VWAP=engine.calculate_vwap(df))
     
     lstm_sig, lstm_val = engine.get_lstm_signal(df)
     xgb_score = engine.get_xgboost_score(df)
@@ -212,7 +212,7 @@ def get_institutional_analysis(ticker):
     
     # 3. Institutional Checks
     current_price = df['Close'].iloc[-1]
-    vwap = engine.calculate_vwap(df).iloc[-1]
+    vwap = df['VWAP'].iloc[-1]
     vwap_std = df['Close'].rolling(50).std().iloc[-1]
     
     # Zones
@@ -274,6 +274,13 @@ def display_institutional_results(data, api_key, ticker):
     m3.metric("News Sentiment", f"{round(sent_score, 1)}", delta=sentiment_label, delta_color=sentiment_color)
     m4.metric("Confluence", confluence)
     
+    # Price chart, downsampled server-side (59d of 15m candles is ~1500 bars)
+    from chart_engine import build_price_figure, ZOOM_WINDOWS
+    chart_df = df if 'EMA_200' in df else \
+        df.assign(EMA_20=technicals.calculate_ema(df, 20), EMA_200=technicals.calculate_ema(df, 200))
+    zoom = st.radio("Zoom", list(ZOOM_WINDOWS), index=2, horizontal=True, key=f"inst_zoom_{ticker}")
+    st.plotly_chart(build_price_figure(chart_df, days=ZOOM_WINDOWS[zoom]), use_container_width=True)
+
     # B. Execution Plan
     st.markdown("---")
     st.markdown("### ⚡ Execution Plan")
@@ -308,6 +315,7 @@ def display_institutional_results(data, api_key, ticker):
                     "Pattern": lstm_sig
                 }
                 
+                from gemini_engine import get_gemini_verdict
                 verdict = get_gemini_verdict(ticker, tech_data, xgb_score, news_items, api_key)
                 
                 # Render Styled Verdict
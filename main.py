@@ -1,9 +1,15 @@
 
+import argparse
+import contextlib
 import datetime
-from data_engine import fetch_global_sentiment, get_market_status
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from market_snapshot import get_market_snapshot
 from news_engine import fetch_market_news
 from scanner import scan_stocks, analyze_single_stock
-from report_generator import generate_report
 
 def main():
     print("==========================================")
@@ -12,15 +18,11 @@ def main():
     
     # 1. Market Overview
     print(">>> Phase 1: Analyzing Market Sentiment...")
-    sentiment, global_data = fetch_global_sentiment()
-    domestic_status = get_market_status()
-    print(f"Global Sentiment: {sentiment}")
-    
-    market_data = {
-        "Global_Sentiment": sentiment,
-        "Global_Indices": global_data,
-        "Domestic_Status": domestic_status
-    }
+    # One concurrent fetch of domestic + global indices, shared with the report
+    market_data = get_market_snapshot()
+    print(f"Global Sentiment: {market_data['Global_Sentiment']} (score {market_data['Global_Score']})")
+    for name, q in market_data['Domestic_Status'].items():
+        print(f"  {name}: {q['Last Price']} ({q['Change %']:+.2f}%)")
     
     # 2. News Analysis
     print("\n>>> Phase 2: Fetching Today's Market News...")
@@ -42,6 +44,7 @@ def main():
         scanner_results = scan_stocks()
         
         print("\n>>> Phase 4: Generating Report...")
+        from report_generator import generate_report # lazy: only mode 1 writes a report
         file_path = generate_report(market_data, scanner_results, news_list)
         if file_path:
              print(f"SUCCESS! Full Market Report saved at: {file_path}")
@@ -87,5 +90,131 @@ def main():
     else:
         print("Invalid Choice.")
 
+# --- HEADLESS BATCH MODE ---
+def normalize_symbol(symbol):
+    """SBIN -> SBIN.NS; tickers with a suffix (CL=F, ^NSEI, X.BO) are kept."""
+    symbol = symbol.strip().upper()
+    if not symbol: return None
+    if any(ch in symbol for ch in ".=^"): return symbol
+    return f"{symbol}.NS"
+
+def load_universe(path):
+    """
+    Symbols from a file: one per line or comma separated, '#' comments,
+    an optional 'Symbol' header is skipped.
+    """
+    symbols = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            for part in line.split(","):
+                if part.strip() and part.strip().lower() not in ("symbol", "ticker"):
+                    symbols.append(part)
+    return symbols
+
+def _json_default(o):
+    try:
+        return _json_safe(float(o)) # numpy scalars
+    except (TypeError, ValueError):
+        return str(o)
+
+def _json_safe(o):
+    """NaN/inf -> None (bare NaN isn't JSON), recursively through the row."""
+    if isinstance(o, float):
+        return o if math.isfinite(o) else None
+    if isinstance(o, dict):
+        return {k: _json_safe(v) for k, v in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [_json_safe(v) for v in o]
+    if hasattr(o, "item") and not hasattr(o, "__len__"): # numpy scalar
+        return _json_safe(o.item())
+    return o
+
+def run_batch(symbols, workers=8):
+    """
+    Analyses symbols concurrently. Yields (symbol, row, seconds, error)
+    as each one finishes; row is None when there's no data.
+    """
+    def job(symbol):
+        t0 = time.perf_counter()
+        row = analyze_single_stock(symbol, return_any_data=True)
+        return row, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(job, s): s for s in symbols}
+        for fut in as_completed(futures):
+            symbol = futures[fut]
+            try:
+                row, secs = fut.result()
+                if row: row.pop("History", None) # raw candles aren't output
+                yield symbol, row, secs, None
+            except Exception as e:
+                yield symbol, None, 0.0, str(e)
+
+def _print_summary(timings, failed, empty, wall, out=sys.stderr):
+    timings = sorted(timings)
+    n = len(timings)
+    print("\n--- Batch summary ---", file=out)
+    print(f"Analysed: {n}  No data: {len(empty)}  Failed: {len(failed)}  Wall: {wall:.1f}s", file=out)
+    if n:
+        p95 = timings[min(n - 1, int(n * 0.95))]
+        print(f"Per symbol: mean {sum(timings) / n:.2f}s  p95 {p95:.2f}s  max {timings[-1]:.2f}s  "
+              f"throughput {n / max(wall, 1e-9):.1f} symbols/s", file=out)
+    for symbol, err in failed:
+        print(f"  ❌ {symbol}: {err}", file=out)
+
+def batch_main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch analysis (no prompts)")
+    parser.add_argument("symbols", nargs="*", help="symbols, e.g. RELIANCE SBIN CL=F")
+    parser.add_argument("-u", "--universe", help="file with symbols (one per line or comma separated)")
+    parser.add_argument("--nifty", action="store_true", help="analyse the default Nifty universe")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="concurrent analyses (default 8)")
+    parser.add_argument("-f", "--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (jsonl only)")
+    args = parser.parse_args(argv)
+
+    raw = list(args.symbols)
+    if args.universe: raw += load_universe(args.universe)
+    if args.nifty:
+        from data_engine import get_nifty500_tickers
+        raw += get_nifty500_tickers()
+    symbols = list(dict.fromkeys(s for s in map(normalize_symbol, raw) if s))
+    if not symbols:
+        parser.error("no symbols given (pass symbols, --universe or --nifty)")
+    if args.format == "parquet" and args.output == "-":
+        parser.error("parquet needs --output FILE")
+
+    print(f"Analysing {len(symbols)} symbols with {args.workers} workers...", file=sys.stderr)
+    timings, failed, empty = [], [], []
+    t0 = time.perf_counter()
+    # Rows go to the real stdout; everything the analysis prints goes to stderr
+    stdout = sys.stdout
+
+    def rows():
+        for symbol, row, secs, err in run_batch(symbols, args.workers):
+            if err: failed.append((symbol, err)); continue
+            if not row: empty.append(symbol); continue
+            timings.append(secs)
+            yield row
+
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.format == "jsonl":
+            out = stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+            try:
+                for row in rows():
+                    out.write(json.dumps(_json_safe(row), default=_json_default, allow_nan=False) + "\n")
+                    out.flush() # stream: consumers see each symbol as it finishes
+            finally:
+                if out is not stdout: out.close()
+        else:
+            from report_generator import write_parquet_report
+            write_parquet_report(args.output, rows())
+
+    _print_summary(timings, failed, empty, time.perf_counter() - t0)
+    return 0 if timings else 1
+
 if __name__ == "__main__":
+    # No arguments -> the interactive menu, as before
+    if len(sys.argv) > 1:
+        sys.exit(batch_main())
     main()
@@ -0,0 +1,184 @@
+import threading
+import datetime as dt
+from zoneinfo import ZoneInfo
+
+UTC = dt.timezone.utc
+
+# --- EXCHANGE SESSIONS ---
+# "days" are the weekdays (Mon=0) on which a session OPENS.
+# If close <= open the session runs overnight and closes the next day.
+SESSIONS = {
+    "NSE": {
+        "tz": "Asia/Kolkata",
+        "open": dt.time(9, 15),
+        "close": dt.time(15, 30),
+        "days": {0, 1, 2, 3, 4}
+    },
+    # yfinance "=F" tickers are CME Globex futures:
+    # Sun 17:00 CT -> Fri 16:00 CT with a daily 16:00-17:00 maintenance break.
+    "COMMODITY": {
+        "tz": "America/Chicago",
+        "open": dt.time(17, 0),
+        "close": dt.time(16, 0),
+        "days": {6, 0, 1, 2, 3}
+    }
+}
+
+BAR_MINUTES = 15
+# Seconds to wait after a bar closes so the data vendor has published it
+BAR_GRACE_SECONDS = 20
+
+
+def session_for_ticker(ticker):
+    """
+    Maps a ticker to the exchange session it trades in.
+    """
+    return "COMMODITY" if ticker.endswith("=F") else "NSE"
+
+
+def _now():
+    return dt.datetime.now(UTC)
+
+
+def _session_window(session, now):
+    """
+    Returns (open, close) in UTC of the session that contains `now`,
+    or of the next one to open if the market is currently closed.
+    """
+    cfg = SESSIONS[session]
+    tz = ZoneInfo(cfg["tz"])
+    local_now = now.astimezone(tz)
+
+    # Start a day back so an overnight session that opened yesterday is found
+    for offset in range(-1, 8):
+        day = local_now.date() + dt.timedelta(days=offset)
+        if day.weekday() not in cfg["days"]: continue
+
+        open_dt = dt.datetime.combine(day, cfg["open"], tzinfo=tz)
+        close_day = day if cfg["close"] > cfg["open"] else day + dt.timedelta(days=1)
+        close_dt = dt.datetime.combine(close_day, cfg["close"], tzinfo=tz)
+
+        # Do the arithmetic in UTC so DST transitions are handled correctly
+        open_utc, close_utc = open_dt.astimezone(UTC), close_dt.astimezone(UTC)
+        if close_utc > now:
+            return open_utc, close_utc
+
+    return None, None
+
+
+def is_market_open(session, now=None):
+    """
+    True if the given session is trading right now.
+    """
+    now = now or _now()
+    open_dt, close_dt = _session_window(session, now)
+    return open_dt is not None and open_dt <= now < close_dt
+
+
+def next_bar_close(session, now=None, interval=BAR_MINUTES):
+    """
+    Returns the UTC time of the next bar close for the session.
+    Bars are aligned to the session open (NSE 09:15, 09:30, ...).
+    Closed markets roll forward to the first bar of the next session.
+    """
+    now = now or _now()
+    open_dt, close_dt = _session_window(session, now)
+    if open_dt is None: return None
+
+    step = dt.timedelta(minutes=interval)
+    if now < open_dt:
+        return min(open_dt + step, close_dt)
+
+    bars_done = (now - open_dt) // step
+    return min(open_dt + (bars_done + 1) * step, close_dt)
+
+
+def last_bar_close(session, now=None, interval=BAR_MINUTES):
+    """
+    Returns the UTC time of the most recent bar close at or before `now`.
+    When the market is closed this is the close of the last session.
+    """
+    now = now or _now()
+    cfg = SESSIONS[session]
+    tz = ZoneInfo(cfg["tz"])
+    local_now = now.astimezone(tz)
+    step = dt.timedelta(minutes=interval)
+
+    for offset in range(0, -8, -1):
+        day = local_now.date() + dt.timedelta(days=offset)
+        if day.weekday() not in cfg["days"]: continue
+
+        open_dt = dt.datetime.combine(day, cfg["open"], tzinfo=tz).astimezone(UTC)
+        close_day = day if cfg["close"] > cfg["open"] else day + dt.timedelta(days=1)
+        close_dt = dt.datetime.combine(close_day, cfg["close"], tzinfo=tz).astimezone(UTC)
+
+        # Session must have completed at least one bar by now
+        if open_dt + step > now: continue
+        if now >= close_dt:
+            return close_dt
+        return open_dt + ((now - open_dt) // step) * step
+
+    return None
+
+
+def drop_forming_bar(df, interval=BAR_MINUTES, now=None):
+    """
+    Removes the last row if its bar has not closed yet.
+    yfinance returns the in-progress candle as the final row.
+    """
+    if df is None or df.empty: return df
+    now = now or _now()
+
+    last_start = df.index[-1]
+    if last_start.tzinfo is None:
+        # Naive timestamps can't be compared safely, keep the frame as is
+        return df
+
+    if last_start + dt.timedelta(minutes=interval) > now:
+        return df.iloc[:-1]
+    return df
+
+
+class BarTracker:
+    """
+    Remembers the last bar seen per ticker so a cycle can skip
+    instruments that have not printed a new candle.
+    """
+    def __init__(self):
+        self._last_bar = {}
+        self._lock = threading.Lock()
+
+    def is_new(self, ticker, bar_time):
+        """Returns True (and records it) if bar_time is newer than the last one seen."""
+        with self._lock:
+            last = self._last_bar.get(ticker)
+            if last is not None and bar_time <= last:
+                return False
+            self._last_bar[ticker] = bar_time
+            return True
+
+    def last_bar(self, ticker):
+        with self._lock:
+            return self._last_bar.get(ticker)
+
+
+def wait_for_next_bar(sessions=None, interval=BAR_MINUTES, grace=BAR_GRACE_SECONDS, sleep=None):
+    """
+    Sleeps until just after the next bar close across the given sessions.
+    Returns the list of sessions whose bar just closed.
+    """
+    import time
+    sleep = sleep or time.sleep
+    sessions = sessions or list(SESSIONS.keys())
+
+    now = _now()
+    due = {s: next_bar_close(s, now, interval) for s in sessions}
+    due = {s: t for s, t in due.items() if t is not None}
+    if not due: return []
+
+    fire_at = min(due.values())
+    delay = (fire_at - now).total_seconds() + grace
+    if delay > 0:
+        sleep(delay)
+
+    return [s for s, t in due.items() if t == fire_at]
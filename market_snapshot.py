@@ -0,0 +1,154 @@
+import time
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from ttl_cache import TTLCache
+
+# --- INSTRUMENTS ---
+DOMESTIC_INDICES = {
+    "NIFTY 50": "^NSEI",
+    "BANK NIFTY": "^NSEBANK",
+    "INDIA VIX": "^INDIAVIX"
+}
+GLOBAL_INDICES = {
+    "S&P 500": "^GSPC",
+    "NASDAQ": "^IXIC",
+    "DOW JONES": "^DJI",
+    "NIKKEI 225": "^N225",
+    "HANG SENG": "^HSI",
+    "CRUDE OIL": "CL=F",
+    "USD/INR": "INR=X"
+}
+
+# How each global cue moves Indian equities: +1 risk-on when it rises,
+# -1 when a rise hurts (India imports crude; a weaker rupee means outflows)
+SENTIMENT_WEIGHTS = {
+    "S&P 500": 1.0,
+    "NASDAQ": 1.0,
+    "DOW JONES": 0.5,
+    "NIKKEI 225": 0.75,
+    "HANG SENG": 0.75,
+    "CRUDE OIL": -0.5,
+    "USD/INR": -1.0
+}
+# One cue can't dominate the score (e.g. a 6% crude spike)
+MAX_CUE_MOVE = 2.0
+# Weighted average move (%) beyond which the mood is called
+SENTIMENT_THRESHOLD = 0.3
+FLAT_MOVE = 0.1 # |change %| below this is "Flat"
+
+SNAPSHOT_TTL_SECONDS = 60
+SNAPSHOT_STALE_SECONDS = 300
+
+_CACHE = TTLCache(SNAPSHOT_TTL_SECONDS, SNAPSHOT_STALE_SECONDS, 1, name="market snapshot")
+_POOL = ThreadPoolExecutor(max_workers=len(DOMESTIC_INDICES) + len(GLOBAL_INDICES),
+                           thread_name_prefix="market")
+
+
+def fetch_quote(symbol):
+    """
+    Last price vs previous session close from daily bars
+    (5d so a holiday or weekend still leaves two closes).
+    """
+    import yfinance as yf
+    df = yf.Ticker(symbol).history(period="5d", interval="1d", auto_adjust=True)
+    if df is None or len(df) < 2: return None
+    last, prev = float(df['Close'].iloc[-1]), float(df['Close'].iloc[-2])
+    change = (last - prev) / prev * 100 if prev else 0.0
+    return {
+        "Last Price": round(last, 2),
+        "Previous Close": round(prev, 2),
+        "Change %": round(change, 2),
+        "Trend": "Flat" if abs(change) < FLAT_MOVE else "Bullish" if change > 0 else "Bearish"
+    }
+
+
+def global_sentiment(global_indices):
+    """
+    Weighted average of the global cues' % moves (each clipped to
+    ±MAX_CUE_MOVE). Returns (label, score).
+    """
+    total = weight = 0.0
+    for name, w in SENTIMENT_WEIGHTS.items():
+        quote = global_indices.get(name)
+        if not quote: continue
+        move = max(-MAX_CUE_MOVE, min(MAX_CUE_MOVE, quote["Change %"]))
+        total += w * move
+        weight += abs(w)
+    if weight == 0:
+        return "Neutral", 0.0
+
+    score = round(total / weight, 2)
+    if score >= SENTIMENT_THRESHOLD: return "Bullish", score
+    if score <= -SENTIMENT_THRESHOLD: return "Bearish", score
+    return "Neutral", score
+
+
+def build_snapshot(fetch=fetch_quote):
+    """
+    Fetches every index concurrently. Result has the market_data keys
+    main.py / report_generator use (Global_Sentiment, Global_Indices,
+    Domestic_Status) plus Global_Score and Fetched_At.
+    """
+    symbols = {**DOMESTIC_INDICES, **GLOBAL_INDICES}
+
+    def safe(symbol):
+        try:
+            return fetch(symbol)
+        except Exception as e:
+            print(f"⚠️ Market snapshot: {symbol} failed: {e}")
+            return None
+
+    futures = {name: _POOL.submit(safe, sym) for name, sym in symbols.items()}
+    quotes = {name: f.result() for name, f in futures.items()}
+    if not any(quotes.values()):
+        # Raising keeps the last good snapshot in the cache
+        raise RuntimeError("no market data fetched")
+
+    domestic = {n: quotes[n] for n in DOMESTIC_INDICES if quotes[n]}
+    global_indices = {n: quotes[n] for n in GLOBAL_INDICES if quotes[n]}
+    label, score = global_sentiment(global_indices)
+    return {
+        "Global_Sentiment": label,
+        "Global_Score": score,
+        "Global_Indices": global_indices,
+        "Domestic_Status": domestic,
+        "Fetched_At": dt.datetime.now().strftime('%H:%M:%S')
+    }
+
+
+def get_market_snapshot():
+    """
+    Shared, cached market overview (fresh for a minute, then served stale
+    while it refreshes in the background). Empty dicts if nothing could be
+    fetched yet.
+    """
+    try:
+        return _CACHE.get_or_load("snapshot", build_snapshot)
+    except Exception as e:
+        print(f"❌ Market snapshot unavailable: {e}")
+        return {"Global_Sentiment": "Neutral", "Global_Score": 0.0,
+                "Global_Indices": {}, "Domestic_Status": {}, "Fetched_At": None}
+
+
+def market_snapshot_stats():
+    return _CACHE.stats()
+
+
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    import random
+
+    def fake_fetch(symbol):
+        time.sleep(0.3) # typical yfinance round trip
+        change = random.uniform(-1.5, 1.5)
+        return {"Last Price": 100 + change, "Previous Close": 100.0, "Change %": round(change, 2),
+                "Trend": "Bullish" if change > 0 else "Bearish"}
+
+    n = len(DOMESTIC_INDICES) + len(GLOBAL_INDICES)
+    t0 = time.perf_counter()
+    snap = build_snapshot(fake_fetch)
+    t_par = time.perf_counter() - t0
+    print(f"{n} instruments: concurrent {t_par:.2f}s vs sequential ~{n * 0.3:.1f}s")
+    print(f"Global sentiment: {snap['Global_Sentiment']} ({snap['Global_Score']})")
+    for name, q in snap["Global_Indices"].items():
+        print(f"  {name:12s} {q['Change %']:+.2f}%")
@@ -1,9 +1,8 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+# sklearn is imported inside train_and_predict: it takes longer to import
+# than everything else the scanner needs, and only the ML boost uses it
 
 def prepare_features(df):
     """
@@ -55,6 +54,8 @@ def train_and_predict(df, ticker):
     Trains a Random Forest on the fly and returns probability.
     """
     try:
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import train_test_split
         if len(df) < 200: 
             return 50 # Not enough data
             
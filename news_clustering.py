@@ -0,0 +1,294 @@
+import zlib
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# Same cut-off group_news has always used
+SIMILARITY_THRESHOLD = 0.45
+
+# Character shingles: near-duplicates at ratio > 0.45 reliably share 3-grams
+# even when they share no whole words ("Sensex, Nifty end higher" ...)
+SHINGLE_SIZE = 3
+
+# Banded MinHash: a leader is a candidate only if all LSH_ROWS min-hashes of
+# at least one band match. Two headlines with shingle Jaccard J collide with
+# probability 1 - (1 - J**3)**20: ~0.93 at J=0.5, ~0.42 at J=0.3, ~0.02 at
+# J=0.1, so rewordings of the same story meet and unrelated ones rarely do.
+LSH_BANDS = 20
+LSH_ROWS = 3
+LSH_SEED = 1
+_HASH_PRIME = 4294967311 # first prime above 2**32
+
+# ratio() > t needs more than t * len(shorter) matched characters, so a real
+# near-duplicate shares a good part of the shorter headline's shingles.
+# Half of that is kept as a cheap set-intersection pre-check.
+MIN_SHARED = SIMILARITY_THRESHOLD / 2
+
+
+def headline_shingles(text, q=SHINGLE_SIZE):
+    """
+    Set of character q-grams of a lower-cased headline.
+    """
+    return {text[i:i + q] for i in range(len(text) - q + 1)}
+
+
+def char_masks(text):
+    """
+    Bit mask of the positions of every character, for lcs_length.
+    """
+    masks = {}
+    for i, ch in enumerate(text):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks
+
+
+def lcs_length(a, masks, b):
+    """
+    Longest common subsequence of a and b (bit-parallel, one big-int step
+    per character of b; masks = char_masks(a)). SequenceMatcher's matching
+    blocks are a common subsequence, so 2 * lcs / (len(a) + len(b)) is an
+    upper bound of ratio() at a fraction of its cost.
+    """
+    full = (1 << len(a)) - 1
+    v = full
+    for ch in b:
+        u = v & masks.get(ch, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(a) - bin(v).count("1")
+
+
+class MinHasher:
+    """
+    Fixed random permutations (a * x + b mod p) over crc32 shingle hashes.
+    Seeded, so signatures are stable between runs and processes.
+    """
+    def __init__(self, bands=LSH_BANDS, rows=LSH_ROWS, seed=LSH_SEED):
+        rng = np.random.default_rng(seed)
+        k = bands * rows
+        self.bands, self.rows = bands, rows
+        self._a = rng.integers(1, 1 << 31, k, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, k, dtype=np.uint64)
+
+    def band_keys(self, shingles):
+        """
+        One bytes key per band of the MinHash signature.
+        """
+        if shingles:
+            h = np.fromiter((zlib.crc32(g.encode()) for g in shingles), dtype=np.uint64, count=len(shingles))
+            # a, b < 2**31 and h < 2**32, so a * h + b fits in uint64
+            sig = ((np.outer(self._a, h) + self._b[:, None]) % np.uint64(_HASH_PRIME)).min(axis=1)
+        else:
+            sig = np.zeros(self.bands * self.rows, dtype=np.uint64)
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+
+class HeadlineClusterer:
+    """
+    Greedy near-duplicate clustering of headlines.
+
+    Headlines are added newest first. Each one joins the earliest cluster
+    leader it is similar to (SequenceMatcher ratio > threshold), otherwise
+    it starts a new cluster - the same rule as the old pairwise loop in
+    group_news. Leaders are kept in banded MinHash buckets, so only leaders
+    with a matching band are candidates (a roughly constant number per
+    headline instead of every leader). Candidates then need MIN_SHARED of
+    the shorter headline's shingles and must pass the ratio upper bounds
+    (quick_ratio, then the LCS) before the exact SequenceMatcher ratio.
+    """
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, min_shared=MIN_SHARED):
+        self.threshold = threshold
+        self.min_shared = min_shared
+        self.leaders = [] # lower-cased leader headlines
+        self._masks = [] # char_masks per leader
+        self._shingles = [] # shingle set per leader
+        self._hasher = MinHasher()
+        self._buckets = [defaultdict(list) for _ in range(self._hasher.bands)] # band key -> leader ids
+        self.candidates = 0
+        self.comparisons = 0 # full ratio() calls
+
+    def _similar(self, sm, lid, text, shingles):
+        # sm already holds the new headline as seq2, so its index is built once
+        self.candidates += 1
+        other = self._shingles[lid]
+        if len(shingles & other) < self.min_shared * min(len(shingles), len(other)): return False
+        leader = self.leaders[lid]
+        sm.set_seq1(leader)
+        t = self.threshold
+        if not (sm.real_quick_ratio() > t and sm.quick_ratio() > t): return False
+        if 2 * lcs_length(leader, self._masks[lid], text) / (len(leader) + len(text)) <= t: return False
+        self.comparisons += 1
+        return sm.ratio() > t
+
+    def _candidates(self, keys):
+        ids = set()
+        for bucket, key in zip(self._buckets, keys):
+            ids.update(bucket.get(key, ()))
+        return sorted(ids)
+
+    def add(self, headline):
+        """
+        Returns (leader_id, is_new_leader).
+        """
+        text = headline.lower()
+        shingles = headline_shingles(text)
+        keys = self._hasher.band_keys(shingles)
+
+        # Earliest leader first, like the original scan order
+        sm = SequenceMatcher(None, "", text)
+        for lid in self._candidates(keys):
+            if self._similar(sm, lid, text, shingles):
+                return lid, False
+
+        lid = len(self.leaders)
+        self.leaders.append(text)
+        self._masks.append(char_masks(text))
+        self._shingles.append(shingles)
+        for bucket, key in zip(self._buckets, keys):
+            bucket[key].append(lid)
+        return lid, True
+
+
+def cluster_headlines(headlines, threshold=SIMILARITY_THRESHOLD):
+    """
+    Clusters headlines (already ordered newest first).
+    Returns a list of clusters, each a list of indices with the leader first.
+    """
+    clusterer = HeadlineClusterer(threshold)
+    clusters = []
+    for i, h in enumerate(headlines):
+        lid, is_new = clusterer.add(h)
+        if is_new:
+            clusters.append([i])
+        else:
+            clusters[lid].append(i)
+    return clusters
+
+
+# --- BENCHMARK ---
+def _pairwise_reference(headlines, threshold=SIMILARITY_THRESHOLD):
+    """The original O(n^2) group_news loop, kept for comparison."""
+    processed = set()
+    clusters = []
+    comparisons = 0
+    for i, a in enumerate(headlines):
+        if i in processed: continue
+        processed.add(i)
+        group = [i]
+        for j in range(i + 1, len(headlines)):
+            if j in processed: continue
+            comparisons += 1
+            if SequenceMatcher(None, a.lower(), headlines[j].lower()).ratio() > threshold:
+                group.append(j)
+                processed.add(j)
+        clusters.append(group)
+    return clusters, comparisons
+
+
+def _synthetic_headlines(n, seed=7, with_story=False):
+    """
+    Feed-like corpus: distinct stories, each carried by 1-3 sources with
+    different prefixes/suffixes and small rewordings. with_story=True
+    returns (headline, story id) pairs.
+    """
+    import random
+    rnd = random.Random(seed)
+    companies = ["Reliance", "HDFC Bank", "Infosys", "TCS", "ICICI Bank", "SBI", "Tata Steel",
+                 "Adani Ports", "Wipro", "Maruti", "Bajaj Finance", "ITC", "Larsen", "Titan",
+                 "Sun Pharma", "NTPC", "ONGC", "Zomato", "Paytm", "Coal India", "Hindalco",
+                 "Asian Paints", "Cipla", "Dr Reddy's", "Eicher Motors", "Grasim", "Britannia",
+                 "Tech Mahindra", "Divi's Labs", "Apollo Hospitals", "UPL", "BHEL", "Vedanta",
+                 "Nestle India", "Pidilite", "DLF", "Bharti Airtel", "IndusInd Bank", "Axis Bank"]
+    events = ["shares surge {p}% after strong Q{q} results", "slumps {p}% as margins weaken in Q{q}",
+              "announces dividend of Rs {p} per share", "gets upgrade from Morgan Stanley, target raised {p}%",
+              "hits record high on buying by FIIs", "falls {p}% on block deal", "board approves buyback worth Rs {p}00 crore",
+              "Q{q} profit jumps {p}% beating estimates", "faces SEBI probe over disclosures", "to raise Rs {p}000 crore via QIP",
+              "signs ${p} billion deal with European client", "CEO resigns citing personal reasons",
+              "plans to enter electric vehicle market", "cuts FY{q}5 guidance on weak demand",
+              "wins government contract worth Rs {p}00 crore", "promoters pledge {p}% stake"]
+    context = ["", "", "", " amid weak global cues", " as investors book profits", " ahead of RBI policy",
+               " despite rupee weakness", " on heavy volumes", " in a volatile session"]
+    prefixes = ["", "", "Breaking: ", "Stock Market Today: ", "Markets: "]
+    suffixes = ["", "", " - report", " | Details here", ", analysts say"]
+
+    vocab = ("inflation tariffs semiconductor monsoon fertiliser railway airline telecom spectrum auction "
+             "insurance premium pension budget deficit subsidy export import freight shipping container port "
+             "cement housing realty mortgage lender microfinance startup unicorn funding valuation listing "
+             "debut subscription anchor investors pharma vaccine approval patent lawsuit tribunal merger "
+             "acquisition stake demerger restructuring layoffs hiring wages consumption rural urban retail "
+             "festive sales automobile tractor twowheeler battery lithium solar wind hydrogen coal power "
+             "grid tariff discom steel aluminium copper zinc gold silver crude refinery petrol diesel gas "
+             "pipeline bond yields treasury dollar rupee forex reserves liquidity repo inflation growth gdp "
+             "manufacturing services pmi exports jobs unemployment election policy reform regulator sebi rbi "
+             "sovereign rating downgrade outlook guidance margin earnings revenue orderbook capex").split()
+
+    out, stories = [], []
+    while len(out) < n:
+        if rnd.random() < 0.5:
+            story = f"{rnd.choice(companies)} {rnd.choice(events)}{rnd.choice(context)}"
+        else:
+            story = " ".join(rnd.sample(vocab, rnd.randint(6, 10))).capitalize()
+        story = story.format(p=rnd.randint(1, 9), q=rnd.randint(1, 4))
+        for _ in range(rnd.randint(1, 3)):
+            out.append((rnd.choice(prefixes) + story + rnd.choice(suffixes), len(stories)))
+        stories.append(story)
+    rnd.shuffle(out)
+    return out[:n] if with_story else [h for h, _ in out[:n]]
+
+
+def _story_quality(clusters, story):
+    """
+    (same-story pair recall %, cross-story pairs merged) of a clustering.
+    """
+    from collections import Counter
+    same = cross = 0
+    for g in clusters:
+        per_story = Counter(story[i] for i in g)
+        pairs = len(g) * (len(g) - 1) // 2
+        s = sum(c * (c - 1) // 2 for c in per_story.values())
+        same += s
+        cross += pairs - s
+    total = sum(c * (c - 1) // 2 for c in Counter(story).values())
+    return same / max(total, 1) * 100, cross
+
+
+def run_benchmark(sizes=(100, 300, 1000, 3000)):
+    """
+    The greedy pairwise loop is not a gold standard: a chain of loosely
+    similar headlines (same company, same template) pulls unrelated stories
+    into one group. So both are scored against the story ids of the corpus;
+    the index must find at least as many same-story pairs and merge no more
+    different stories than the pairwise loop did.
+    """
+    import time
+    for n in sizes:
+        pairs = _synthetic_headlines(n, with_story=True)
+        heads = [h for h, _ in pairs]
+        story = [s for _, s in pairs]
+
+        t0 = time.perf_counter()
+        ref, pairwise_cmp = _pairwise_reference(heads)
+        t_ref = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        clusterer = HeadlineClusterer()
+        new = []
+        for i, h in enumerate(heads):
+            lid, is_new = clusterer.add(h)
+            if is_new: new.append([i])
+            else: new[lid].append(i)
+        t_new = time.perf_counter() - t0
+
+        ref_recall, ref_cross = _story_quality(ref, story)
+        new_recall, new_cross = _story_quality(new, story)
+
+        print(f"n={n:5d}  pairwise {t_ref*1000:8.1f} ms  indexed {t_new*1000:7.1f} ms  "
+              f"speedup {t_ref / max(t_new, 1e-9):4.1f}x  ratio() calls {pairwise_cmp}/{clusterer.comparisons} "
+              f"({clusterer.candidates} candidates)  groups {len(ref)}/{len(new)}  "
+              f"same-story recall {ref_recall:5.1f}%/{new_recall:5.1f}%  cross-story pairs {ref_cross}/{new_cross}")
+        assert new_recall >= ref_recall and new_cross <= ref_cross
+
+
+if __name__ == "__main__":
+    run_benchmark()
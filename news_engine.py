@@ -3,8 +3,18 @@ import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import threading
+import hashlib
+import json
 import html
+import io
+import os
 import re
+from sentiment_engine import get_default_scorer
+from ttl_cache import TTLCache
 
 # List of RSS Feeds
 # List of RSS Feeds
@@ -65,156 +75,378 @@ RSS_FEEDS = [
 def calculate_sentiment_score(text):
     """
     Calculates detailed sentiment score [-10 to +10].
+    Word-boundary lexicon match, see sentiment_engine.
     """
-    score = 0
-    text_lower = text.lower()
-    
-    # Weighted Keywords
-    weights = {
-        'surge': 3, 'skyrocket': 3, 'jump': 2, 'gain': 2, 'rally': 2, 'hit upper circuit': 4,
-        'profit': 2, 'growth': 1, 'record': 2, 'strong': 1, 'dividend': 2, 'buy': 1, 
-        'upgrade': 2, 'positive': 1, 'bull': 1,
-        
-        'crash': -3, 'plunge': -3, 'slump': -2, 'tank': -3, 'fall': -1, 'drop': -1, 
-        'loss': -2, 'weak': -1, 'sell': -1, 'debt': -1, 'downgrade': -2, 'negative': -1,
-        'bear': -1, 'concern': -1, 'warning': -1
-    }
+    return get_default_scorer().score(text)
+
+# --- HTTP (pooled session + conditional GET cache) ---
+HTTP_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+FEED_TIMEOUT = 5
+FEED_CACHE_SIZE = 256 # market feeds + per-ticker Google News queries
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+# url -> {"etag": str, "last_modified": str, "items": [...]}
+_FEED_CACHE = OrderedDict()
+_FEED_CACHE_LOCK = threading.Lock()
+
+def get_http_session():
+    """
+    Shared keep-alive session sized for all feeds being fetched at once.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            adapter = HTTPAdapter(pool_connections=len(RSS_FEEDS) + 4, pool_maxsize=len(RSS_FEEDS) + 4)
+            _SESSION = requests.Session()
+            _SESSION.headers.update(HTTP_HEADERS)
+            _SESSION.mount("https://", adapter)
+            _SESSION.mount("http://", adapter)
+        return _SESSION
+
+def _cache_get(url):
+    with _FEED_CACHE_LOCK:
+        entry = _FEED_CACHE.get(url)
+        if entry is not None:
+            _FEED_CACHE.move_to_end(url)
+        return entry
+
+def _cache_put(url, entry):
+    with _FEED_CACHE_LOCK:
+        _FEED_CACHE[url] = entry
+        _FEED_CACHE.move_to_end(url)
+        while len(_FEED_CACHE) > FEED_CACHE_SIZE:
+            _FEED_CACHE.popitem(last=False)
+
+def _recent_only(items):
+    """Drops items older than yesterday (cached items age between calls)."""
+    yesterday = datetime.now().date() - timedelta(days=1)
+    return [i for i in items if datetime.fromtimestamp(i['NumericTime']).date() >= yesterday]
+
+# --- SEEN-ITEM INDEX (persisted) ---
+NEWS_STORE_PATH = os.environ.get("NEWS_STORE_PATH", "news_seen.json")
+SEEN_TTL_SECONDS = 3 * 24 * 3600 # keys remembered a bit longer than items are shown
+MAX_SEEN_KEYS = 20000
+# Feeds list newest first: stop parsing after this many items in a row that
+# the same feed already delivered (cross-posts from other feeds don't count)
+STOP_AFTER_KNOWN = 3
+
+def item_key(link, guid, title):
+    """Stable short hash of an item (link first, so cross-feed duplicates collapse)."""
+    ident = link or guid or title or ""
+    return hashlib.sha1(ident.strip().encode("utf-8")).hexdigest()[:16]
+
+class NewsItemStore:
+    """
+    Seen-item index plus the recent scored items, persisted to JSON.
+    Keys expire after SEEN_TTL_SECONDS, items once they are older than
+    yesterday, so the file and memory stay bounded.
+    """
+    def __init__(self, path=NEWS_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seen = {} # key -> first seen epoch
+        self._feed_of = {} # key -> URL of the feed that delivered it first
+        self._items = {} # key -> item dict (recent only)
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._seen = data.get("seen", {})
+                self._feed_of = data.get("feeds", {})
+                self._items = data.get("items", {})
+            except Exception as e:
+                print(f"⚠️ Could not read news store ({e}), starting fresh.")
+        self.expire()
+
+    def is_known(self, key):
+        with self._lock:
+            return key in self._seen
+
+    def marked_by(self, key):
+        """Feed URL that recorded the key (None if unknown or not recorded)."""
+        with self._lock:
+            return self._feed_of.get(key)
+
+    def mark(self, key, feed=None):
+        """Records a key (and the feed it came from). Returns False if it was already known."""
+        with self._lock:
+            if key in self._seen: return False
+            self._seen[key] = datetime.now().timestamp()
+            if feed: self._feed_of[key] = feed
+            self._dirty = True
+            return True
+
+    def add_items(self, items):
+        with self._lock:
+            for item in items:
+                self._items[item['Key']] = item
+            if items: self._dirty = True
+
+    def items(self):
+        with self._lock:
+            return list(self._items.values())
+
+    def expire(self):
+        """Drops old keys/items. Returns True if any item was removed."""
+        now = datetime.now().timestamp()
+        yesterday = datetime.combine(datetime.now().date() - timedelta(days=1), datetime.min.time()).timestamp()
+        with self._lock:
+            self._seen = {k: t for k, t in self._seen.items() if now - t < SEEN_TTL_SECONDS}
+            if len(self._seen) > MAX_SEEN_KEYS:
+                newest = sorted(self._seen.items(), key=lambda kv: kv[1])[-MAX_SEEN_KEYS:]
+                self._seen = dict(newest)
+            self._feed_of = {k: f for k, f in self._feed_of.items() if k in self._seen}
+            before = len(self._items)
+            self._items = {k: i for k, i in self._items.items() if i['NumericTime'] >= yesterday}
+            removed = len(self._items) != before
+            if removed: self._dirty = True
+            return removed
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or not self.path: return
+            data = {"seen": self._seen, "feeds": self._feed_of, "items": self._items}
+            self._dirty = False
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not save news store: {e}")
+
+# --- PARSING ---
+def _iter_feed_items(content):
+    """
+    Streams <item> elements with iterparse and frees each one after use,
+    so a large feed never sits in memory as a full tree.
+    """
+    try:
+        for _, elem in ET.iterparse(io.BytesIO(content), events=("end",)):
+            if elem.tag == 'item':
+                yield elem
+                elem.clear()
+    except ET.ParseError:
+        return
+
+def parse_rss_items(content, source_name, store=None, feed=None):
+    """
+    Parses RSS XML into scored news items from today and yesterday.
+    With a store, items already seen are skipped and parsing stops once
+    STOP_AFTER_KNOWN items this feed delivered before come in a row - only
+    new items are scored. An item is marked seen only once it has parsed.
+    """
+    news_items = []
+    today = datetime.now().date()
+    yesterday = today - timedelta(days=1)
+    known_run = 0
     
-    for word, wt in weights.items():
-        if word in text_lower:
-            score += wt
+    for item in _iter_feed_items(content): 
+        try:
+            title = item.findtext('title')
+            if not title: continue
             
-    # Cap score
-    score = max(min(score, 10), -10)
-    
-    label = "Neutral"
-    if score >= 2: label = "Positive"
-    elif score <= -2: label = "Negative"
+            link = item.findtext('link') or ""
+            key = item_key(link, item.findtext('guid'), title)
+            
+            if store is not None and store.is_known(key):
+                # Another feed's cross-post says nothing about where this feed's new items end
+                if feed and store.marked_by(key) == feed:
+                    known_run += 1
+                    if known_run >= STOP_AFTER_KNOWN: break
+                continue
+            
+            description = item.findtext('description') or ""
+            pub_date_str = item.findtext('pubDate')
+            
+            if '<' in description: 
+                 description = re.sub(re.compile('<.*?>'), '', html.unescape(description))
+
+            try:
+                pub_dt = parsedate_to_datetime(pub_date_str)
+            except:
+                pub_dt = datetime.now()
+            
+            entry = {
+                "Key": key,
+                "Source": source_name,
+                "Time": pub_dt.strftime("%d-%b %H:%M"),
+                "NumericTime": pub_dt.timestamp(),
+                "Headline": title.strip(),
+                "Impact": "Neutral",
+                "Score": 0,
+                "Link": link,
+                "Details": description[:150] + "..." if description else ""
+            }
+            
+            # Parsed fine: only now is it seen (a bad item is retried next time)
+            if store is not None:
+                if not store.mark(key, feed): continue # another feed got there first
+                known_run = 0
+            if pub_dt.date() < yesterday: continue
+            news_items.append(entry)
+        except: continue
     
-    return score, label
+    # Score the whole feed in one batch
+    scores = get_default_scorer().score_many([n['Headline'] for n in news_items])
+    for n, (score, impact) in zip(news_items, scores):
+        n['Score'] = score
+        n['Impact'] = impact
+    return news_items
 
-def fetch_rss_feed(feed_info):
+def fetch_rss_feed(feed_info, store=None):
     """
     Fetches and parsed a single RSS feed with Link extraction and Scouting.
+    Uses ETag/Last-Modified so an unchanged feed costs a 304 and reuses
+    the previously parsed items.
+    With a store (incremental mode) only items not seen before are returned.
     """
-    news_items = []
     source_name = feed_info["Source"]
+    url = feed_info["URL"]
     print(f"Fetching {source_name}...")
     
+    cached = _cache_get(url)
+    headers = {}
+    if cached:
+        if cached.get("etag"): headers['If-None-Match'] = cached["etag"]
+        if cached.get("last_modified"): headers['If-Modified-Since'] = cached["last_modified"]
+    
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(feed_info["URL"], headers=headers, timeout=5)
+        response = get_http_session().get(url, headers=headers, timeout=FEED_TIMEOUT)
+        
+        if response.status_code == 304 and cached:
+            return [] if store is not None else _recent_only(cached["items"])
         
         if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.content)
-            except: return []
-
-            today = datetime.now().date()
-            yesterday = today - timedelta(days=1)
-            
-            for item in root.findall('.//item'): 
-                try:
-                    title = item.find('title').text
-                    if not title: continue
-                    
-                    description = item.find('description').text or ""
-                    link = item.find('link').text or ""
-                    pub_date_str = item.find('pubDate').text 
-                    
-                    if '<' in description: 
-                         description = re.sub(re.compile('<.*?>'), '', html.unescape(description))
-
-                    try:
-                        pub_dt = parsedate_to_datetime(pub_date_str)
-                        pub_date = pub_dt.date() 
-                    except:
-                        pub_date = today 
-                    
-                    if pub_date < yesterday: continue
-                    
-                    score, impact = calculate_sentiment_score(title)
-                    
-                    news_items.append({
-                        "Source": source_name,
-                        "Time": pub_dt.strftime("%d-%b %H:%M"),
-                        "NumericTime": pub_dt.timestamp(),
-                        "Headline": title.strip(),
-                        "Impact": impact,
-                        "Score": score,
-                        "Link": link,
-                        "Details": description[:150] + "..." if description else ""
-                    })
-                except: continue
+            news_items = parse_rss_items(response.content, source_name, store, url)
+            _cache_put(url, {
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+                "items": news_items
+            })
+            return list(news_items)
     except: pass
-    return news_items
+    
+    # Network trouble: serve what we had rather than nothing
+    if store is not None: return []
+    return _recent_only(cached["items"]) if cached else []
 
-from difflib import SequenceMatcher
+from news_clustering import cluster_headlines, HeadlineClusterer
+
+def _new_group(item):
+    return {
+        "Headline": item['Headline'],
+        "Impact": item['Impact'],
+        "Score": item['Score'],
+        "Time": item['Time'],
+        "Link": item['Link'], 
+        "Sources": [item['Source']],
+        "RelatedLinks": [],
+        "NumericTime": item['NumericTime']
+    }
+
+def _merge_into_group(group, other):
+    # We'll just list additional sources
+    if other['Source'] not in group['Sources']:
+        group['Sources'].append(other['Source'])
+        group['RelatedLinks'].append(other['Link'])
 
 def group_news(news_list):
     """
     Groups similar news headlines together.
+    Near-duplicates (45% similarity) are found via the MinHash LSH index in
+    news_clustering instead of comparing every pair.
     """
     if not news_list: return []
     
     grouped = []
-    processed_indices = set()
     
     # Sort by time first
     news_list.sort(key=lambda x: x['NumericTime'], reverse=True)
     
-    for i, item in enumerate(news_list):
-        if i in processed_indices: continue
-        
-        current_group = {
-            "Headline": item['Headline'],
-            "Impact": item['Impact'],
-            "Score": item['Score'],
-            "Time": item['Time'],
-            "Link": item['Link'], 
-            "Sources": [item['Source']],
-            "RelatedLinks": []
-        }
-        
-        processed_indices.add(i)
-        
-        # Check against following items
-        for j in range(i+1, len(news_list)):
-            if j in processed_indices: continue
-            
-            other = news_list[j]
-            ratio = SequenceMatcher(None, item['Headline'].lower(), other['Headline'].lower()).ratio()
-            
-            # If 45% similarity found (headlines often vary wildly but share keywords)
-            if ratio > 0.45:
-                # Merge logic: Keep the "Stronger" sentiment or "Newer" one as main?
-                # We'll just list additional sources
-                if other['Source'] not in current_group['Sources']:
-                    current_group['Sources'].append(other['Source'])
-                    current_group['RelatedLinks'].append(other['Link'])
-                
-                # If the other one has a more intense score, verify if we should swap? NO, keep newest.
-                processed_indices.add(j)
-                
+    clusters = cluster_headlines([item['Headline'] for item in news_list])
+    
+    for members in clusters:
+        current_group = _new_group(news_list[members[0]]) # Newest item leads the group
+        for j in members[1:]:
+            _merge_into_group(current_group, news_list[j])
         grouped.append(current_group)
         
     return grouped
 
+class MarketNewsBook:
+    """
+    Incremental market news state: the persisted item store plus the
+    current headline groups. Each refresh only scores and clusters the
+    items that are new since the last one. Groups are rebuilt from the
+    store only when old items expire.
+    """
+    def __init__(self, store=None):
+        self.store = store or NewsItemStore()
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self._clusterer = HeadlineClusterer()
+        self._groups = []
+        self._add(self.store.items())
+
+    def _add(self, items):
+        items = sorted(items, key=lambda x: x['NumericTime'], reverse=True)
+        for item in items:
+            lid, is_new = self._clusterer.add(item['Headline'])
+            if is_new:
+                self._groups.append(_new_group(item))
+            else:
+                _merge_into_group(self._groups[lid], item)
+
+    def refresh(self):
+        # All feeds in parallel: latency is bounded by the slowest single feed
+        with ThreadPoolExecutor(max_workers=len(RSS_FEEDS)) as executor:
+            feed_results = list(executor.map(lambda f: fetch_rss_feed(f, self.store), RSS_FEEDS))
+        
+        new_items = [item for items in feed_results for item in items]
+        
+        with self._lock:
+            self.store.add_items(new_items)
+            if self.store.expire():
+                self._rebuild()
+            else:
+                self._add(new_items)
+            self.store.save()
+            return self.groups()
+
+    def groups(self):
+        return sorted(self._groups, key=lambda g: g['NumericTime'], reverse=True)
+
+    def items(self):
+        return self.store.items()
+
+_NEWS_BOOK = None
+_NEWS_BOOK_LOCK = threading.Lock()
+
+def get_news_book():
+    global _NEWS_BOOK
+    with _NEWS_BOOK_LOCK:
+        if _NEWS_BOOK is None:
+            _NEWS_BOOK = MarketNewsBook()
+        return _NEWS_BOOK
+
 def fetch_market_news():
     """
     Aggregates, deduplicates and groups news.
+    Incremental: only headlines not seen before are parsed, scored and grouped.
     """
-    all_news = []
-    seen_urls = set()
-    
-    for feed in RSS_FEEDS:
-        items = fetch_rss_feed(feed)
-        for item in items:
-            if item['Link'] not in seen_urls:
-                seen_urls.add(item['Link'])
-                all_news.append(item)
-                
-    return group_news(all_news)
+    return get_news_book().refresh()
+
+def get_recent_news_items():
+    """
+    Flat list of recent market news items (today and yesterday), ungrouped.
+    """
+    return get_news_book().items()
 
 def fetch_stock_specific_news(ticker):
     """
@@ -240,3 +472,34 @@ def fetch_stock_specific_news(ticker):
     # Deduplicate and basic clean
     # Return top 10 relevant items
     return items[:10]
+
+# --- SHARED NEWS CACHE ---
+# One cache per process, shared by every dashboard session, Deep Analysis,
+# the institutional engine and the Gemini prompt. Fresh for NEWS_TTL, then
+# served stale for up to NEWS_STALE_TTL while a background refresh runs.
+NEWS_TTL_SECONDS = 300
+NEWS_STALE_SECONDS = 1800
+STOCK_NEWS_CACHE_SIZE = 200
+
+_STOCK_NEWS_CACHE = TTLCache(NEWS_TTL_SECONDS, NEWS_STALE_SECONDS, STOCK_NEWS_CACHE_SIZE, name="stock news")
+_MARKET_NEWS_CACHE = TTLCache(NEWS_TTL_SECONDS, NEWS_STALE_SECONDS, 1, name="market news")
+
+def get_stock_news(ticker):
+    """
+    Cached fetch_stock_specific_news, keyed by symbol (".NS"/".BO" ignored).
+    """
+    key = ticker.replace(".NS", "").replace(".BO", "").upper()
+    return _STOCK_NEWS_CACHE.get_or_load(key, lambda: fetch_stock_specific_news(ticker)) or []
+
+def get_market_news():
+    """
+    Cached fetch_market_news (grouped headlines).
+    """
+    return _MARKET_NEWS_CACHE.get_or_load("market", fetch_market_news) or []
+
+def news_cache_stats():
+    return [_STOCK_NEWS_CACHE.stats(), _MARKET_NEWS_CACHE.stats()]
+
+def clear_news_cache():
+    _STOCK_NEWS_CACHE.clear()
+    _MARKET_NEWS_CACHE.clear()
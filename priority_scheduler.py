@@ -0,0 +1,131 @@
+import threading
+
+# --- TIERS ---
+# Rescan every N bars. Hot names go every bar, cold ones every 4th.
+TIER_INTERVALS = {"HOT": 1, "WARM": 2, "COLD": 4}
+HOT_THRESHOLD = 0.6
+WARM_THRESHOLD = 0.35
+
+# Component weights of the priority score (sum to 1)
+WEIGHTS = {"move": 0.4, "proximity": 0.35, "score": 0.25}
+
+
+def _clip(x, lo=0.0, hi=1.0):
+    if x != x: return lo # NaN stat (short history) counts as nothing, not as max
+    return max(lo, min(hi, x))
+
+
+def _parse_stoch(stats):
+    try:
+        k, d = stats.get("StochRSI", "0/0").split("/")
+        return float(k), float(d)
+    except Exception:
+        return 50.0, 50.0
+
+
+def trigger_proximity(stats):
+    """
+    How close a stock sits to any identify_setup trigger, 0 (far) .. 1 (at it).
+    Mirrors the thresholds used there: BB width < 0.08, StochRSI < 20 / > 80,
+    RSI < 30 / > 70 and ADX > 25. The conditions are one-sided, so anything
+    already inside a trigger region scores 1.0.
+    """
+    if not stats: return 0.0
+
+    bb_width = stats.get("BB Width", 1.0) or 1.0
+    squeeze = 1.0 if bb_width < 0.08 else _clip(1 - (bb_width - 0.08) / 0.08)
+
+    k, _ = _parse_stoch(stats)
+    stoch = 1.0 if k < 20 or k > 80 else _clip(1 - min(k - 20, 80 - k) / 30)
+
+    rsi = stats.get("RSI", 50)
+    rsi_prox = 1.0 if rsi < 30 or rsi > 70 else _clip(1 - min(rsi - 30, 70 - rsi) / 20)
+
+    adx = stats.get("ADX", 0)
+    adx_prox = 1.0 if adx > 25 else _clip(1 - (25 - adx) / 25)
+
+    return max(squeeze, stoch, rsi_prox, adx_prox)
+
+
+def priority_score(row):
+    """
+    0..1 priority from ATR-normalised movement, trigger proximity and AI_Score.
+    A live signal is always top priority.
+    """
+    if row.get("Signal", "NEUTRAL") != "NEUTRAL":
+        return 1.0
+
+    stats = row.get("Stats") or {}
+    move = _clip(stats.get("ATR Move", 0) / 1.0) # a full-ATR bar is "hot"
+    proximity = trigger_proximity(stats)
+    score = _clip(row.get("AI_Score", 0) / 100)
+
+    return round(WEIGHTS["move"] * move + WEIGHTS["proximity"] * proximity + WEIGHTS["score"] * score, 3)
+
+
+def tier_for(priority):
+    if priority >= HOT_THRESHOLD: return "HOT"
+    if priority >= WARM_THRESHOLD: return "WARM"
+    return "COLD"
+
+
+class PriorityScheduler:
+    """
+    Decides which tickers to rescan on each bar. Hot names are rescanned
+    every bar, cold ones less often, so a fixed budget of fetches goes to
+    the symbols most likely to fire.
+    """
+    def __init__(self, budget=None):
+        self.budget = budget # max tickers per cycle (None = no cap)
+        self._priority = {} # ticker -> score
+        self._bars_waited = {} # ticker -> bars since last rescan
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(ticker):
+        return ticker.replace(".NS", "")
+
+    def due(self, tickers):
+        """
+        Returns the tickers to rescan this bar, highest priority first.
+        Unknown tickers are always due.
+        """
+        with self._lock:
+            candidates = []
+            for t in tickers:
+                k = self._key(t)
+                waited = self._bars_waited.get(k, 0) + 1
+                self._bars_waited[k] = waited
+
+                if k not in self._priority:
+                    candidates.append((2.0, t)) # never scanned -> first
+                    continue
+
+                p = self._priority[k]
+                interval = TIER_INTERVALS[tier_for(p)]
+                if waited >= interval:
+                    # Overdue names climb so they aren't starved by the budget
+                    candidates.append((p + 0.25 * (waited - interval), t))
+
+            candidates.sort(reverse=True)
+            if self.budget:
+                candidates = candidates[:self.budget]
+
+            selected = [t for _, t in candidates]
+            for t in selected:
+                k = self._key(t)
+                self._bars_waited[k] = 0
+                # No result (no data / no new bar) -> treat as cold until scored
+                self._priority.setdefault(k, 0.0)
+            return selected
+
+    def update(self, rows):
+        """Feeds back the results of a scan."""
+        with self._lock:
+            for r in rows:
+                self._priority[r['Stock']] = priority_score(r)
+
+    def tiers(self):
+        """Ticker -> tier, for logging."""
+        with self._lock:
+            return {k: tier_for(p) for k, p in self._priority.items()}
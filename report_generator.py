@@ -1,86 +1,279 @@
-
-import pandas as pd
+import csv
 import datetime
+import itertools
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Reports go to their own timestamped files so concurrent runs never collide
+REPORT_DIR = os.environ.get("REPORT_DIR", "reports")
+REPORT_PREFIX = "Intraday_Trading_Plan"
+FORMATS = ("xlsx", "csv", "parquet")
+
+# Parquet is written in row groups of this size (bounded memory)
+PARQUET_BATCH_ROWS = 500
+
+# Scan row columns, in report order. Nested fields (Stats, Levels...) are
+# written as JSON text; History is never written.
+SCAN_COLUMNS = ["Stock", "CMP", "Signal", "Setup", "Strategy", "Duration", "Reason",
+                "Entry", "Stop Loss", "Target 1", "Target 2", "RR Ratio", "AI_Score",
+                "News_Sentiment", "KeyLevel_P", "KeyLevel_S1", "KeyLevel_R1",
+                "Stats", "Levels", "Fundamentals", "FnO"]
+PLAN_COLUMNS = ["Stock", "Signal", "Entry", "Stop Loss", "Target 1", "Target 2", "Reason"]
+# Grouped news (news_engine.group_news); source lists are joined into one cell
+NEWS_COLUMNS = ["Time", "Headline", "Impact", "Score", "Sources", "Link", "RelatedLinks"]
 
-OUTPUT_FILE = "Intraday_Trading_Plan.xlsx"
+_REPORT_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
 
-def generate_report(market_data, scanner_results, news_list):
+
+def report_path(fmt="xlsx", directory=None, prefix=REPORT_PREFIX):
     """
-    Generates a multi-sheet Excel report.
+    Unique path: <dir>/<prefix>_<YYYYmmdd_HHMMSS>_<6 hex>.<fmt>
     """
+    directory = directory or REPORT_DIR
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(directory, f"{prefix}_{stamp}_{uuid.uuid4().hex[:6]}.{fmt}")
+
+
+def _cell(value):
+    """Spreadsheet-safe value: nested data as JSON text, None as blank."""
+    if value is None: return ""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    try:
+        return float(value) # numpy scalars
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _overview_rows(market_data):
+    yield ["GLOBAL MARKETS SENTIMENT", market_data.get('Global_Sentiment', 'N/A')]
+    if market_data.get('Global_Score') is not None:
+        yield ["Global Score (weighted % move)", market_data['Global_Score']]
+    yield ["", ""]
+    for k, v in (market_data.get('Global_Indices') or {}).items():
+        yield [k, f"{v.get('Last Price', v.get('Previous Close', '-'))} ({v.get('Change %', 0)}%)"]
+
+    yield ["", ""]
+    yield ["DOMESTIC MARKET STATUS", ""]
+    for k, v in (market_data.get('Domestic_Status') or {}).items():
+        yield [k, f"{v.get('Last Price', v.get('Previous Close', '-'))} ({v.get('Change %', 0)}%) - Trend: {v.get('Trend', '-')}"]
+
+
+def _news_rows(news_list):
+    for item in news_list or []:
+        row = dict(item)
+        row["Sources"] = ", ".join(item.get("Sources") or [item.get("Source", "")])
+        row["RelatedLinks"] = " ".join(item.get("RelatedLinks") or [])
+        yield row
+
+
+# --- SCAN ROWS (streamed) ---
+def _category_rows(scanner_results, category):
+    """
+    Rows of one scan category, one dict at a time. A ScanResults table is
+    streamed; a plain dict of lists (older callers) is iterated as is.
+    """
+    if hasattr(scanner_results, "iter_rows"):
+        return scanner_results.iter_rows(category)
+    return iter(scanner_results.get(category) or [])
+
+
+def _category_count(scanner_results, category):
+    if hasattr(scanner_results, "count"):
+        return scanner_results.count(category)
+    return len(scanner_results.get(category) or [])
+
+
+# --- EXCEL (streaming) ---
+def _write_sheet(workbook, name, columns, rows, formats, empty_msg):
+    """
+    Writes dict rows one by one. In constant_memory mode each row is
+    flushed to disk as soon as the next one starts.
+    """
+    ws = workbook.add_worksheet(name)
+    ws.set_column(0, len(columns) - 1, 15)
+    for c, col in enumerate(columns):
+        ws.write(0, c, col, formats["header"])
+
+    signal_col = columns.index("Signal") if "Signal" in columns else None
+    r = 0
+    for r, row in enumerate(rows, start=1):
+        for c, col in enumerate(columns):
+            fmt = None
+            if c == signal_col:
+                fmt = formats.get(row.get("Signal"))
+            ws.write(r, c, _cell(row.get(col)), fmt)
+
+    if r == 0:
+        ws.write(1, 0, empty_msg)
+    return r
+
+
+def write_excel_report(path, market_data, scanner_results, news_list):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+    formats = {
+        "header": workbook.add_format({'bold': True, 'fg_color': '#D7E4BC', 'border': 1}),
+        "BUY": workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'}),
+        "SELL": workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
+    }
     try:
-        writer = pd.ExcelWriter(OUTPUT_FILE, engine='xlsxwriter')
-        workbook = writer.book
-
-        # Define Formats
-        header_fmt = workbook.add_format({'bold': True, 'fg_color': '#D7E4BC', 'border': 1})
-        buy_fmt = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-        sell_fmt = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
-        
         # --- SHEET 1: Market Overview ---
         print("Generating Market Overview Sheet...")
-        overview_data = []
-        
-        # Global Cues
-        overview_data.append(["GLOBAL MARKETS SENTIMENT", market_data['Global_Sentiment']])
-        overview_data.append(["", ""])
-        for k, v in market_data['Global_Indices'].items():
-            overview_data.append([k, f"{v['Last Price']} ({v['Change %']}%)"])
-            
-        overview_data.append(["", ""])
-        overview_data.append(["DOMESTIC MARKET STATUS", ""])
-        for k, v in market_data['Domestic_Status'].items():
-            overview_data.append([k, f"{v['Previous Close']} ({v['Change %']}%) - Trend: {v['Trend']}"])
-            
-        df_overview = pd.DataFrame(overview_data, columns=["Metric", "Value"])
-        df_overview.to_excel(writer, sheet_name='Market Overview', index=False)
-        
+        ws = workbook.add_worksheet('Market Overview')
+        ws.set_column(0, 1, 30)
+        ws.write_row(0, 0, ["Metric", "Value"], formats["header"])
+        for r, row in enumerate(_overview_rows(market_data), start=1):
+            ws.write_row(r, 0, row)
+
         # --- SHEET 2, 3, 4: Scanned Stocks ---
         sheets = {
-            "Support Zone Stocks": scanner_results.get("SUPPORT_ZONE", []),
-            "Breakout Stocks": scanner_results.get("BREAKOUT", []),
-            "Breakdown Stocks": scanner_results.get("BREAKDOWN", [])
+            "Support Zone Stocks": "SUPPORT_ZONE",
+            "Breakout Stocks": "BREAKOUT",
+            "Breakdown Stocks": "BREAKDOWN"
         }
-        
-        for sheet_name, data in sheets.items():
-            if data:
-                df = pd.DataFrame(data)
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-            else:
-                pd.DataFrame(["No Stocks Found"]).to_excel(writer, sheet_name=sheet_name, index=False)
+        for sheet_name, category in sheets.items():
+            _write_sheet(workbook, sheet_name, SCAN_COLUMNS, _category_rows(scanner_results, category),
+                         formats, "No Stocks Found")
+
+        # Every analysed symbol (can be thousands of rows)
+        if _category_count(scanner_results, "SCANNED"):
+            _write_sheet(workbook, "All Scanned", SCAN_COLUMNS, _category_rows(scanner_results, "SCANNED"),
+                         formats, "")
 
         # --- SHEET 5: News Analysis ---
-        if news_list:
-            df_news = pd.DataFrame(news_list)
-            df_news.to_excel(writer, sheet_name='News Impact', index=False)
-        else:
-            pd.DataFrame(["No News Fetched"]).to_excel(writer, sheet_name='News Impact', index=False)
+        _write_sheet(workbook, 'News Impact', NEWS_COLUMNS, _news_rows(news_list), formats, "No News Fetched")
 
         # --- SHEET 6: Final Trade Plan (Top 5) ---
         print("Generating Final Trade Plan...")
-        all_trades = scanner_results.get("ALL_TRADES", [])
-        # Simple Logic to pick top trades (e.g. highest target/risk or just first few)
-        top_trades = all_trades[:5] 
-        
-        if top_trades:
-            df_plan = pd.DataFrame(top_trades)
-            # Reorder columns for clarity
-            cols = ["Stock", "Signal", "Entry", "Stop Loss", "Target 1", "Target 2", "Reason"]
-            # Ensure columns exist
-            df_plan = df_plan[[c for c in cols if c in df_plan.columns]]
-            df_plan.to_excel(writer, sheet_name='Final Trade Plan', index=False)
-            
-            # Formatting
-            worksheet = writer.sheets['Final Trade Plan']
-            worksheet.set_column('A:Z', 15) # Adjust width
-            
+        top_trades = itertools.islice(_category_rows(scanner_results, "ALL_TRADES"), 5)
+        _write_sheet(workbook, 'Final Trade Plan', PLAN_COLUMNS, top_trades, formats,
+                     "No High Probability Trades Found")
+    finally:
+        workbook.close()
+    return path
+
+
+# --- CSV / PARQUET (scan rows only) ---
+def _scan_rows(scanner_results):
+    category = "SCANNED" if _category_count(scanner_results, "SCANNED") else "ALL_TRADES"
+    return _category_rows(scanner_results, category)
+
+
+def write_csv_report(path, rows, columns=SCAN_COLUMNS):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_cell(row.get(c)) for c in columns])
+    return path
+
+
+def write_parquet_report(path, rows, columns=SCAN_COLUMNS, batch_rows=PARQUET_BATCH_ROWS):
+    """Streams rows into Parquet row groups of batch_rows (needs pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Strings for text/JSON columns, floats for numbers
+    numeric = {"CMP", "Entry", "Stop Loss", "Target 1", "Target 2", "AI_Score",
+               "News_Sentiment", "KeyLevel_P", "KeyLevel_S1", "KeyLevel_R1"}
+    schema = pa.schema([(c, pa.float64() if c in numeric else pa.string()) for c in columns])
+
+    def to_batch(chunk):
+        arrays = []
+        for c in columns:
+            if c in numeric:
+                arrays.append(pa.array([None if r.get(c) is None else float(r.get(c)) for r in chunk], pa.float64()))
+            else:
+                arrays.append(pa.array([str(_cell(r.get(c))) for r in chunk], pa.string()))
+        return pa.record_batch(arrays, schema=schema)
+
+    with pq.ParquetWriter(path, schema) as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= batch_rows:
+                writer.write_batch(to_batch(chunk))
+                chunk = []
+        if chunk:
+            writer.write_batch(to_batch(chunk))
+    return path
+
+
+def generate_report(market_data, scanner_results, news_list, fmt="xlsx", path=None):
+    """
+    Generates a report and returns its path (None on error).
+    xlsx: multi-sheet workbook, streamed in constant-memory mode.
+    csv / parquet: one table of the scanned rows.
+    """
+    if fmt not in FORMATS:
+        print(f"Unknown report format '{fmt}', use one of {FORMATS}")
+        return None
+
+    path = path or report_path(fmt)
+    try:
+        if fmt == "xlsx":
+            write_excel_report(path, market_data, scanner_results, news_list)
+        elif fmt == "csv":
+            write_csv_report(path, _scan_rows(scanner_results))
         else:
-            pd.DataFrame(["No High Probability Trades Found"]).to_excel(writer, sheet_name='Final Trade Plan', index=False)
+            write_parquet_report(path, _scan_rows(scanner_results))
+
+        print(f"Report generated successfully: {path}")
+        return path
 
-        writer.close()
-        print(f"Report generated successfully: {OUTPUT_FILE}")
-        return OUTPUT_FILE
-        
     except Exception as e:
         print(f"Error generating report: {e}")
         return None
+
+
+def generate_report_async(market_data, scanner_results, news_list, fmt="xlsx", path=None):
+    """
+    Same as generate_report on a background thread, so the scan loop
+    isn't held up. Returns a Future with the report path.
+    """
+    return _REPORT_POOL.submit(generate_report, market_data, scanner_results, news_list, fmt, path)
+
+
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    import tempfile
+    import time
+    import tracemalloc
+
+    def fake_row(i):
+        return {"Stock": f"SYM{i}", "CMP": 100 + i, "Signal": ["BUY", "SELL", "NEUTRAL"][i % 3],
+                "Setup": "BUY_BREAKOUT", "Strategy": "Trend", "Duration": "Intraday", "Reason": "ADX > 25 " * 5,
+                "Entry": 100 + i, "Stop Loss": 98 + i, "Target 1": 103 + i, "Target 2": 105 + i,
+                "RR Ratio": "1:2", "AI_Score": i % 100, "Stats": {"RSI": 55, "ADX": 30, "Trend": "Bullish"},
+                "Levels": {"Pivot": 100, "S1": 98, "R1": 102}}
+
+    from scan_table import ScanResults
+
+    n = 2000
+    results = ScanResults.from_rows([fake_row(i) for i in range(n)]) # what scan_stocks returns
+    market = {"Global_Sentiment": "Neutral", "Global_Indices": {}, "Domestic_Status": {}}
+    news = [{"Headline": f"Story {i}", "Impact": "Positive", "Score": 2, "Time": "01-Jan 10:00",
+             "Link": f"https://example.com/{i}", "Sources": ["Moneycontrol", "ET Markets"],
+             "RelatedLinks": [f"https://example.org/{i}"]} for i in range(50)]
+
+    out_dir = tempfile.mkdtemp()
+    try:
+        import xlsxwriter, pyarrow.parquet # import cost isn't part of the measurement
+    except ImportError:
+        pass
+    for fmt in FORMATS:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        path = generate_report(market, results, news, fmt=fmt, path=report_path(fmt, out_dir))
+        secs = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        if path:
+            print(f"{fmt:8s} {n} rows: {secs:.2f}s, peak {peak:.1f} MB, {os.path.getsize(path) / 1e3:.0f} KB")
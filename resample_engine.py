@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+from ttl_cache import TTLCache
+from market_clock import SESSIONS, BAR_MINUTES, session_for_ticker
+
+# Higher timeframes built from the 15m bars (minutes, None = whole session)
+TIMEFRAMES = {"30m": 30, "1h": 60, "1d": None}
+
+# Resampled bars per (ticker, timeframe); a new 15m bar only redoes the last bucket
+STATE_TTL_SECONDS = 6 * 3600
+_STATE = TTLCache(STATE_TTL_SECONDS, 0, 2048, name="resampled bars")
+
+# EMAs for the higher-timeframe trend
+TREND_FAST, TREND_SLOW = 20, 50
+
+
+_NS_MINUTE = 60 * 10**9
+_NS_DAY = 24 * 60 * _NS_MINUTE
+
+
+def _session_geometry(session):
+    """(config, open offset, session length) in ns from local midnight."""
+    cfg = SESSIONS[session]
+    open_ns = (cfg["open"].hour * 60 + cfg["open"].minute) * _NS_MINUTE
+    close_ns = (cfg["close"].hour * 60 + cfg["close"].minute) * _NS_MINUTE
+    return cfg, open_ns, (close_ns - open_ns) % _NS_DAY
+
+
+def _wall_clock_ns(index, tz):
+    """Exchange wall-clock time as int64 ns (naive indexes are taken as exchange time)."""
+    if index.tz is None:
+        return index.asi8
+    first, last = index[0].tz_convert(tz).utcoffset(), index[-1].tz_convert(tz).utcoffset()
+    if first == last: # no DST change inside the frame (always true for NSE)
+        return index.asi8 + first // pd.Timedelta(1, "ns")
+    return index.tz_convert(tz).tz_localize(None).asi8
+
+
+def session_buckets(index, session, minutes):
+    """
+    Bucket start of every bar, aligned to the session open (NSE 1h bars are
+    09:15, 10:15 ... 15:15; overnight sessions count from the previous
+    evening's open). minutes=None -> one bucket per session.
+    Returns (bucket starts as int64 ns of the index, expected 15m bars per bucket).
+    Plain int64 arithmetic: this runs on every new bar for every ticker.
+    """
+    index = index.as_unit("ns") # yfinance indexes can be s resolution (pandas 3)
+    cfg, open_ns, length = _session_geometry(session)
+    local = _wall_clock_ns(index, cfg["tz"])
+    session_open = local - local % _NS_DAY + open_ns
+    if cfg["close"] <= cfg["open"]:
+        session_open = np.where(local >= session_open, session_open, session_open - _NS_DAY)
+
+    into_session = local - session_open
+    step = minutes * _NS_MINUTE if minutes else length
+    into_bucket = into_session % step
+    # Subtract the wall-clock offset from the real timestamps so DST shifts
+    # (only ever during closures) need no re-localising
+    starts = index.asi8 - into_bucket
+
+    bar = BAR_MINUTES * _NS_MINUTE
+    remaining = length - (into_session - into_bucket)
+    expected = -(-np.minimum(step, remaining) // bar) # ceil
+    return starts, expected
+
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Bars", "Complete"]
+
+
+def _columns(df):
+    """OHLCV of a 15m frame as float arrays (Volume 0 if missing)."""
+    cols = {c: df[c].to_numpy(float) for c in ("Open", "High", "Low", "Close")}
+    cols["Volume"] = df["Volume"].to_numpy(float) if "Volume" in df else np.zeros(len(df))
+    return cols
+
+
+def _aggregate(index, cols, session, minutes):
+    """
+    15m bars -> dict of numpy arrays per higher-timeframe bucket
+    ("Start" is the bucket start as int64 ns). Bars are time ordered, so
+    every bucket is one contiguous run: reduceat over the run starts
+    instead of a groupby.
+    """
+    starts, expected = session_buckets(index, session, minutes)
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:], len(starts)] - 1
+    bars = last - first + 1
+    complete = bars >= expected[first]
+    # Gaps in the vendor data shouldn't leave old bars flagged as forming
+    complete[:-1] = True
+    return {
+        "Start": starts[first],
+        "Open": cols["Open"][first],
+        "High": np.maximum.reduceat(cols["High"], first),
+        "Low": np.minimum.reduceat(cols["Low"], first),
+        "Close": cols["Close"][last],
+        "Volume": np.add.reduceat(cols["Volume"], first),
+        "Bars": bars,
+        "Complete": complete
+    }
+
+
+def _to_frame(arrays, tz):
+    index = pd.DatetimeIndex(arrays["Start"])
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    return pd.DataFrame({c: arrays[c] for c in COLUMNS}, index=index)
+
+
+def resample_bars(df, session, minutes):
+    """
+    15m OHLCV -> higher timeframe bars, session aligned. "Complete" is False
+    for a last bucket that is still missing 15m bars (the forming bar).
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    return _to_frame(_aggregate(df.index, _columns(df), session, minutes), df.index.tz)
+
+
+def get_bars(ticker, df, timeframe="1h"):
+    """
+    Higher-timeframe bars for a ticker's 15m frame, built incrementally:
+    if the frame extends the one seen last time, only the source bars from
+    the last (possibly forming) bucket onwards are aggregated. The same
+    frame again (another view on the same bar) returns the cached bars.
+    """
+    if df is None or df.empty: return None
+    minutes = TIMEFRAMES[timeframe]
+    session = session_for_ticker(ticker)
+    key = (ticker, timeframe)
+    src = df.index.as_unit("ns").asi8
+    cols = _columns(df)
+    last_close = cols["Close"][-1]
+
+    prev = _STATE.get(key)
+    arrays = None
+    if prev is not None:
+        if prev["last_src"] == src[-1] and prev["last_close"] == last_close:
+            return prev["bars"]
+        pos = np.searchsorted(src, prev["last_src"])
+        # Same history up to the last bar we used (a revised bar forces a rebuild)
+        old = prev["arrays"]
+        if pos < len(src) and src[pos] == prev["last_src"] and cols["Close"][pos] == prev["last_close"] \
+                and src[0] >= old["Start"][0]:
+            # Redo the last (maybe forming) bucket onwards, keep the rest
+            cut = np.searchsorted(src, old["Start"][-1])
+            tail = _aggregate(df.index[cut:], {c: v[cut:] for c, v in cols.items()}, session, minutes)
+            # The 59d window slides: drop buckets that ended before the frame starts
+            lo = max(np.searchsorted(old["Start"], src[0], side="right") - 1, 0)
+            arrays = {c: np.concatenate([old[c][lo:-1], tail[c]]) for c in old}
+            if old["Start"][lo] < src[0] and lo < len(old["Start"]) - 1:
+                # ...and re-aggregate the first bucket if some of its bars slid out
+                end = np.searchsorted(src, old["Start"][lo + 1])
+                head = _aggregate(df.index[:end], {c: v[:end] for c, v in cols.items()}, session, minutes)
+                for c in arrays:
+                    arrays[c][0] = head[c][0]
+                arrays["Complete"][0] = True
+
+    if arrays is None:
+        arrays = _aggregate(df.index, cols, session, minutes)
+
+    bars = _to_frame(arrays, df.index.tz)
+    _STATE.put(key, {"arrays": arrays, "bars": bars, "last_src": src[-1], "last_close": last_close})
+    return bars
+
+
+def timeframe_trend(ticker, df, timeframe="1h"):
+    """
+    Bullish / Bearish / Sideways from the close and EMA 20/50 of the
+    higher-timeframe bars (None if there aren't enough of them).
+    """
+    bars = get_bars(ticker, df, timeframe)
+    if bars is None or len(bars) < TREND_SLOW: return None
+
+    close = bars["Close"]
+    fast = close.ewm(span=TREND_FAST, adjust=False).mean().iloc[-1]
+    slow = close.ewm(span=TREND_SLOW, adjust=False).mean().iloc[-1]
+    last = close.iloc[-1]
+    if last > fast > slow: return "Bullish"
+    if last < fast < slow: return "Bearish"
+    return "Sideways"
+
+
+def resample_cache_stats():
+    return _STATE.stats()
+
+
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    import time
+
+    # 59 NSE sessions of 15m bars (25 per day, 09:15 -> 15:15 starts)
+    days = pd.bdate_range("2024-01-01", periods=59)
+    idx = pd.DatetimeIndex([d + pd.Timedelta(hours=9, minutes=15) + i * pd.Timedelta(minutes=15)
+                            for d in days for i in range(25)]).tz_localize("Asia/Kolkata")
+    rng = np.random.default_rng(1)
+    close = 1000 + np.cumsum(rng.normal(0, 2, len(idx)))
+    df = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                       "Volume": rng.integers(1000, 5000, len(idx)).astype(float)}, index=idx)
+
+    hourly = resample_bars(df, "NSE", 60)
+    day = hourly[hourly.index.normalize() == hourly.index[0].normalize()]
+    print("1h buckets of day 1:", [t.strftime("%H:%M") for t in day.index], "bars:", list(day["Bars"]))
+    assert list(day["Bars"]) == [4, 4, 4, 4, 4, 4, 1]
+
+    n = 200
+    for tf in TIMEFRAMES:
+        full = resample_bars(df, "NSE", TIMEFRAMES[tf])
+        t_full = t_inc = 0
+        for _ in range(n):
+            _STATE.clear()
+            get_bars("BENCH.NS", df.iloc[:-1], tf) # state as of the previous bar
+            t0 = time.perf_counter()
+            resample_bars(df, "NSE", TIMEFRAMES[tf])
+            t_full += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            inc = get_bars("BENCH.NS", df, tf)
+            t_inc += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        get_bars("BENCH.NS", df, tf) # another caller on the same bar
+        t_same = time.perf_counter() - t0
+        assert inc.equals(full)
+        print(f"{tf:4s} {len(full):4d} bars: full {t_full / n * 1000:.2f} ms, "
+              f"incremental new bar {t_inc / n * 1000:.2f} ms, same bar {t_same * 1000:.3f} ms")
+
+    # The 59d window slides into the first session: its buckets lose bars
+    for tf in TIMEFRAMES:
+        _STATE.clear()
+        get_bars("BENCH.NS", df.iloc[:-1], tf)
+        assert get_bars("BENCH.NS", df.iloc[3:], tf).equals(resample_bars(df.iloc[3:], "NSE", TIMEFRAMES[tf]))
+
+    # yfinance under pandas 3 gives second resolution indexes
+    coarse = df.set_axis(df.index.as_unit("s"))
+    assert resample_bars(coarse, "NSE", 60).equals(hourly)
+
+    print("1h trend:", timeframe_trend("BENCH.NS", df, "1h"))
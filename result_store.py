@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+from market_clock import last_bar_close, BAR_MINUTES, session_for_ticker
+
+# Shared between the web and worker processes (must be on the same host/volume)
+STORE_PATH = os.environ.get("SCAN_STORE_PATH", "scan_results.db")
+
+# Rows not refreshed for this long are dropped on publish
+ROW_EXPIRY_SECONDS = 3 * 24 * 3600
+
+_LOCK = threading.Lock()
+
+
+def _json_default(o):
+    # numpy scalars -> python
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+
+def _connect(path=None):
+    conn = sqlite3.connect(path or STORE_PATH, timeout=10)
+    # WAL lets the UI read while the worker writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scan_results (
+            stock TEXT PRIMARY KEY,
+            session TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            payload TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scan_cycles (
+            session TEXT PRIMARY KEY,
+            published_at REAL NOT NULL,
+            rows INTEGER NOT NULL
+        )
+    """)
+    return conn
+
+
+def publish_scan(rows, sessions, path=None):
+    """
+    Upserts the rows analysed in a cycle and stamps the cycle time for each
+    session. Rows not re-evaluated this cycle (no new bar) are kept as is.
+    Only closed-bar scans may be published: is_fresh() treats every cycle
+    as covering the last closed bar.
+    """
+    now = time.time()
+    per_session = Counter(session_for_ticker(r['Stock']) for r in rows)
+    with _LOCK:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO scan_results (stock, session, updated_at, payload) VALUES (?, ?, ?, ?)",
+                    [(r['Stock'], session_for_ticker(r['Stock']), now, json.dumps(r, default=_json_default)) for r in rows]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO scan_cycles (session, published_at, rows) VALUES (?, ?, ?)",
+                    [(s, now, per_session[s]) for s in sessions]
+                )
+                conn.execute("DELETE FROM scan_results WHERE updated_at < ?", (now - ROW_EXPIRY_SECONDS,))
+        finally:
+            conn.close()
+
+
+def get_published_at(session="NSE", path=None):
+    """
+    Epoch seconds of the last published cycle for a session, or None.
+    """
+    if not os.path.exists(path or STORE_PATH): return None
+    conn = _connect(path)
+    try:
+        row = conn.execute("SELECT published_at FROM scan_cycles WHERE session = ?", (session,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def is_fresh(published_at, session="NSE", max_bars_behind=1):
+    """
+    A cycle is fresh if it covers the latest closed bar, allowing the worker
+    `max_bars_behind` bars to catch up. After hours the last cycle of the
+    session stays fresh until the next session opens.
+    """
+    if published_at is None: return False
+    last_close = last_bar_close(session)
+    if last_close is None: return True
+    cutoff = last_close.timestamp() - max_bars_behind * BAR_MINUTES * 60
+    return published_at >= cutoff
+
+
+def load_scan_results(session="NSE", max_bars_behind=1, path=None):
+    """
+    Returns (rows, published_at) from the shared store, or None if there is
+    no cycle yet or it is stale.
+    """
+    try:
+        published_at = get_published_at(session, path)
+        if not is_fresh(published_at, session, max_bars_behind):
+            return None
+
+        conn = _connect(path)
+        try:
+            cur = conn.execute("SELECT payload FROM scan_results WHERE session = ?", (session,))
+            rows = [json.loads(p) for (p,) in cur]
+        finally:
+            conn.close()
+        return rows, published_at
+    except Exception as e:
+        print(f"⚠️ Result store read failed: {e}")
+        return None
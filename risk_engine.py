@@ -0,0 +1,355 @@
+import threading
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from market_clock import session_for_ticker, drop_forming_bar, last_bar_close, BAR_MINUTES
+
+# --- SETTINGS ---
+RISK_WINDOW_BARS = 15 * 25 # ~15 NSE sessions of 15m returns
+BARS_PER_DAY = 25
+BENCHMARK = "^NSEI"
+BENCHMARK_KEY = "NIFTY 50"
+# Rank-1 updates drift slowly; the sums are recomputed from the window this often
+REBUILD_EVERY_BARS = 250
+# More new bars than this at once (restart, missed cycles) -> full rebuild
+MAX_INCREMENTAL_BARS = 8
+
+# Correlation-cluster cap on concurrent trades
+CLUSTER_CORRELATION = 0.7
+MAX_TRADES_PER_CLUSTER = 2
+
+
+def _key(ticker):
+    """Same naming as scan rows ("Stock" has no .NS)."""
+    return BENCHMARK_KEY if ticker == BENCHMARK else ticker.replace(".NS", "")
+
+
+def _returns(close, prev):
+    """Simple returns; a missing or zero previous close counts as flat."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nan_to_num(close / prev - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+class RiskEngine:
+    """
+    Rolling covariance of 15m returns across the NSE universe (+ NIFTY).
+
+    The scanner hands each ticker's closes to observe(); update() then adds
+    the new bar's return row with a rank-1 update of the running sums
+    (sum r and sum r r^T) and drops the oldest row, so a bar costs O(N^2)
+    instead of recomputing the O(W N^2) product. A ticker that wasn't
+    rescanned on a bar gets a flat placeholder return, replaced with its
+    real returns once it is observed again.
+    """
+    def __init__(self, window=RISK_WINDOW_BARS):
+        self.window = window
+        self._lock = threading.Lock()
+        self._closes = {} # key -> (bar times as int64 ns, closes) of the recent tail
+        self.tickers = []
+        self._ring = None # window x N return rows
+        self._ring_times = None # bar time of each row (int64 ns)
+        self._head = self._count = 0
+        self._sum = self._cross = None
+        self._last_close = None # per ticker: close at its last folded bar
+        self._seen = None # per ticker: time of its last folded bar (int64 ns)
+        self._last_time = None # newest row (int64 ns)
+        self._since_rebuild = 0
+
+    # --- FEED ---
+    def observe(self, ticker, closes):
+        """Closed-bar close series of one ticker (only the tail is kept)."""
+        if session_for_ticker(ticker) != "NSE" or closes is None or closes.empty: return
+        times = closes.index.as_unit("ns").asi8[-(self.window + 1):] # yfinance can give s resolution
+        values = closes.to_numpy(dtype=float)[-(self.window + 1):]
+        with self._lock:
+            self._closes[_key(ticker)] = (times, values)
+
+    def fetch_benchmark(self):
+        """Downloads NIFTY 15m closes for beta (at most once per closed bar)."""
+        closed = last_bar_close("NSE")
+        with self._lock:
+            have = self._closes.get(BENCHMARK_KEY)
+        if have is not None and closed is not None and \
+                pd.Timestamp(int(have[0][-1]), unit="ns", tz="UTC") + pd.Timedelta(minutes=BAR_MINUTES) >= closed:
+            return
+
+        from data_engine import fetch_data # lazy: yfinance
+        df = drop_forming_bar(fetch_data(BENCHMARK, period="59d", interval="15m"))
+        if df is not None and not df.empty:
+            self.observe(BENCHMARK, df['Close'])
+
+    def update(self):
+        """Folds observed bars into the covariance. Returns self."""
+        with self._lock:
+            if not self._closes: return self
+            if self._ring is None or set(self._closes) != set(self.tickers) \
+                    or self._since_rebuild >= REBUILD_EVERY_BARS:
+                self._rebuild()
+                return self
+
+            # Only the last few bars of each series can be new
+            tails = [self._closes[k] for k in self.tickers]
+            recent = np.concatenate([t[-(MAX_INCREMENTAL_BARS + 1):] for t, _ in tails])
+            new_times = np.unique(recent[recent > self._last_time])
+            if len(new_times) > MAX_INCREMENTAL_BARS or not self._backfill(tails):
+                self._rebuild()
+                return self
+            for t in new_times:
+                at = np.array([v[-1] if ts[-1] == t else self._close_at(ts, v, t) for ts, v in tails])
+                seen = ~np.isnan(at)
+                close = np.where(seen, at, self._last_close) # not scanned yet -> flat placeholder
+                self._push(_returns(close, self._last_close), t)
+                self._last_close, self._last_time = close, t
+                self._seen = np.where(seen, t, self._seen)
+        return self
+
+    def _backfill(self, tails):
+        """
+        Replaces the flat placeholders of tickers that now bring bars they
+        weren't scanned on (the priority scheduler skips WARM/COLD names
+        for a few bars). False if that needs a full rebuild instead: the
+        bars reach back past MAX_INCREMENTAL_BARS rows or add a bar time
+        no row has.
+        """
+        late = []
+        for j, ((ts, _), seen) in enumerate(zip(tails, self._seen.tolist())):
+            k = len(ts) - 1
+            while k >= 0 and ts[k] > self._last_time: k -= 1 # newest bar already folded as a row
+            if k >= 0 and ts[k] > seen: late.append(j)
+        if not late: return True
+
+        order = (self._head - self._count + np.arange(self._count)) % self.window
+        times = self._ring_times[order]
+        start = min(self._seen[j] for j in late)
+        if not self._count or start < times[0]: return False
+        rows = order[times > start]
+        if len(rows) > MAX_INCREMENTAL_BARS: return False
+
+        row_times = self._ring_times[rows]
+        new = self._ring[rows]
+        for j in late:
+            ts, v = tails[j]
+            bars = ts[(ts > self._seen[j]) & (ts <= self._last_time)]
+            if not np.isin(bars, row_times).all(): return False
+            mask = row_times > self._seen[j]
+            idx = np.searchsorted(ts, row_times[mask], side="right") - 1
+            close = np.empty(len(idx))
+            prev = self._last_close[j]
+            for n, i in enumerate(idx):
+                if not np.isnan(v[i]): prev = v[i] # same forward fill as _rebuild
+                close[n] = prev
+            new[mask, j] = _returns(close, np.r_[self._last_close[j], close[:-1]])
+            self._last_close[j] = prev
+            self._seen[j] = ts[idx[-1]]
+
+        old = self._ring[rows]
+        self._sum += new.sum(axis=0) - old.sum(axis=0)
+        self._cross += new.T @ new - old.T @ old
+        self._ring[rows] = new
+        return True
+
+    @staticmethod
+    def _close_at(times, values, t):
+        i = np.searchsorted(times, t)
+        return values[i] if i < len(times) and times[i] == t else np.nan
+
+    def _rebuild(self):
+        """Full O(W N^2) recompute from the stored closes."""
+        self.tickers = sorted(self._closes)
+        closes = pd.concat([pd.Series(self._closes[k][1], index=self._closes[k][0]) for k in self.tickers],
+                           axis=1, keys=self.tickers)
+        closes = closes.sort_index().ffill().iloc[-(self.window + 1):]
+        returns = closes.pct_change().iloc[1:].fillna(0.0).to_numpy()
+
+        n = len(self.tickers)
+        self._ring = np.zeros((self.window, n))
+        self._ring_times = np.zeros(self.window, dtype=np.int64)
+        self._count = len(returns)
+        self._ring[:self._count] = returns
+        self._ring_times[:self._count] = closes.index[1:]
+        self._head = self._count % self.window
+        self._sum = returns.sum(axis=0)
+        self._cross = returns.T @ returns
+        self._last_close = closes.iloc[-1].to_numpy(dtype=float)
+        self._last_time = int(closes.index[-1])
+        self._seen = np.array([self._closes[k][0][-1] for k in self.tickers], dtype=np.int64)
+        self._since_rebuild = 0
+
+    def _push(self, r, t):
+        if self._count == self.window:
+            old = self._ring[self._head]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self._count += 1
+        self._ring[self._head] = r
+        self._ring_times[self._head] = t
+        self._head = (self._head + 1) % self.window
+        self._sum += r
+        self._cross += np.outer(r, r)
+        self._since_rebuild += 1
+
+    # --- METRICS ---
+    def covariance(self):
+        """(tickers, N x N covariance of 15m returns)."""
+        with self._lock:
+            if self._count < 2: return [], np.zeros((0, 0))
+            mean = self._sum / self._count
+            cov = (self._cross - self._count * np.outer(mean, mean)) / (self._count - 1)
+            return list(self.tickers), cov
+
+    def correlation(self):
+        tickers, cov = self.covariance()
+        sd = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(sd, sd)
+        return tickers, np.nan_to_num(corr, nan=0.0)
+
+    def betas(self):
+        """Beta of every ticker to NIFTY 50 (empty if NIFTY isn't observed)."""
+        tickers, cov = self.covariance()
+        if BENCHMARK_KEY not in tickers: return pd.Series(dtype=float)
+        b = tickers.index(BENCHMARK_KEY)
+        if cov[b, b] <= 0: return pd.Series(dtype=float)
+        return pd.Series(cov[:, b] / cov[b, b], index=tickers).drop(BENCHMARK_KEY)
+
+    def value_at_risk(self, positions, confidence=0.95, horizon_bars=BARS_PER_DAY):
+        """
+        Parametric (variance-covariance) VaR of {stock: signed notional}
+        over horizon_bars, as a positive loss in the notional's currency.
+        Stocks the engine hasn't seen are ignored.
+        """
+        tickers, cov = self.covariance()
+        col = {k: i for i, k in enumerate(tickers)}
+        w = np.zeros(len(tickers))
+        for stock, notional in positions.items():
+            i = col.get(_key(stock))
+            if i is not None: w[i] += notional
+        sigma = np.sqrt(max(float(w @ cov @ w), 0.0) * horizon_bars)
+        return float(NormalDist().inv_cdf(confidence) * sigma)
+
+    def portfolio_summary(self, stocks, notional=100000):
+        """
+        Risk of holding `notional` long in each stock: average beta, 1-day
+        95% VaR and the most correlated pair. None until data is in.
+        """
+        tickers, corr = self.correlation()
+        col = {k: i for i, k in enumerate(tickers)}
+        idx = [col[_key(s)] for s in stocks if _key(s) in col]
+        if not idx: return None
+
+        names = [tickers[i] for i in idx]
+        beta = self.betas().reindex(names).mean()
+        summary = {
+            "Beta": None if pd.isna(beta) else float(beta),
+            "VaR": self.value_at_risk({n: notional for n in names}),
+            "Top Pair": None
+        }
+        if len(idx) > 1:
+            sub = corr[np.ix_(idx, idx)].copy()
+            np.fill_diagonal(sub, -np.inf)
+            a, b = np.unravel_index(np.argmax(sub), sub.shape)
+            summary["Top Pair"] = (names[a], names[b], float(sub[a, b]))
+        return summary
+
+    def cap_correlated(self, trades, threshold=CLUSTER_CORRELATION, max_per_cluster=MAX_TRADES_PER_CLUSTER):
+        """
+        Keeps at most max_per_cluster trades that move together. Best
+        AI_Score first; a trade is dropped when max_per_cluster kept trades
+        already have a same-direction correlation >= threshold with it
+        (a SELL on a correlated name is a hedge, not a duplicate).
+        Returns (kept, dropped) in AI_Score order.
+        """
+        tickers, corr = self.correlation()
+        col = {k: i for i, k in enumerate(tickers)}
+        kept, dropped = [], []
+        kept_cols, kept_dirs = [], []
+        for t in sorted(trades, key=lambda r: r.get('AI_Score', 0), reverse=True):
+            i = col.get(_key(t['Stock']))
+            direction = -1.0 if "SELL" in str(t.get('Signal')) else 1.0
+            if i is not None and kept_cols:
+                same_way = corr[i, kept_cols] * direction * np.array(kept_dirs)
+                if np.count_nonzero(same_way >= threshold) >= max_per_cluster:
+                    dropped.append(t)
+                    continue
+            kept.append(t)
+            if i is not None:
+                kept_cols.append(i)
+                kept_dirs.append(direction)
+        return kept, dropped
+
+
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(9)
+    n, bars = 500, RISK_WINDOW_BARS + 26
+    idx = pd.date_range("2024-01-01 09:15", periods=bars, freq="15min", tz="Asia/Kolkata")
+    market = rng.normal(0, 0.002, bars)
+    sector = rng.normal(0, 0.002, (bars, 10))
+    betas = rng.uniform(0.5, 1.5, n)
+    rets = market[:, None] * betas + sector[:, np.arange(n) % 10] + rng.normal(0, 0.002, (bars, n))
+    prices = 100 * np.cumprod(1 + rets, axis=0)
+    bench = 100 * np.cumprod(1 + market)
+
+    engine = RiskEngine()
+    for j in range(n):
+        engine.observe(f"S{j}.NS", pd.Series(prices[:-25, j], index=idx[:-25]))
+    engine.observe(BENCHMARK, pd.Series(bench[:-25], index=idx[:-25]))
+    t0 = time.perf_counter()
+    engine.update()
+    t_full = time.perf_counter() - t0
+
+    # One session of new bars, one bar at a time
+    t_inc = []
+    for b in range(bars - 25, bars):
+        for j in range(n):
+            engine.observe(f"S{j}.NS", pd.Series(prices[:b + 1, j], index=idx[:b + 1]))
+        engine.observe(BENCHMARK, pd.Series(bench[:b + 1], index=idx[:b + 1]))
+        t0 = time.perf_counter()
+        engine.update()
+        t_inc.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    tickers, corr = engine.correlation()
+    beta = engine.betas()
+    t_metrics = time.perf_counter() - t0
+
+    # Incremental result vs a from-scratch computation on the same window
+    check = RiskEngine()
+    check._closes = dict(engine._closes)
+    check.update()
+    _, cov_inc = engine.covariance()
+    _, cov_full = check.covariance()
+    err = np.abs(cov_inc - cov_full).max() / np.abs(cov_full).max()
+
+    trades = [{"Stock": f"S{j}", "Signal": "BUY", "AI_Score": 90 - j % 30} for j in range(0, 40)]
+    kept, dropped = engine.cap_correlated(trades, threshold=0.5)
+    var = engine.value_at_risk({t["Stock"]: 100000 for t in kept})
+    print(f"{n}+1 series x {RISK_WINDOW_BARS} bars: full rebuild {t_full * 1000:.0f} ms, "
+          f"incremental bar {np.median(t_inc) * 1000:.1f} ms (median), corr+beta {t_metrics * 1000:.0f} ms")
+    print(f"incremental vs full covariance: max rel. error {err:.1e}")
+    print(f"beta error vs true: {np.abs(beta.reindex([f'S{j}' for j in range(n)]).values - betas).mean():.3f} (mean abs)")
+    print(f"cluster cap: {len(kept)} of {len(trades)} BUYs kept; 1-day 95% VaR of ₹1L each: ₹{var:,.0f}")
+
+    # Priority scheduler: HOT names rescanned every bar, COLD ones every 4th.
+    # Incremental must match a rebuild from the same closes on every bar.
+    m, first = 20, bars - 25
+    stag = RiskEngine()
+    worst = 0.0
+    for b in range(first, bars):
+        for j in range(m):
+            if j < m // 2 or b % 4 == 0 or b == first:
+                stag.observe(f"S{j}.NS", pd.Series(prices[:b + 1, j], index=idx[:b + 1]))
+        stag.update()
+        ref = RiskEngine()
+        ref._closes = dict(stag._closes)
+        ref.update()
+        (_, c_inc), (_, c_ref) = stag.covariance(), ref.covariance()
+        worst = max(worst, np.abs(c_inc - c_ref).max() / np.abs(c_ref).max())
+    assert worst < 1e-9, worst
+    pairs = [(j, j + m // 2) for j in range(m // 2)] # same sector, one HOT one COLD
+    (_, corr_inc), (_, corr_ref) = stag.correlation(), ref.correlation()
+    print(f"staggered rescans: max rel. error vs rebuild {worst:.1e}, HOT/COLD same-sector corr "
+          f"{np.mean([corr_inc[a, b] for a, b in pairs]):.2f} (rebuild {np.mean([corr_ref[a, b] for a, b in pairs]):.2f})")
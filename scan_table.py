@@ -0,0 +1,233 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+# --- SCHEMA ---
+# Scalar fields of an analyze_single_stock row and their fixed dtypes.
+# Low-cardinality text is categorical (one copy of "NEUTRAL" for 2000 rows).
+SCALAR_COLUMNS = {
+    "Stock": "string",
+    "CMP": "float64",
+    "Signal": "category",
+    "Setup": "category",
+    "Strategy": "category",
+    "Duration": "category",
+    "Reason": "string",
+    "Entry": "float64",
+    "Stop Loss": "float64",
+    "Target 1": "float64",
+    "Target 2": "float64",
+    "KeyLevel_P": "float64",
+    "KeyLevel_S1": "float64",
+    "KeyLevel_R1": "float64",
+    "RR Ratio": "category",
+    "News_Sentiment": "float64",
+    "AI_Score": "int16"
+}
+# Nested sub-dicts stay as one object column each (cards and alerts read them)
+NESTED_COLUMNS = ["Stats", "Levels", "Fundamentals", "FnO"]
+# Pulled out of Stats as typed columns for vectorised sorting/filtering
+STATS_COLUMNS = {"RSI": "float64", "ADX": "float64", "ATR Move": "float64", "BB Width": "float64"}
+
+CATEGORIES = ["SUPPORT_ZONE", "BREAKOUT", "BREAKDOWN", "ALL_TRADES", "SCANNED"]
+# Row order of the original dict rows
+ROW_COLUMNS = ["Stock", "CMP", "Signal", "Setup", "Strategy", "Duration", "Reason", "Stats", "Levels",
+               "Entry", "Stop Loss", "Target 1", "Target 2", "KeyLevel_P", "KeyLevel_S1", "KeyLevel_R1",
+               "RR Ratio", "Fundamentals", "FnO", "News_Sentiment", "AI_Score"]
+
+
+def build_table(rows):
+    """
+    analyze_single_stock rows -> one typed DataFrame (History is dropped).
+    """
+    rows = [r for r in rows if r]
+    data = {}
+    for col, dtype in SCALAR_COLUMNS.items():
+        values = [r.get(col) for r in rows]
+        if dtype == "int16":
+            data[col] = np.array([v or 0 for v in values], dtype=np.int16)
+        elif dtype == "float64":
+            data[col] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        else:
+            data[col] = pd.Series(values, dtype=dtype)
+
+    for col in NESTED_COLUMNS:
+        data[col] = pd.Series([r.get(col) for r in rows], dtype=object)
+
+    for key, dtype in STATS_COLUMNS.items():
+        data[f"Stats_{key}"] = np.array([(r.get("Stats") or {}).get(key, np.nan) for r in rows], dtype=dtype)
+
+    return pd.DataFrame(data)
+
+
+def category_masks(df):
+    """
+    Boolean masks for the scan categories (same rules as is_trade_candidate
+    and the old bucketing loop). SUPPORT_ZONE has never had a rule.
+    """
+    signal = df["Signal"].astype("string")
+    setup = df["Setup"].astype("string").fillna("")
+    candidate = (signal != "NEUTRAL") | (df["AI_Score"] > 70)
+    is_buy = setup.str.contains("BUY", regex=False)
+    return {
+        "SUPPORT_ZONE": pd.Series(False, index=df.index),
+        "BREAKOUT": candidate & is_buy,
+        "BREAKDOWN": candidate & ~is_buy & setup.str.contains("SELL", regex=False),
+        "ALL_TRADES": candidate,
+        "SCANNED": pd.Series(True, index=df.index)
+    }
+
+
+def _native(v):
+    if v is None or v is pd.NA: return None
+    if isinstance(v, float) and np.isnan(v): return None
+    if isinstance(v, np.generic): return v.item()
+    return v
+
+
+def _column_values(col):
+    """A column as a list of plain Python values (NaN / NA -> None)."""
+    if col.dtype.kind in "fiub":
+        values = col.to_numpy().tolist()
+        return [None if v != v else v for v in values] if col.dtype.kind == "f" else values
+    return [_native(v) for v in col.to_numpy(dtype=object)]
+
+
+class ScanResults(Mapping):
+    """
+    Scan output as one columnar table plus a boolean mask per category.
+
+    Categories are cached numpy masks. select() filters and sorts them as
+    plain array operations (no DataFrame is built), and results["BREAKOUT"]
+    builds the old list-of-dicts on demand from per-column arrays, so
+    existing consumers (alerts, result store, reports) keep working.
+    frame() is for display only: building a DataFrame costs ~1 ms.
+    """
+    def __init__(self, table):
+        self.table = table
+        self.masks = {c: m.to_numpy(dtype=bool) for c, m in category_masks(table).items()}
+        self._positions = {}
+        self._arrays = None
+        self._score = table["AI_Score"].to_numpy()
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(build_table(rows))
+
+    def positions(self, category="SCANNED"):
+        """Row positions of a category, in scan order (cached)."""
+        pos = self._positions.get(category)
+        if pos is None:
+            pos = self._positions[category] = np.flatnonzero(self.masks[category])
+        return pos
+
+    def select(self, category="SCANNED", min_score=None, best_first=False):
+        """
+        Row positions of a category, optionally AI_Score >= min_score and
+        sorted by AI_Score (descending, ties in scan order). Feed to rows().
+        """
+        pos = self.positions(category)
+        if min_score is not None:
+            pos = pos[self._score[pos] >= min_score]
+        if best_first:
+            pos = pos[np.argsort(-self._score[pos], kind="stable")]
+        return pos
+
+    def frame(self, category="SCANNED"):
+        """Typed DataFrame of a category (for display)."""
+        return self.table.iloc[self.positions(category)]
+
+    def count(self, category="SCANNED"):
+        return len(self.positions(category))
+
+    def rows(self, category="SCANNED", positions=None):
+        """Rows as plain dicts, in the original analyze_single_stock shape."""
+        return list(self.iter_rows(category, positions))
+
+    def iter_rows(self, category="SCANNED", positions=None):
+        """Same rows one at a time (reports stream thousands of them)."""
+        if self._arrays is None: # converted once, then every row is list lookups
+            self._arrays = [(c, _column_values(self.table[c])) for c in ROW_COLUMNS if c in self.table.columns]
+        for i in (self.positions(category) if positions is None else positions).tolist():
+            yield {c: values[i] for c, values in self._arrays}
+
+    # --- Mapping (dict-compatible) ---
+    def __getitem__(self, category):
+        if category not in self.masks: raise KeyError(category)
+        return self.rows(category)
+
+    def __iter__(self):
+        return iter(CATEGORIES)
+
+    def __len__(self):
+        return len(CATEGORIES)
+
+    def __repr__(self):
+        counts = ", ".join(f"{c}={self.count(c)}" for c in CATEGORIES)
+        return f"<ScanResults {counts}>"
+
+    def memory_bytes(self):
+        return int(self.table.memory_usage(deep=True).sum())
+
+
+# --- BENCHMARK ---
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+
+    def deep_size(o, seen=None):
+        seen = seen if seen is not None else set()
+        if id(o) in seen: return 0
+        seen.add(id(o))
+        size = sys.getsizeof(o)
+        if isinstance(o, dict):
+            size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in o.items())
+        elif isinstance(o, (list, tuple)):
+            size += sum(deep_size(v, seen) for v in o)
+        return size
+
+    rnd = random.Random(3)
+    def fake_row(i):
+        sig = rnd.choice(["BUY", "SELL", "NEUTRAL", "NEUTRAL", "NEUTRAL"])
+        setup = {"BUY": "BUY_BREAKOUT", "SELL": "SELL_BREAKDOWN"}.get(sig, "NO_CLEAR_SETUP")
+        cmp = round(rnd.uniform(50, 5000), 2)
+        return {"Stock": f"SYM{i}", "CMP": cmp, "Signal": sig, "Setup": setup, "Strategy": "Trend Following",
+                "Duration": "Intraday", "Reason": f"ADX {rnd.randint(10, 50)} with volume",
+                "Stats": {"RSI": rnd.uniform(10, 90), "ADX": rnd.uniform(5, 60), "Trend": "Bullish"},
+                "Levels": {"Pivot": cmp, "S1": cmp * 0.99, "R1": cmp * 1.01},
+                "Entry": cmp, "Stop Loss": cmp * 0.98, "Target 1": cmp * 1.02, "Target 2": cmp * 1.04,
+                "KeyLevel_P": cmp, "KeyLevel_S1": cmp * 0.99, "KeyLevel_R1": cmp * 1.01,
+                "RR Ratio": "1:2" if sig != "NEUTRAL" else "N/A", "Fundamentals": None, "FnO": None,
+                "News_Sentiment": None, "AI_Score": rnd.randint(20, 95)}
+
+    rows = [fake_row(i) for i in range(2000)]
+    # Old layout: SCANNED plus copies of the candidate lists
+    old = {"SCANNED": rows, "ALL_TRADES": [r for r in rows if r["Signal"] != "NEUTRAL" or r["AI_Score"] > 70]}
+    old["BREAKOUT"] = [r for r in old["ALL_TRADES"] if "BUY" in r["Setup"]]
+    old["BREAKDOWN"] = [r for r in old["ALL_TRADES"] if "SELL" in r["Setup"]]
+
+    t0 = time.perf_counter()
+    res = ScanResults.from_rows(rows)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    top_old = sorted([r for r in old["ALL_TRADES"] if r["AI_Score"] >= 75], key=lambda r: -r["AI_Score"])
+    t_old = time.perf_counter() - t0
+    res.select("ALL_TRADES") # first use caches the category positions
+    t0 = time.perf_counter()
+    top_pos = res.select("ALL_TRADES", min_score=75, best_first=True)
+    t_new = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    top_new = res.rows(positions=top_pos)
+    t_rows = time.perf_counter() - t0 # includes the one-off column conversion
+    t0 = time.perf_counter()
+    res.rows(positions=top_pos)
+    t_again = time.perf_counter() - t0
+
+    assert [r["Stock"] for r in old["ALL_TRADES"]] == [r["Stock"] for r in res["ALL_TRADES"]]
+    assert [r["Stock"] for r in top_old] == [r["Stock"] for r in top_new]
+    print(f"{res}")
+    print(f"build {t_build * 1000:.1f} ms | dict rows {deep_size(old) / 1e6:.2f} MB vs table {res.memory_bytes() / 1e6:.2f} MB")
+    print(f"filter+sort AI_Score>=75 ({len(top_pos)} rows): lists {t_old * 1000:.2f} ms, "
+          f"table {t_new * 1000:.2f} ms; as dicts +{t_rows * 1000:.2f} ms first time, +{t_again * 1000:.2f} ms after")
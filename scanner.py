@@ -2,12 +2,19 @@
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from data_engine import fetch_data, get_nifty500_tickers, get_fundamentals, get_option_chain_data
-from technicals import detect_structure, identify_setup, calculate_pivots
-import ml_engine # [NEW] ML
+from technicals import identify_setup, calculate_pivots
+from indicator_cache import get_indicators
+from market_clock import drop_forming_bar
+from scan_table import ScanResults
+from fundamentals_snapshot import get_snapshot_fundamentals
+from resample_engine import timeframe_trend
 import time
 
+# Expiries loaded per signal during a scan (Deep Analysis loads options_engine.EXPIRIES_ANALYSED)
+SCAN_FNO_EXPIRIES = 1
 
-def calculate_heuristic_score(tech_data, fund_data, fno_data):
+
+def calculate_heuristic_score(tech_data, fund_data, fno_data, news_data=None):
     """
     Calculates a 0-100 Score based on Technicals, Fundamentals, and F&O.
     """
@@ -24,6 +31,15 @@ def calculate_heuristic_score(tech_data, fund_data, fno_data):
         # Trend Strength
         if stats.get('Trend') == "Bullish" and signal == "BUY": score += 10
         elif stats.get('Trend') == "Bearish" and signal == "SELL": score += 10
+
+        # Higher timeframe confirmation (1h bars built from the same 15m data)
+        trend_1h = stats.get('Trend 1h')
+        if signal == "BUY":
+            if trend_1h == "Bullish": score += 5
+            elif trend_1h == "Bearish": score -= 5 # Buying against the hourly trend
+        elif signal == "SELL":
+            if trend_1h == "Bearish": score += 5
+            elif trend_1h == "Bullish": score -= 5
         
         # ADX (Strong Trend)
         if stats.get('ADX', 0) > 25: score += 5
@@ -45,28 +61,61 @@ def calculate_heuristic_score(tech_data, fund_data, fno_data):
             pcr = fno_data.get('PCR', 1)
             if signal == "BUY" and pcr > 0.7: score += 5 # Healthy PCR for buying
             if signal == "SELL" and pcr < 1.0: score += 5 
+            # Price tends to drift towards max pain into expiry
+            max_pain, spot = fno_data.get('Max Pain'), fno_data.get('Spot')
+            if max_pain and spot:
+                if signal == "BUY" and max_pain > spot: score += 5
+                if signal == "SELL" and max_pain < spot: score += 5
+
+        # 4. NEWS SENTIMENT (Max +/-5) - from the ticker news index
+        if news_data:
+            sentiment = news_data.get('Sentiment', 0)
+            if signal == "BUY":
+                if sentiment >= 2: score += 5
+                elif sentiment <= -2: score -= 5 # Buying into bad news
+            elif signal == "SELL":
+                if sentiment <= -2: score += 5
+                elif sentiment >= 2: score -= 5
             
     except Exception as e:
         print(f"Scoring Error: {e}")
         
     return min(max(score, 0), 100) # Clamp 0-100
 
-def analyze_single_stock(ticker, return_any_data=False):
+def analyze_single_stock(ticker, return_any_data=False, bar_tracker=None, news_index=None, risk_engine=None, bars=None):
     """
     Analyzes a single stock and returns its trade setup.
+    If a bar_tracker is given, only closed bars are used and the stock is
+    skipped (returns None) when no new bar has printed since the last call.
+    news_index (TickerNewsIndex) adds headline sentiment to the score.
+    risk_engine (RiskEngine) is fed the closed-bar closes for correlation/beta.
+    bars: already downloaded 59d/15m bars (skips the fetch).
     """
     # 1. FETCH MARKET DATA
     # User requested 15m data. Max is ~60d. 
     # We use 59d to be safe and maximize history for the model.
     period = "59d" 
-    df = fetch_data(ticker, period=period, interval="15m") 
+    df = bars if bars is not None else fetch_data(ticker, period=period, interval="15m") 
     if df is None: return None
+
+    if bar_tracker is not None:
+        df = drop_forming_bar(df)
+        if df.empty or not bar_tracker.is_new(ticker, df.index[-1]):
+            return None
+
+    if risk_engine is not None:
+        closed = drop_forming_bar(df)
+        if not closed.empty: risk_engine.observe(ticker, closed['Close'])
         
-    # 2. TECHNICAL ANALYSIS
-    df = detect_structure(df)
+    # 2. TECHNICAL ANALYSIS (shared per-bar indicator frame)
+    bars_15m = df
+    df = get_indicators(ticker, df, interval="15m")
     if df is None: return None
     pivots = calculate_pivots(df)
     setup_type, reason, stats, duration, strategy_name = identify_setup(df)
+    if stats is not None:
+        # 1h trend filter - resampled from the 15m bars, no extra download
+        stats['Trend 1h'] = timeframe_trend(ticker, bars_15m, "1h") or "-"
     
     # 3. PREPARE TECH RESULT
     last_close = df['Close'].iloc[-1]
@@ -106,21 +155,28 @@ def analyze_single_stock(ticker, return_any_data=False):
     # 4. FETCH EXTRA DATA (Fundamentals & F&O)
     fund_data = None
     fno_data = None
+    news_data = news_index.lookup(ticker) if news_index else None
     ai_score = 0
     
-    # Get Fundamentals (Cached internally eventually)
+    # Fundamentals from the nightly snapshot (free); single-stock views fall back to a live fetch
+    fund_data = get_snapshot_fundamentals(ticker)
     if return_any_data:
-        fund_data = get_fundamentals(ticker)
-        fno_data = get_option_chain_data(ticker)
+        fund_data = fund_data or get_fundamentals(ticker)
+        fno_data = get_option_chain_data(ticker, spot=start_price)
+    elif signal != "NEUTRAL":
+        # Scan: signals only, nearest expiry (chains are cached, so a
+        # signal that repeats next bar costs no extra request)
+        fno_data = get_option_chain_data(ticker, spot=start_price, expiries=SCAN_FNO_EXPIRIES)
 
     # 5. CALCULATE SCORE
     # Heuristic Base
-    heuristic_score = calculate_heuristic_score(tech_result, fund_data, fno_data)
+    heuristic_score = calculate_heuristic_score(tech_result, fund_data, fno_data, news_data)
     ai_score = heuristic_score
     
     # ML Boost (If scanning or deep analysis)
     # We always run ML now for better scoring
     try:
+        import ml_engine # [NEW] ML (lazy: pulls in sklearn)
         # Use the same 15m dataframe
         ml_prob = ml_engine.train_and_predict(df, ticker)
         
@@ -162,7 +218,7 @@ def analyze_single_stock(ticker, return_any_data=False):
     # [FIX] Clamp Score to 0-100
     ai_score = min(max(ai_score, 0), 100)
         
-    return {
+    result = {
         "Stock": ticker.replace(".NS", ""),
         "CMP": round(last_close, 2),
 
@@ -173,8 +229,6 @@ def analyze_single_stock(ticker, return_any_data=False):
         "Reason": reason,
         "Stats": stats,
         "Levels": pivots,
-        # History is usually not needed for basic scan result to save memory
-        # "History": df[['Open', 'High', 'Low', 'Close', 'EMA_20', 'EMA_50', 'EMA_200']].tail(100),
         "Entry": round(start_price, 2),
         "Stop Loss": round(stop_loss, 2) if stop_loss else 0,
         "Target 1": round(target_1, 2) if target_1 else 0,
@@ -187,21 +241,38 @@ def analyze_single_stock(ticker, return_any_data=False):
         # New Pro Fields
         "Fundamentals": fund_data,
         "FnO": fno_data,
+        "News_Sentiment": news_data['Sentiment'] if news_data else None,
         "AI_Score": int(ai_score)
     }
 
-def scan_stocks():
+    # History is not needed for scan results (memory, JSON store) - only for
+    # single-stock charts, which downsample it via chart_engine
+    if return_any_data:
+        result["History"] = df[['Open', 'High', 'Low', 'Close', 'Volume', 'EMA_20', 'EMA_200']]
+    return result
+
+def is_trade_candidate(data):
     """
-    Scans the entire Nifty 500 list.
+    Scan filter: a live signal, or a strong score even without a setup.
+    """
+    return data['Signal'] != "NEUTRAL" or data['AI_Score'] > 70
+
+def build_scan_results(rows):
+    """
+    Builds the columnar scan result (categories are masks over one table).
+    Used by scan_stocks and to rebuild a scan from the shared result store.
+    """
+    return ScanResults.from_rows(rows)
+
+def scan_stocks(tickers=None, bar_tracker=None, risk_engine=None):
+    """
+    Scans the entire Nifty 500 list (or the given tickers).
+    With a bar_tracker, stocks without a new closed bar are skipped.
+    With a risk_engine, its return covariance is rolled forward to the new bar.
     """
     import excel_logger # Lazy import
     
-    results = {
-        "SUPPORT_ZONE": [],
-        "BREAKOUT": [],
-        "BREAKDOWN": [],
-        "ALL_TRADES": [] 
-    }
+    scanned = [] # Every analysed stock, incl. NEUTRAL (used for alert state)
     
     import logging
     # System errors
@@ -211,43 +282,54 @@ def scan_stocks():
     # [DEBUG] Audit Log for Scores
     audit_logger = logging.getLogger('audit')
     audit_logger.setLevel(logging.INFO)
-    fh = logging.FileHandler('scan_results.log')
-    fh.setFormatter(logging.Formatter('%(message)s'))
-    audit_logger.addHandler(fh)
+    if not audit_logger.handlers: # Bot calls this every bar, don't stack handlers
+        fh = logging.FileHandler('scan_results.log')
+        fh.setFormatter(logging.Formatter('%(message)s'))
+        audit_logger.addHandler(fh)
 
-    tickers = get_nifty500_tickers()
+    if tickers is None:
+        tickers = get_nifty500_tickers()
     total_stocks = len(tickers)
     print(f"Scanning {total_stocks} Stocks (Turbo Mode)...")
+
+    # News: one pass over the market feed instead of a request per ticker
+    news_index = None
+    try:
+        from ticker_news_index import build_market_news_index
+        news_index = build_market_news_index(tickers)
+    except Exception as e:
+        logging.error(f"News index unavailable: {str(e)}")
     
     with ThreadPoolExecutor(max_workers=30) as executor: # TURBO MODE
-        future_to_stock = {executor.submit(analyze_single_stock, t, return_any_data=False): t for t in tickers}
+        future_to_stock = {executor.submit(analyze_single_stock, t, return_any_data=False, bar_tracker=bar_tracker, news_index=news_index, risk_engine=risk_engine): t for t in tickers}
         
         for future in as_completed(future_to_stock):
             stock_name = future_to_stock[future]
             try:
                 data = future.result()
                 if data:
+                    scanned.append(data)
+
                     # [DEBUG] Log the score
                     audit_logger.info(f"{stock_name}: Score={data['AI_Score']} Signal={data['Signal']}")
 
-                    if data['Signal'] != "NEUTRAL" or data['AI_Score'] > 70:
-                        # Add to Result List
-                        results["ALL_TRADES"].append(data)
-                        
-                        if "BUY" in data['Setup']:
-                            results["BREAKOUT"].append(data)
-                        elif "SELL" in data['Setup']:
-                            results["BREAKDOWN"].append(data)
-                            
-                        # --- AUTO LOG TO EXCEL ---
-                        if data['Signal'] != "NEUTRAL":
-                            excel_logger.log_trade_to_excel(data)
+                    # --- AUTO LOG TO EXCEL ---
+                    if is_trade_candidate(data) and data['Signal'] != "NEUTRAL":
+                        excel_logger.log_trade_to_excel(data)
                     
             except Exception as e:
                 logging.error(f"Failed to scan {stock_name}: {str(e)}")
                 pass
                 
-    return results
+    if risk_engine is not None:
+        try:
+            risk_engine.fetch_benchmark()
+            risk_engine.update()
+        except Exception as e:
+            logging.error(f"Risk engine update failed: {str(e)}")
+
+    # One typed table; BREAKOUT / ALL_TRADES etc. are filtered views of it
+    return build_scan_results(scanned)
 
 if __name__ == "__main__":
     scan_stocks()
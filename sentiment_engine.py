@@ -0,0 +1,168 @@
+import os
+import re
+import csv
+import json
+import threading
+
+# --- DEFAULT LEXICON ---
+# Base forms; common inflections (surges, surged, surging, bullish...) are
+# generated automatically when the lexicon is compiled.
+DEFAULT_LEXICON = {
+    'surge': 3, 'skyrocket': 3, 'jump': 2, 'gain': 2, 'rally': 2, 'hit upper circuit': 4,
+    'profit': 2, 'growth': 1, 'record': 2, 'strong': 1, 'dividend': 2, 'buy': 1, 'buyback': 1,
+    'upgrade': 2, 'positive': 1, 'bull': 1,
+
+    'crash': -3, 'plunge': -3, 'slump': -2, 'tank': -3, 'fall': -1, 'fell': -1, 'drop': -1,
+    'loss': -2, 'weak': -1, 'sell': -1, 'debt': -1, 'downgrade': -2, 'negative': -1,
+    'bear': -1, 'concern': -1, 'warning': -1, 'hit lower circuit': -4
+}
+
+# Phrases that contain a lexicon word but carry no sentiment.
+# Longest match wins, so these shadow the word inside them.
+NEUTRAL_PHRASES = [
+    "think tank", "tank farm", "tanker", "tankers", "bearing", "bearings", "ball bearing",
+    "buy now pay later", "record date", "drop shipping", "gaining access"
+]
+
+# Optional larger finance lexicon merged on top of the default (CSV term,weight or JSON)
+LEXICON_PATH = os.environ.get("SENTIMENT_LEXICON_PATH")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+MAX_SCORE = 10
+
+
+def tokenize(text):
+    """
+    Lower-case word tokens (word boundaries, punctuation dropped).
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _inflections(word):
+    """Common English inflections of a single base word."""
+    forms = {word, word + "s", word + "es", word + "ed", word + "ing", word + "ish"}
+    if word.endswith("e"):
+        forms.update({word + "d", word[:-1] + "ing"})
+    if word.endswith("y"):
+        forms.update({word[:-1] + "ies", word[:-1] + "ied"})
+    # drop -> dropped / dropping, slump stays slumped
+    if len(word) <= 4 and word[-1] not in "aeiouwy" and word[-2] in "aeiou" and word[-3:-2] not in ("a", "e", "i", "o", "u"):
+        forms.update({word + word[-1] + "ed", word + word[-1] + "ing"})
+    return forms
+
+
+def load_lexicon(path):
+    """
+    Loads {term: weight} from a JSON object or a two-column CSV (term,weight).
+    """
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return {k.lower(): float(v) for k, v in json.load(f).items()}
+
+    lexicon = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].startswith("#"): continue
+            try:
+                lexicon[row[0].strip().lower()] = float(row[1])
+            except ValueError:
+                continue # header row
+    return lexicon
+
+
+class SentimentScorer:
+    """
+    Lexicon sentiment scorer compiled once into an n-gram lookup table.
+
+    Headlines are tokenized on word boundaries and matched longest phrase
+    first with dictionary lookups, so cost depends on headline length and
+    the longest phrase - not on how many terms the lexicon holds. Each
+    lexicon entry counts once per headline, as before.
+    """
+    def __init__(self, lexicon=None, neutral_phrases=None):
+        self.lexicon = dict(DEFAULT_LEXICON if lexicon is None else lexicon)
+        self.neutral_phrases = list(NEUTRAL_PHRASES if neutral_phrases is None else neutral_phrases)
+        self._compile()
+
+    def _compile(self):
+        table = {} # token tuple -> base term (None for neutral phrases)
+        for term in self.lexicon:
+            toks = tuple(tokenize(term))
+            if not toks: continue
+            if len(toks) == 1:
+                for form in _inflections(toks[0]):
+                    table.setdefault((form,), term)
+            else:
+                table[toks] = term
+
+        # Explicit entries beat generated inflections
+        for term in self.lexicon:
+            toks = tuple(tokenize(term))
+            if toks: table[toks] = term
+        for phrase in self.neutral_phrases:
+            toks = tuple(tokenize(phrase))
+            if toks: table[toks] = None
+
+        self._table = table
+        self._max_len = max((len(k) for k in table), default=1)
+
+    def extend(self, lexicon):
+        """Merges extra terms (e.g. a larger finance lexicon) and recompiles."""
+        self.lexicon.update(lexicon)
+        self._compile()
+
+    def matches(self, text):
+        """Set of lexicon terms found in the text."""
+        tokens = tokenize(text)
+        found = set()
+        i, n = 0, len(tokens)
+        while i < n:
+            for size in range(min(self._max_len, n - i), 0, -1):
+                key = tuple(tokens[i:i + size])
+                if key in self._table:
+                    term = self._table[key]
+                    if term is not None:
+                        found.add(term)
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def score(self, text):
+        """
+        Calculates detailed sentiment score [-10 to +10] and a label.
+        """
+        score = sum(self.lexicon[t] for t in self.matches(text))
+        score = max(min(score, MAX_SCORE), -MAX_SCORE)
+
+        label = "Neutral"
+        if score >= 2: label = "Positive"
+        elif score <= -2: label = "Negative"
+        return score, label
+
+    def score_many(self, texts):
+        """Batch scoring: list of (score, label) in input order."""
+        return [self.score(t) for t in texts]
+
+
+_DEFAULT_SCORER = None
+_LOCK = threading.Lock()
+
+
+def get_default_scorer():
+    """
+    Process-wide scorer, compiled once (plus SENTIMENT_LEXICON_PATH if set).
+    """
+    global _DEFAULT_SCORER
+    with _LOCK:
+        if _DEFAULT_SCORER is None:
+            scorer = SentimentScorer()
+            if LEXICON_PATH and os.path.exists(LEXICON_PATH):
+                try:
+                    scorer.extend(load_lexicon(LEXICON_PATH))
+                except Exception as e:
+                    print(f"⚠️ Could not load lexicon {LEXICON_PATH}: {e}")
+            _DEFAULT_SCORER = scorer
+        return _DEFAULT_SCORER
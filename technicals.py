@@ -192,6 +192,10 @@ def identify_setup(df):
     
     supertrend = df['SuperTrend'].iloc[-1]
     
+    # Last bar's move in ATR units (used by the priority scheduler)
+    atr = df['ATR'].iloc[-1]
+    atr_move = abs(close - df['Close'].iloc[-2]) / atr if atr else 0
+    
     stats = {
         "RSI": round(rsi, 2),
         "StochRSI": f"{round(stoch_k,0)}/{round(stoch_d,0)}",
@@ -202,7 +206,9 @@ def identify_setup(df):
         "ADX": round(adx, 2),
         "Squeeze": "Yes" if bb_width < 0.05 else "No", # Tighter bands = Squeeze
         "Volume Status": "High" if df['Volume'].iloc[-1] > 1.5 * df['Vol_MA'].iloc[-1] else "Normal",
-        "Last Signal": "Buy" if supertrend == 1 else "Sell"
+        "Last Signal": "Buy" if supertrend == 1 else "Sell",
+        "BB Width": round(bb_width, 4) if not pd.isna(bb_width) else 0,
+        "ATR Move": round(atr_move, 2)
     }
 
     setup_type = None
@@ -0,0 +1,183 @@
+import time
+from collections import defaultdict
+from sentiment_engine import tokenize
+
+# --- SYMBOL / COMPANY ALIASES ---
+# Phrases that identify a company in a headline. The bare symbol is added
+# automatically for symbols of 3+ letters (except AMBIGUOUS_SYMBOLS).
+# Avoid ambiguous words ("bajaj", "icici", "tata") - they'd tag the wrong company.
+SYMBOL_ALIASES = {
+    "RELIANCE": ["reliance industries", "reliance", "ril", "mukesh ambani"],
+    "HDFCBANK": ["hdfc bank"],
+    "INFY": ["infosys"],
+    "TCS": ["tcs", "tata consultancy"],
+    "ICICIBANK": ["icici bank"],
+    "SBIN": ["sbi", "state bank of india"],
+    "BHARTIARTL": ["bharti airtel", "airtel"],
+    "ITC": ["itc"],
+    "KOTAKBANK": ["kotak mahindra bank", "kotak bank", "kotak"],
+    "LICI": ["lic", "life insurance corporation"],
+    "LT": ["larsen", "l&t", "larsen & toubro"],
+    "HINDUNILVR": ["hindustan unilever", "hul"],
+    "AXISBANK": ["axis bank"],
+    "BAJFINANCE": ["bajaj finance"],
+    "MARUTI": ["maruti", "maruti suzuki"],
+    "ASIANPAINT": ["asian paints"],
+    "TITAN": ["titan"],
+    "SUNPHARMA": ["sun pharma", "sun pharmaceutical"],
+    "ULTRACEMCO": ["ultratech", "ultratech cement"],
+    "TATAMOTORS": ["tata motors", "jaguar land rover", "jlr"],
+    "NTPC": ["ntpc"],
+    "ONGC": ["ongc"],
+    "POWERGRID": ["power grid", "powergrid"],
+    "TATASTEEL": ["tata steel"],
+    "JSWSTEEL": ["jsw steel"],
+    "ADANIENT": ["adani enterprises"],
+    "ADANIPORTS": ["adani ports"],
+    "COALINDIA": ["coal india"],
+    "BAJAJFINSV": ["bajaj finserv"],
+    "M&M": ["m&m", "mahindra & mahindra", "mahindra and mahindra"],
+    "BPCL": ["bpcl", "bharat petroleum"],
+    "HCLTECH": ["hcltech", "hcl tech", "hcl technologies"],
+    "WIPRO": ["wipro"],
+    "TATACONSUM": ["tata consumer"],
+    "BRITANNIA": ["britannia"],
+    "GRASIM": ["grasim"],
+    "CIPLA": ["cipla"],
+    "HEROMOTOCO": ["hero motocorp"],
+    "EICHERMOT": ["eicher", "eicher motors", "royal enfield"],
+    "DRREDDY": ["dr reddy", "dr reddys", "dr reddy's"],
+    "TECHM": ["tech mahindra", "techm"],
+    "HINDALCO": ["hindalco"],
+    "DIVISLAB": ["divi's", "divis", "divi's laboratories"],
+    "APOLLOHOSP": ["apollo hospitals"],
+    "UPL": ["upl"],
+    "BHEL": ["bhel"],
+    "BIKAJI": ["bikaji"],
+    "ZOMATO": ["zomato"],
+    "PAYTM": ["paytm", "one97"],
+    "VBL": ["varun beverages", "vbl"]
+}
+
+# Other companies whose names start with an alias above. Longest match wins,
+# so these keep "Reliance Power" from being tagged as RELIANCE.
+EXCLUDED_PHRASES = [
+    "reliance power", "reliance capital", "reliance infra", "reliance infrastructure",
+    "reliance communications", "reliance home finance", "tata power", "sun tv",
+    "hero futureenergies", "power grid failure"
+]
+
+# Nifty 500 symbols that are everyday words, names or market terms
+# ("crude oil", "rain", "BSE Sensex"). Never added as bare-symbol aliases;
+# give them a SYMBOL_ALIASES entry with the company name instead.
+AMBIGUOUS_SYMBOLS = {
+    "OIL", "IDEA", "SAIL", "PERSISTENT", "TRIDENT", "RITES", "PRESTIGE", "CLEAN", "ROUTE",
+    "RAIN", "FACT", "CAMPUS", "AMBER", "ASTRAL", "ENDURANCE", "SYMPHONY", "METROPOLIS",
+    "CHALET", "INTELLECT", "SAFARI", "GATEWAY", "GRAPHITE", "STAR", "ACE", "CARE", "CUB",
+    "GLAND", "ATUL", "ARVIND", "BSE", "MCX"
+}
+
+# Headline sentiment halves every N hours
+SENTIMENT_HALF_LIFE_HOURS = 6
+
+
+def base_symbol(ticker):
+    return ticker.replace(".NS", "").replace(".BO", "")
+
+
+class TickerNewsIndex:
+    """
+    Inverted index from ticker to the recent market headlines that mention it.
+
+    Built once from the aggregated market feed (one pass over the items,
+    longest alias phrase first). Lookups of headlines and the time-decayed
+    sentiment are then O(1) per ticker, so a 500-ticker scan can use news
+    without a Google News request per ticker.
+    """
+    def __init__(self, items=(), aliases=None, half_life_hours=SENTIMENT_HALF_LIFE_HOURS, now=None):
+        self.half_life = half_life_hours * 3600
+        self._table = {}
+        aliases = SYMBOL_ALIASES if aliases is None else aliases
+        for symbol, names in aliases.items():
+            self.add_alias(symbol, *names)
+        for phrase in EXCLUDED_PHRASES:
+            self.add_alias("", phrase) # empty symbol = matched but ignored
+
+        self._postings = defaultdict(list)
+        self._sentiment = {}
+        self.build(items, now)
+
+    def add_alias(self, symbol, *names):
+        for name in names:
+            toks = tuple(tokenize(name))
+            if toks:
+                self._table[toks] = symbol
+        self._max_len = max((len(k) for k in self._table), default=1)
+
+    def ensure_symbols(self, tickers):
+        """Adds the bare symbol as an alias for tickers without explicit ones."""
+        for t in tickers:
+            sym = base_symbol(t)
+            if len(sym) >= 3 and sym not in AMBIGUOUS_SYMBOLS and (sym.lower(),) not in self._table:
+                self.add_alias(sym, sym)
+
+    def match(self, text):
+        """Symbols mentioned in a headline."""
+        tokens = tokenize(text)
+        found = set()
+        i, n = 0, len(tokens)
+        while i < n:
+            for size in range(min(self._max_len, n - i), 0, -1):
+                key = tuple(tokens[i:i + size])
+                if key in self._table:
+                    if self._table[key]:
+                        found.add(self._table[key])
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def build(self, items, now=None):
+        """(Re)indexes news items and precomputes decayed sentiment per symbol."""
+        now = now or time.time()
+        self._postings = defaultdict(list)
+        for item in items:
+            for sym in self.match(item['Headline']):
+                self._postings[sym].append(item)
+
+        self._sentiment = {}
+        for sym, posts in self._postings.items():
+            posts.sort(key=lambda x: x['NumericTime'], reverse=True)
+            num = den = 0.0
+            for p in posts:
+                age = max(now - p['NumericTime'], 0)
+                w = 0.5 ** (age / self.half_life)
+                num += w * p['Score']
+                den += w
+            self._sentiment[sym] = round(num / den, 2) if den else 0.0
+        return self
+
+    def headlines(self, ticker, limit=10):
+        return self._postings.get(base_symbol(ticker), [])[:limit]
+
+    def sentiment(self, ticker):
+        """Time-decayed average headline score, or None if never mentioned."""
+        return self._sentiment.get(base_symbol(ticker))
+
+    def lookup(self, ticker):
+        """News summary for scoring, or None if the ticker isn't in the news."""
+        sym = base_symbol(ticker)
+        if sym not in self._sentiment: return None
+        return {"Sentiment": self._sentiment[sym], "Headlines": len(self._postings[sym])}
+
+
+def build_market_news_index(tickers=()):
+    """
+    Refreshes the market feed (incremental) and indexes it by ticker.
+    """
+    from news_engine import fetch_market_news, get_recent_news_items
+    fetch_market_news()
+    index = TickerNewsIndex()
+    index.ensure_symbols(tickers)
+    return index.build(get_recent_news_items())
@@ -0,0 +1,131 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Refreshes of stale entries run here, never on the caller's thread
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ttl-refresh")
+
+
+def _cacheable(value):
+    """None and empty results (incl. empty DataFrames) are not cached."""
+    if value is None: return False
+    try:
+        return len(value) > 0
+    except TypeError:
+        return True
+
+
+class TTLCache:
+    """
+    Process-wide, thread-safe cache with a TTL, stale-while-revalidate and
+    LRU eviction.
+
+    - younger than ttl: returned as is
+    - younger than ttl + stale_ttl: returned immediately, and one background
+      reload is started for the key
+    - older / missing: loaded on the caller's thread (concurrent callers for
+      the same key wait for the same load)
+    Failed or empty loads are not cached, so the old value keeps being served.
+    """
+    def __init__(self, ttl, stale_ttl=0, max_size=256, name="cache"):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.name = name
+        self._data = OrderedDict() # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._loading = {} # key -> Event, one load per key at a time
+        self._refreshing = set() # keys with a queued background reload
+        self.hits = self.stale_hits = self.misses = 0
+
+    def _put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def _load(self, key, loader):
+        """Runs loader once per key; other callers wait for its result."""
+        with self._lock:
+            event = self._loading.get(key)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._loading[key] = event
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                entry = self._data.get(key)
+            return entry[1] if entry else None
+
+        try:
+            value = loader()
+            if _cacheable(value): self._put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            event.set()
+
+    def _refresh(self, key, loader):
+        try:
+            self._load(key, loader)
+        except Exception as e:
+            print(f"⚠️ {self.name}: background refresh of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                age = time.time() - entry[0]
+                if age < self.ttl:
+                    self.hits += 1
+                    return entry[1]
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if key not in self._refreshing and key not in self._loading:
+                        self._refreshing.add(key)
+                        _REFRESH_POOL.submit(self._refresh, key, loader)
+                    return entry[1]
+            self.misses += 1
+
+        try:
+            return self._load(key, loader)
+        except Exception:
+            # Upstream down: an expired value beats nothing
+            if entry is not None: return entry[1]
+            raise
+
+    def get(self, key):
+        """Cached value regardless of age, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] if entry else None
+
+    def put(self, key, value):
+        """Stores a value computed outside get_or_load (e.g. incremental state)."""
+        self._put(key, value)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"name": self.name, "size": len(self._data), "hits": self.hits,
+                    "stale_hits": self.stale_hits, "misses": self.misses}
@@ -0,0 +1,225 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from data_engine import fetch_data
+from technicals import detect_structure, identify_setup
+from market_clock import drop_forming_bar, BarTracker
+from risk_engine import RiskEngine
+
+# Bars kept per symbol. Enough for EMA_200 to settle, far less than 59d.
+HISTORY_BARS = 600
+MAX_SYMBOLS = 500
+# Sessions an incremental pull covers ("5d"); a longer gap means a full fetch
+INCREMENTAL_SESSIONS = 5
+
+# Background refresher: one loop per process, however many viewers
+REFRESH_SECONDS = 30
+# Symbols nobody has polled for this long stop being refreshed
+VIEWER_IDLE_SECONDS = 120
+
+
+def _signal_from_setup(setup_type):
+    if setup_type and "BUY" in setup_type: return "BUY"
+    if setup_type and "SELL" in setup_type: return "SELL"
+    return "NEUTRAL"
+
+
+class WatchlistEngine:
+    """
+    Keeps per-symbol bar history and the last rendered row between reruns.
+    Each refresh only pulls today's bars, skips symbols whose bars did not
+    change, and reports which rows actually moved (price or signal).
+    No ML training here - the monitor only needs price, signal and ADX.
+    """
+    def __init__(self, max_workers=8, refresh_seconds=REFRESH_SECONDS):
+        self._state = OrderedDict() # ticker -> {"bars": df, "row": dict}
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="watchlist")
+
+        self.refresh_seconds = refresh_seconds
+        self._watched = {} # ticker -> last time a viewer polled it
+        self._wake = threading.Event()
+        self._refresher = None
+        self._last_refresh = None
+        self._last_changed = []
+        self.risk = RiskEngine() # correlation / beta / VaR of the watched symbols
+        self._closed_bars = BarTracker() # last closed bar handed to the risk engine
+        self._risk_stale = False # a symbol closed a new bar since the last risk update
+
+    # --- DATA ---
+    def _pull_bars(self, ticker, old):
+        """
+        Full history on first sight, then only the latest session(s).
+        If the stored bars are older than the incremental pull reaches
+        (idle symbol, long weekend), the history is fetched in full again
+        rather than stitched across a hole.
+        """
+        if old is not None:
+            last_day = old.index[-1].date()
+            today = pd.Timestamp.now(tz=old.index.tz).date()
+            gap = int(np.busday_count(last_day, today)) # weekdays since the last stored bar
+            if gap >= INCREMENTAL_SESSIONS:
+                old = None
+
+        if old is None:
+            df = fetch_data(ticker, period="59d", interval="15m")
+            return df.tail(HISTORY_BARS) if df is not None else None
+
+        new = fetch_data(ticker, period="1d" if last_day == today else f"{INCREMENTAL_SESSIONS}d", interval="15m")
+        if new is None or new.empty:
+            return old
+
+        merged = pd.concat([old, new])
+        # The last (forming) bar gets revised every pull, keep the newest copy
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        return merged.tail(HISTORY_BARS)
+
+    def _update_symbol(self, ticker):
+        with self._lock:
+            prev = self._state.get(ticker)
+        old_bars = prev["bars"] if prev else None
+
+        bars = self._pull_bars(ticker, old_bars)
+        if bars is None or bars.empty:
+            return None
+        closed = drop_forming_bar(bars)
+        if not closed.empty and self._closed_bars.is_new(ticker, closed.index[-1]):
+            self.risk.observe(ticker, closed['Close'])
+            with self._lock:
+                self._risk_stale = True
+
+        # Nothing new since the last pull -> reuse the row as is
+        if prev is not None and bars.index[-1] == old_bars.index[-1] \
+                and bars.iloc[-1][['Close', 'Volume']].equals(old_bars.iloc[-1][['Close', 'Volume']]):
+            return prev["row"]
+
+        calc = detect_structure(bars.copy())
+        if calc is None: return None
+        setup_type, reason, stats, _, _ = identify_setup(calc)
+        signal = _signal_from_setup(setup_type)
+
+        row = {
+            "Stock": ticker.replace(".NS", ""),
+            "Price": round(calc['Close'].iloc[-1], 2),
+            "Signal": signal,
+            "Reason": reason,
+            "ADX": stats['ADX'] if stats else 0,
+            "Action": "WAIT" if signal == "NEUTRAL" else signal
+        }
+
+        with self._lock:
+            self._state[ticker] = {"bars": bars, "row": row}
+            self._state.move_to_end(ticker)
+            while len(self._state) > MAX_SYMBOLS:
+                self._state.popitem(last=False)
+        return row
+
+    def _submit(self, ticker):
+        """One in-flight update per symbol, even with several viewers."""
+        with self._lock:
+            fut = self._inflight.get(ticker)
+            if fut is None or fut.done():
+                fut = self._executor.submit(self._update_symbol, ticker)
+                self._inflight[ticker] = fut
+            return fut
+
+    # --- PUBLIC API ---
+    def refresh(self, tickers):
+        """
+        Updates the given symbols. Returns (snapshot_rows, changed_rows) where
+        changed_rows only holds rows whose price or signal moved.
+        """
+        with self._lock:
+            before = {t: self._state[t]["row"] for t in tickers if t in self._state}
+
+        futures = {t: self._submit(t) for t in tickers}
+
+        snapshot, changed = [], []
+        for t, fut in futures.items():
+            try:
+                row = fut.result()
+            except Exception as e:
+                print(f"Watchlist refresh failed for {t}: {e}")
+                row = before.get(t)
+            if not row: continue
+
+            snapshot.append(row)
+            old = before.get(t)
+            if old is None or old["Price"] != row["Price"] or old["Signal"] != row["Signal"]:
+                changed.append(row)
+
+        # Like the scanner: the benchmark and covariance only move on a new closed bar
+        with self._lock:
+            stale, self._risk_stale = self._risk_stale, False
+        if stale:
+            try:
+                self.risk.fetch_benchmark()
+                self.risk.update()
+            except Exception as e:
+                print(f"Watchlist risk update failed: {e}")
+                with self._lock:
+                    self._risk_stale = True # retried on the next refresh
+        return snapshot, changed
+
+    def snapshot(self, tickers):
+        """Last known rows without touching the network."""
+        with self._lock:
+            return [self._state[t]["row"] for t in tickers if t in self._state]
+
+    # --- BACKGROUND REFRESH ---
+    def watch(self, tickers):
+        """
+        Registers viewer interest and makes sure the refresher is running.
+        Symbols never seen before trigger an immediate refresh.
+        """
+        now = time.time()
+        with self._lock:
+            new = [t for t in tickers if t not in self._watched and t not in self._state]
+            for t in tickers:
+                self._watched[t] = now
+            if self._refresher is None or not self._refresher.is_alive():
+                self._refresher = threading.Thread(target=self._refresh_loop, name="watchlist-refresher", daemon=True)
+                self._refresher.start()
+        if new:
+            self._wake.set()
+
+    def request_refresh(self):
+        self._wake.set()
+
+    def _refresh_loop(self):
+        while True:
+            with self._lock:
+                cutoff = time.time() - VIEWER_IDLE_SECONDS
+                for t in [t for t, seen in self._watched.items() if seen < cutoff]:
+                    del self._watched[t]
+                tickers = list(self._watched)
+                if not tickers:
+                    # Nobody watching: stop, the next watch() restarts us
+                    self._refresher = None
+                    return
+
+            try:
+                _, changed = self.refresh(tickers)
+                with self._lock:
+                    self._last_refresh = time.time()
+                    self._last_changed = changed
+            except Exception as e:
+                print(f"Watchlist background refresh failed: {e}")
+
+            self._wake.wait(self.refresh_seconds)
+            self._wake.clear()
+
+    def latest(self, tickers):
+        """
+        (rows, refreshed_at, changed_rows) from the shared snapshot, no network.
+        """
+        wanted = {t.replace(".NS", "") for t in tickers}
+        with self._lock:
+            rows = [self._state[t]["row"] for t in tickers if t in self._state]
+            changed = [r for r in self._last_changed if r["Stock"] in wanted]
+            return rows, self._last_refresh, changed
+